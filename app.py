@@ -1,28 +1,54 @@
 import os
+import argparse
+import asyncio
+import threading
 import gradio as gr
 import sys
 # Pastikan folder src ada dalam path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "src")))
 
-# Panggil generate_answer dari modul retrieve
-from archive.retriever import generate_answer
+# Panggil astream_answer dari modul retrieve (model & index dimuat lazy)
+from archive.retriever import astream_answer, reset_conversation, search_images, source_options
+from src import config, services
+from src.serving.async_answer import Overloaded
+
+# Index dibangun/di-update lewat CLI (python -m archive.multimodal_indexer).
+# Bila index belum ada, atau dengan `python app.py --sync-index`, build berjalan
+# di latar dan chat ditahan sampai selesai agar query tidak dilayani dari index
+# setengah jadi.
+INDEX_READY = threading.Event()
+IMAGE_FOLDER = "data/images"
+
+
+def index_missing():
+    return not os.path.isdir("chroma_db") or not os.listdir("chroma_db")
+
+
+# Kesiapan ditentukan saat import, bukan hanya di __main__ (gradio reload / launcher lain)
+if not index_missing():
+    INDEX_READY.set()
+
 
-# On‑the‑fly index build jika folder kosong
 def ensure_index():
-    if not os.path.isdir("chroma_db") or not os.listdir("chroma_db"):
+    # Rebuild bila folder kosong; selain itu update inkremental (hanya file baru/berubah)
+    try:
         from archive.multimodal_indexer import build_multimodal_index
         build_multimodal_index(
             pdf_folder="data/articles",
-            audio_folder="data/audio_texts",
-            image_folder="data/images",
+            image_folder=IMAGE_FOLDER,
             chroma_path="chroma_db",
-            collection_name="rag_medical"
+            collection_name="rag_medical",
+            mode="rebuild" if index_missing() else "update"
         )
-
-ensure_index()
+    finally:
+        # Collection gambar bisa baru tercipta oleh build ini
+        services.reset("image_collection")
+        INDEX_READY.set()
 
 # Parameter tetap Top K untuk retrieval + generation
 TOP_K = 5
+# Gambar terkait (query teks → collection CLIP) yang ditampilkan per pertanyaan
+TOP_IMAGES = 4
 
 # Definisi UI Gradio
 demo = gr.Blocks()
@@ -32,6 +58,24 @@ with demo:
         flag_btn = gr.Button("🚩", elem_id="flag-btn")
 
     chatbot = gr.Chatbot(elem_id="chatbot-panel")
+    gallery = gr.Gallery(label="Gambar terkait", columns=TOP_IMAGES, height="auto", elem_id="image-panel")
+
+    # Pemilih sumber: retrieval dibatasi ke buku/bab terpilih (kosong = semua sumber)
+    with gr.Row():
+        book_dd = gr.Dropdown(choices=[], multiselect=True, label="Buku", elem_id="book-filter")
+        chapter_dd = gr.Dropdown(choices=[], multiselect=True, label="Bab", elem_id="chapter-filter")
+
+    def load_sources():
+        opts = source_options()
+        return gr.update(choices=opts["book"]), gr.update(choices=opts["chapter"])
+
+    def update_chapters(books, chapters):
+        # Bab yang tersedia mengikuti buku terpilih; pilihan yang tidak lagi tersedia dibuang
+        available = source_options(books)["chapter"]
+        return gr.update(choices=available, value=[c for c in (chapters or []) if c in available])
+
+    demo.load(load_sources, outputs=[book_dd, chapter_dd])
+    book_dd.change(update_chapters, [book_dd, chapter_dd], [chapter_dd])
 
     with gr.Row():
         msg = gr.Textbox(
@@ -42,18 +86,50 @@ with demo:
         )
         send_btn = gr.Button("Send", elem_id="send-btn")
 
-    def respond(message, history):
+    async def respond(message, history, books, chapters, request: gr.Request):
         if not message:
-            return "", history
+            yield "", history
+            return
+        if not INDEX_READY.is_set():
+            yield "", history + [(message, "Index dokumen sedang disiapkan, silakan coba lagi sebentar lagi.")]
+            return
+        # Satu sesi percakapan per tab browser; chat kosong = mulai dari awal
+        session_id = request.session_hash if request else None
+        if session_id and not history:
+            reset_conversation(session_id)
+        history = history + [(message, "")]
+        filters = {k: v for k, v in (("book", books), ("chapter", chapters)) if v} or None
         try:
-            bot_msg = generate_answer(message, top_k=TOP_K)
+            # Token dialirkan ke Chatbot begitu tiba dari Ollama
+            async for partial in astream_answer(message, top_k=TOP_K, session_id=session_id, filters=filters):
+                history[-1] = (message, partial)
+                yield "", history
+        except Overloaded:
+            history[-1] = (message, "Server sedang sibuk, silakan coba lagi sebentar lagi.")
+            yield "", history
+        except asyncio.TimeoutError:
+            history[-1] = (message, "Waktu habis saat menyiapkan jawaban, silakan coba lagi.")
+            yield "", history
         except Exception as e:
-            bot_msg = f"Error: {e}"
-        history = history + [(message, bot_msg)]
-        return "", history
+            history[-1] = (message, f"Error: {e}")
+            yield "", history
 
-    msg.submit(respond, [msg, chatbot], [msg, chatbot])
-    send_btn.click(respond, [msg, chatbot], [msg, chatbot])
+    def related_images(history):
+        # Pertanyaan terakhir → gambar terdekat di ruang CLIP; kosong bila belum ada gambar ter-index
+        if not history or not INDEX_READY.is_set():
+            return []
+        try:
+            images = search_images(history[-1][0], k=TOP_IMAGES)
+        except Exception as e:
+            print(f"[✗] Pencarian gambar gagal: {e}")
+            return []
+        return [(os.path.join(IMAGE_FOLDER, img["source"]), f"{img['source']} ({img['score']:.2f})")
+                for img in images if img["source"]]
+
+    msg.submit(respond, [msg, chatbot, book_dd, chapter_dd], [msg, chatbot]).then(
+        related_images, [chatbot], [gallery])
+    send_btn.click(respond, [msg, chatbot, book_dd, chapter_dd], [msg, chatbot]).then(
+        related_images, [chatbot], [gallery])
 
     def flag_conversation(history):
         with open("flags.log", "a", encoding="utf-8") as f:
@@ -63,5 +139,21 @@ with demo:
         return None
     flag_btn.click(flag_conversation, inputs=[chatbot], outputs=[])
 
+# Banyak sesi dilayani paralel; backpressure sebenarnya di AsyncAnswerService
+demo.queue(
+    default_concurrency_limit=config.get("serving.gradio_concurrency", 64),
+    max_size=config.get("serving.max_queue", 32) * 4
+)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sync-index", action="store_true",
+                        help="update index di latar sebelum warm-up; chat ditahan sampai selesai")
+    args = parser.parse_args()
+    if args.sync_index or index_missing():
+        # Index sync + warm-up model berjalan di latar setelah UI mulai melayani
+        INDEX_READY.clear()
+        services.warmup(before=ensure_index)
+    else:
+        services.warmup()
     demo.launch(inbrowser=False)
@@ -3,13 +3,14 @@ Build and persist Chroma vectorstore from embeddings .npz files,
 using config/config.yaml for settings.
 """
 import os
-import json
 import numpy as np
 import yaml
 from dotenv import load_dotenv
 import chromadb
 from chromadb.config import Settings
 
+from src.ingestion.section_file import SECTION_EXT, SectionFile
+
 # 1. Load environment variables
 load_dotenv(dotenv_path=os.path.join("config", ".env"))
 
@@ -45,11 +46,9 @@ for fn in os.listdir(EMB_DIR):
     embeddings = arr["embeddings"]
     metadata = arr["metadata"].tolist()
 
-    # Load original JSON for document content
-    json_file = os.path.join(JSON_DIR, base + ".json")
-    with open(json_file, "r", encoding="utf-8") as jf:
-        doc = json.load(jf)
-    texts = [sec["content"] for sec in doc["sections"]]
+    # Load section contents from the extraction output
+    with SectionFile(os.path.join(JSON_DIR, base + SECTION_EXT)) as sf:
+        texts = [sf.content(i) for i in range(len(sf))]
     ids = [f"{base}_{i}" for i in range(len(texts))]
 
     # Add entries to the collection
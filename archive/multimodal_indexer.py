@@ -1,14 +1,30 @@
+import argparse
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 import fitz  # PyMuPDF
-from PIL import Image
 import chromadb
 from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
 
-# Parameter untuk chunking
-MAX_TOKENS = 1024  # perkiraan token (kata) per chunk
+from src import config
+from src.indexer.bulk_writer import bulk_writer
+from src.indexer.chunk_store import ChunkStore
+from src.indexer.chunker import Chunker
+from src.indexer.embedding_cache import CachedSentenceTransformer
+from src.indexer.image_index import build_image_index
+from src.indexer.manifest import Manifest
+from src.indexer.metadata_index import build_metadata_index, scalar_metadata
+from src.retriever.bm25 import build_bm25
+from src.retriever.rerank import normalize_rows
+
+# Parameter chunk_by_structure tanpa tokenizer model (indexing memakai jendela embedder)
+MAX_TOKENS = 1024  # token (kata) per chunk
 OVERLAP_TOKENS = 128  # tumpang tindih antar chunk
+MANIFEST_NAME = "manifest.json"  # manifest sumber ter-index, disimpan di chroma_path
+BM25_DIRNAME = "bm25"  # indeks sparse BM25, disimpan di chroma_path
+CHUNKS_DIRNAME = "chunks"  # chunk store (teks + metadata, mmap), disimpan di chroma_path
+TXT_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'  # embedder chunk PDF
 
 
 def parse_toc(pdf_path):
@@ -39,21 +55,24 @@ def get_heading_for_page(toc, page_num):
     return chapter or "–", section or "–"
 
 
-def extract_structured_text(pdf_path):
+def extract_structured_text(pdf_path, page_range=None, toc=None):
     """
     Ekstrak setiap paragraf dari PDF dengan metadata struktur:
       - book: nama file tanpa ekstensi
       - chapter & section dari TOC
       - page: label halaman PDF (sesuai tampilan buku)
       - text: isi paragraf
+    `page_range` (start, end) membatasi ke sebagian halaman (0-based, end eksklusif).
     Return: list of dict
     """
     book_name = os.path.splitext(os.path.basename(pdf_path))[0]
-    toc = parse_toc(pdf_path)
+    if toc is None:
+        toc = parse_toc(pdf_path)
     doc = fitz.open(pdf_path)
     sections = []
+    start, end = page_range or (0, len(doc))
 
-    for p in range(len(doc)):
+    for p in range(start, end):
         page = doc.load_page(p)
         raw_label = page.get_label()
         page_label = raw_label if raw_label else str(p + 1)
@@ -76,118 +95,236 @@ def extract_structured_text(pdf_path):
     return sections
 
 
-def chunk_by_structure(units, max_tokens=MAX_TOKENS, overlap_tokens=OVERLAP_TOKENS):
+def extract_structured_text_parallel(pdf_path, pool=None, workers=None, pages_per_shard=None):
+    """
+    Seperti extract_structured_text, tetapi rentang halaman dibagi ke
+    process pool; hasil digabung kembali sesuai urutan halaman. `pool`
+    dipakai ulang lintas file (tanpa pool, dibuat sementara untuk file ini);
+    ukuran shard dari ingestion.pages_per_shard.
+    """
+    pages_per_shard = pages_per_shard or int(config.get("ingestion.pages_per_shard", 200))
+    doc = fitz.open(pdf_path)
+    n_pages, toc = len(doc), doc.get_toc()
+    doc.close()
+    if n_pages <= pages_per_shard:
+        return extract_structured_text(pdf_path, toc=toc)
+    if pool is None:
+        with ProcessPoolExecutor(max_workers=workers or config.get("ingestion.workers")) as pool:
+            return extract_structured_text_parallel(pdf_path, pool, pages_per_shard=pages_per_shard)
+    ranges = [(s, min(s + pages_per_shard, n_pages)) for s in range(0, n_pages, pages_per_shard)]
+    units = []
+    for part in pool.map(extract_structured_text, [pdf_path] * len(ranges), ranges, [toc] * len(ranges)):
+        units.extend(part)
+    return units
+
+
+def extraction_pool():
+    """Satu process pool ekstraksi untuk semua PDF dalam satu run indexing."""
+    return ProcessPoolExecutor(max_workers=config.get("ingestion.workers"))
+
+
+def chunk_by_structure(units, max_tokens=MAX_TOKENS, overlap_tokens=OVERLAP_TOKENS, tokenizer=None):
     """
     Boundary-aware chunking: kumpulkan paragraf hingga mendekati max_tokens,
-    dengan overlap antar chunk.
+    dengan overlap antar chunk. Token dihitung sekali per unit (tokenizer
+    model bila diberikan, selain itu kata) dan batas dicari lewat prefix sum;
+    lihat src/indexer/chunker.py. Untuk indexing pakai Chunker.for_model agar
+    ukuran chunk mengikuti jendela embedder.
     """
-    chunks = []
-    current_units = []
-    current_tokens = 0
+    chunker = Chunker(tokenizer, window=max_tokens, overlap_tokens=overlap_tokens, reserved=0)
+    return chunker.chunk(units)
 
-    for unit in units:
-        tokens = len(unit["text"].split())
-        if current_tokens + tokens <= max_tokens:
-            current_units.append(unit)
-            current_tokens += tokens
-        else:
-            chunks.append(current_units.copy())
-            overlap_units = []
-            cum_tokens = 0
-            for u in reversed(current_units):
-                t = len(u["text"].split())
-                if cum_tokens + t > overlap_tokens:
-                    break
-                overlap_units.insert(0, u)
-                cum_tokens += t
-            current_units = overlap_units.copy()
-            current_tokens = cum_tokens
-            current_units.append(unit)
-            current_tokens += tokens
-
-    if current_units:
-        chunks.append(current_units)
-    return chunks
-
-
-def index_pdf_files(pdf_folder, collection, txt_model):
+
+PDF_EXTS = ("pdf",)
+
+
+def list_files(folder, exts):
+    """{nama file: path} untuk file dengan ekstensi `exts` di `folder`."""
+    if not os.path.isdir(folder):
+        return {}
+    return {
+        fn: os.path.join(folder, fn)
+        for fn in sorted(os.listdir(folder))
+        if fn.lower().split('.')[-1] in exts
+    }
+
+
+def pdf_chunks(pdf_folder, fn, chunker, pool=None):
+    """(chunk_id, teks, metadata) untuk semua chunk satu PDF, urut halaman."""
+    units = extract_structured_text_parallel(os.path.join(pdf_folder, fn), pool)
+    for i, batch in enumerate(chunker.chunk(units)):
+        chunk_text = " ".join(u["text"] for u in batch)
+
+        # Flatten metadata lists into strings (tampilan/Chroma); list terstruktur untuk bitmap filter
+        chapters = sorted({u["chapter"] for u in batch if u["chapter"] != "–"})
+        sections = sorted({u["section"] for u in batch if u["section"] != "–"})
+        pages = {u["page"] for u in batch}
+
+        metas = {
+            "source":   fn,
+            "book":     batch[0]["book"],
+            "chapters": ", ".join(chapters) if chapters else "–",
+            "sections": ", ".join(sections) if sections else "–",
+            "pages":    ", ".join(str(p) for p in pages),
+            "type":     "pdf_chunk",
+            "chapter_list": chapters,
+            "section_list": sections,
+        }
+        yield f"{fn}_chunk{i}", chunk_text, metas
+
+
+def index_pdf_files(pdf_folder, collection, txt_model, files=None, manifest=None, store=None):
     """
     Index PDF dengan chunking boundary-aware dan metadata akurat dari TOC.
+    `files` membatasi ke subset nama file (mode update); chunk ID dicatat
+    di `manifest` dan teks + metadata di `store` (ChunkStore) bila diberikan.
+    Chunk diukur dengan tokenizer `txt_model` agar muat di jendela model.
+    Embedding dan upsert ke `collection` berjalan per batch lintas file
+    (src/indexer/bulk_writer.py).
     """
-    for fn in os.listdir(pdf_folder):
-        if not fn.lower().endswith(".pdf"):
-            continue
-        path = os.path.join(pdf_folder, fn)
-        units = extract_structured_text(path)
-        batches = chunk_by_structure(units)
-
-        for i, batch in enumerate(batches):
-            chunk_text = " ".join(u["text"] for u in batch)
-            emb = txt_model.encode(chunk_text).tolist()
-
-            # Flatten metadata lists into strings
-            chapters = {u["chapter"] for u in batch if u["chapter"] != "–"}
-            sections = {u["section"] for u in batch if u["section"] != "–"}
-            pages = {u["page"] for u in batch}
-
-            metas = {
-                "source":   fn,
-                "book":     batch[0]["book"],
-                "chapters": ", ".join(chapters) if chapters else "–",
-                "sections": ", ".join(sections) if sections else "–",
-                "pages":    ", ".join(str(p) for p in pages),
-                "type":     "pdf_chunk"
-            }
-            collection.add(
-                ids=[f"{fn}_chunk{i}"],
-                documents=[chunk_text],
-                embeddings=[emb],
-                metadatas=[metas]
-            )
-        print(f"[INDEX] PDF: {fn} → {len(batches)} chunks")
-
-
-def index_image_files(image_folder, collection, img_model):
-    """
-    Index gambar sebagai pseudo-dokumen.
-    """
-    for fn in os.listdir(image_folder):
-        ext = fn.lower().split('.')[-1]
-        if ext not in ("png","jpg","jpeg","bmp"):
-            continue
-        path = os.path.join(image_folder, fn)
-        img = Image.open(path).convert('RGB')
-        emb = img_model.encode(img).tolist()
-        metadata = {"source": fn, "type": "image"}
-        collection.add(
-            ids=[fn],
-            documents=[f"<Image: {fn}>"],
-            embeddings=[emb],
-            metadatas=[metadata]
-        )
-        print(f"[INDEX] Image {fn}")
+    chunker = Chunker.for_model(txt_model)
+    # Vektor disimpan ber-norma 1 agar DenseReranker cukup satu matmul per query
+    writer = bulk_writer(collection, lambda texts: normalize_rows(txt_model.encode(texts)))
+    with extraction_pool() as pool:
+        for fn in (files if files is not None else list_files(pdf_folder, PDF_EXTS)):
+            ids = []
+            for chunk_id, chunk_text, metas in pdf_chunks(pdf_folder, fn, chunker, pool):
+                writer.add(chunk_id, chunk_text, scalar_metadata(metas))
+                if store is not None:
+                    store.append(chunk_id, chunk_text, metas)
+                ids.append(chunk_id)
+            if manifest is not None:
+                manifest.record(fn, os.path.join(pdf_folder, fn), ids)
+            if store is not None:
+                store.flush()
+            print(f"[INDEX] PDF: {fn} → {len(ids)} chunks")
+    writer.close()
+    if chunker.stats.units:
+        print(f"[INDEX] Chunking: {chunker.stats}")
+
+
+def chunk_pdf_files(pdf_folder, store, manifest, tokenizer_model):
+    """
+    Hanya chunking (tanpa embedding) semua PDF ke `store` + `manifest`,
+    untuk rebuild ter-shard (src/indexer/shard_embed.py).
+    """
+    chunker = Chunker.for_model(tokenizer_model)
+    with extraction_pool() as pool:
+        for fn in list_files(pdf_folder, PDF_EXTS):
+            ids = []
+            for chunk_id, chunk_text, metas in pdf_chunks(pdf_folder, fn, chunker, pool):
+                store.append(chunk_id, chunk_text, metas)
+                ids.append(chunk_id)
+            manifest.record(fn, os.path.join(pdf_folder, fn), ids)
+            store.flush()
+            print(f"[INDEX] PDF: {fn} → {len(ids)} chunks")
+    print(f"[INDEX] Chunking: {chunker.stats}")
+
+
+def load_text_model(name=None):
+    """MiniLM (SentenceTransformer) untuk chunk PDF, dengan cache embedding."""
+    name = name or TXT_MODEL
+    return CachedSentenceTransformer(SentenceTransformer(name), name)
+
+
+def backfill_chunk_store(collection, store, page_size=5000):
+    """Isi chunk store dari collection yang dibangun sebelum ada chunk store."""
+    offset = 0
+    while True:
+        res = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+        if not res["ids"]:
+            break
+        store.append_many(zip(res["ids"], res["documents"], res["metadatas"]))
+        offset += page_size
+    store.flush()
+    print(f"[INDEX] Chunk store diisi dari collection: {len(store)} chunk")
+
+
+def build_bm25_from_store(store, out_dir):
+    """
+    Bangun indeks BM25 dari semua chunk PDF di chunk store (teks yang persis
+    sama dengan hasil chunk_by_structure), dibaca lewat mmap.
+    """
+    pairs = ((i, text) for i, text, m in store.items() if m.get("type") == "pdf_chunk")
+    n = build_bm25(pairs, out_dir)
+    print(f"[INDEX] BM25: {n} chunk → {out_dir}")
 
 
 def build_multimodal_index(
     pdf_folder: str = "data/articles",
     image_folder: str = "data/images",
     chroma_path: str = "chroma_db",
-    collection_name: str = "rag_medical"
+    collection_name: str = "rag_medical",
+    mode: str = "rebuild"
 ):
     """
     Entry point: bangun index multimodal menggunakan metadata dari TOC
     dan label halaman PDF.
+
+    mode="rebuild" meng-index ulang semua file; mode="update" hanya
+    meng-embed file baru/berubah dan menghapus vektor file yang
+    berubah/dihapus, berdasarkan manifest di `chroma_path`.
     """
+    os.makedirs(chroma_path, exist_ok=True)
     client = chromadb.PersistentClient(
         path=chroma_path,
         settings=Settings(anonymized_telemetry=False)
     )
     coll = client.get_or_create_collection(collection_name)
+    manifest = Manifest(os.path.join(chroma_path, MANIFEST_NAME))
+    chunks_dir = os.path.join(chroma_path, CHUNKS_DIRNAME)
+    if mode == "update":
+        store = ChunkStore(chunks_dir, writable=True)
+        if not len(store) and coll.count():
+            backfill_chunk_store(coll, store)
+    else:
+        store = ChunkStore.create(chunks_dir)
 
-    txt_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-    img_model = SentenceTransformer('clip-ViT-B-32')
+    pdfs = list_files(pdf_folder, PDF_EXTS)
+    if mode == "update":
+        # Gambar dari build lama (dulu di collection ini) ikut terhapus sebagai "removed"
+        plan = manifest.plan(pdfs)
+        to_delete, to_index = plan.to_delete, set(plan.to_index)
+        print(f"[INDEX] Rencana update: {plan}")
+    else:
+        to_delete, to_index = list(manifest.sources), set(pdfs)
+
+    stale = manifest.chunk_ids(to_delete)
+    if stale:
+        coll.delete(ids=stale)
+        store.delete(stale)
+    for fn in to_delete:
+        manifest.forget(fn)
+
+    # Model hanya dimuat bila memang ada file yang perlu di-embed
+    pdf_todo = [fn for fn in pdfs if fn in to_index]
+    if pdf_todo:
+        txt_model = load_text_model()
+        index_pdf_files(pdf_folder, coll, txt_model, files=pdf_todo, manifest=manifest, store=store)
+    store.flush()
+    if store.deleted_rows > len(store):
+        store.compact()
+    manifest.save()
+
+    bm25_dir = os.path.join(chroma_path, BM25_DIRNAME)
+    if stale or pdf_todo or not os.path.exists(bm25_dir):
+        build_bm25_from_store(store, bm25_dir)
+        build_metadata_index(store)
+
+    # Gambar: collection CLIP tersendiri (images.collection), tidak dicampur vektor teks
+    build_image_index(image_folder, client, chroma_path, mode=mode)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bangun / update index multimodal (Chroma + BM25 + gambar)")
+    parser.add_argument("--mode", choices=["rebuild", "update"], default="update")
+    parser.add_argument("--pdf_folder", default="data/articles")
+    parser.add_argument("--image_folder", default="data/images")
+    parser.add_argument("--chroma_path", default="chroma_db")
+    parser.add_argument("--collection", default="rag_medical")
+    args = parser.parse_args()
+    build_multimodal_index(args.pdf_folder, args.image_folder, args.chroma_path, args.collection, args.mode)
 
-    os.makedirs(chroma_path, exist_ok=True)
 
-    index_pdf_files(pdf_folder, coll, txt_model)
-    index_image_files(image_folder, coll, img_model)
+if __name__ == "__main__":
+    main()
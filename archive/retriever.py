@@ -1,151 +1,531 @@
 import argparse
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
-import numpy as np
-import subprocess
-import re
 import os
+import time
+from contextlib import contextmanager
+
+from src import config, services
+from src.indexer.chunk_store import ChunkStore
+from src.indexer.image_index import image_settings, load_clip
+from src.indexer.manifest import ManifestVersion
+from src.indexer.metadata_index import MetadataIndex, positions_mask, store_rows
+from src.llm.ollama_client import OllamaError, get_client, make_async_client
+from src.retriever.bm25 import BM25Index
+from src.retriever.hybrid import fuse
+from src.retriever.rerank import make_reranker
+from src.serving.answer_cache import make_answer_cache
+from src.serving.async_answer import make_service
+from src.serving.citations import CitationStream, format_answer
+from src.serving.context_packer import make_context_packer
+from src.serving.conversation import make_conversation
+from src.serving.micro_batch import MicroBatchEncoder, micro_batched
+from src.serving.tracing import bind, current, dump_prompt, make_prompt_sink, make_tracer, mark, span
+
+CHROMA_PATH = "./chroma_db"
+COLLECTION_NAME = "rag_medical"
+EMBED_MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+
+# Indeks BM25 dan manifest dibangun oleh multimodal_indexer dari chunk yang sama
+BM25_DIR = os.path.join("chroma_db", "bm25")
+MANIFEST_PATH = os.path.join("chroma_db", "manifest.json")
+# Teks + metadata chunk (mmap); Chroma cukup mengembalikan ID dan jarak
+CHUNKS_DIR = os.path.join("chroma_db", "chunks")
+RETRIEVAL_MODE = config.get("retrieval.mode", "hybrid")
+_bm25 = None
+_bm25_mtime = None
+_chunks = None
+_chunks_mtime = None
+_metadata = None  # (chunk store, MetadataIndex) — dibangun ulang bila store dimuat ulang
+_bm25_rows = None  # (bm25, store, baris store per dokumen BM25)
+
 
 # Inisialisasi ChromaDB client & collection
 def init_collection():
+    import chromadb
+    from chromadb.config import Settings
     client = chromadb.PersistentClient(
-        path="./chroma_db",
+        path=CHROMA_PATH,
         settings=Settings(anonymized_telemetry=False)
     )
-    return client.get_or_create_collection("rag_medical")
+    return client.get_or_create_collection(COLLECTION_NAME)
 
-collection = init_collection()
-embed_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
 
+def init_image_collection():
+    # Collection CLIP terpisah (images.collection); None bila gambar belum pernah di-index
+    import chromadb
+    from chromadb.config import Settings
+    client = chromadb.PersistentClient(path=CHROMA_PATH, settings=Settings(anonymized_telemetry=False))
+    try:
+        return client.get_collection(image_settings()["collection"])
+    except Exception:
+        return None
 
-def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
-    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b) + 1e-8))
 
+def init_embed_model():
+    from sentence_transformers import SentenceTransformer
+    from src.indexer.embedding_cache import CachedSentenceTransformer
+    # Query berulang diambil dari cache embedding, bukan di-encode ulang
+    model = CachedSentenceTransformer(SentenceTransformer(EMBED_MODEL_NAME), EMBED_MODEL_NAME)
+    # Query dari sesi bersamaan digabung menjadi satu forward pass
+    return micro_batched(model) if config.get("query_batching.enabled", True) else model
 
-def retrieve_and_rerank(query: str, coarse_k: int = 20, final_k: int = 5) -> list:
-    q_emb = embed_model.encode(query)
-    results = collection.query(
-        query_embeddings=[q_emb.tolist()],
-        n_results=coarse_k,
-        include=["documents","metadatas","embeddings"]
-    )
-    docs, metas, embs = (
-        results['documents'][0],
-        results['metadatas'][0],
-        results['embeddings'][0]
-    )
-    scores = [(cosine_similarity(q_emb, np.array(e)), i) for i, e in enumerate(embs)]
-    scores.sort(key=lambda x: x[0], reverse=True)
+
+def warmup_embed_model(m):
+    # Lewati micro-batcher dan cache agar forward pass benar-benar dijalankan
+    if isinstance(m, MicroBatchEncoder):
+        m = m.model
+    m.model.encode(["warmup"])
+
+
+# Model, collection, dan klien LLM dimuat lazy lewat registry (bukan saat import)
+services.register("chroma_collection", init_collection)
+services.register("image_collection", init_image_collection)
+# Encoder teks CLIP untuk query teks → gambar (ruang vektor yang sama dengan gambar)
+services.register("clip_text_encoder", lambda: load_clip(image_settings()["text_model"]))
+services.register("query_embedder", init_embed_model, warmup=warmup_embed_model)
+services.register("reranker", make_reranker)
+services.register("llm", get_client, warmup=lambda c: c.preload())
+# Cache jawaban: dikosongkan otomatis saat versi manifest index berubah
+services.register("answer_cache", lambda: make_answer_cache(
+    ManifestVersion(MANIFEST_PATH), lambda q: services.get("query_embedder").encode(q)))
+# Span per request (ring buffer in-process) dan dump prompt opt-in (tracing.* di config)
+services.register("tracer", make_tracer)
+services.register("prompt_sink", make_prompt_sink)
+# Konteks prompt dipangkas ke anggaran token (context.* di config); None = teks chunk penuh
+services.register("context_packer", make_context_packer)
+
+
+def make_hit(doc: str, m: dict, score: float, rank_idx: int) -> dict:
+    chapter = m.get('chapters') or m.get('chapter') or '–'
+    section = m.get('sections') or m.get('section') or '–'
+    return {
+        'chunk': doc,
+        'metadata': m,
+        'book': m.get('book') or m.get('source'),
+        'chapters': chapter,
+        'sections': section,
+        'pages': m.get('pages') or '–',
+        'score': score,
+        'rank': rank_idx
+    }
+
+
+def get_bm25():
+    """Indeks BM25 dari build terakhir (dimuat ulang bila di-rebuild); None bila belum ada."""
+    global _bm25, _bm25_mtime
+    meta = os.path.join(BM25_DIR, "meta.json")
+    if not os.path.exists(meta):
+        return None
+    mtime = os.path.getmtime(meta)
+    if _bm25 is None or mtime != _bm25_mtime:
+        _bm25, _bm25_mtime = BM25Index(BM25_DIR), mtime
+    return _bm25
+
+
+def get_chunk_store():
+    """Chunk store dari build terakhir (dimuat ulang bila berubah); None bila belum ada."""
+    global _chunks, _chunks_mtime
+    meta = os.path.join(CHUNKS_DIR, "meta.json")
+    if not os.path.exists(meta):
+        return None
+    mtime = os.path.getmtime(meta)
+    if _chunks is None or mtime != _chunks_mtime:
+        _chunks, _chunks_mtime = ChunkStore(CHUNKS_DIR), mtime
+    return _chunks
+
+
+def get_metadata_index():
+    """Bitmap buku/bab/subbab/tipe untuk chunk store terkini; None bila belum ada store."""
+    global _metadata
+    store = get_chunk_store()
+    if store is None:
+        return None
+    if _metadata is None or _metadata[0] is not store:
+        _metadata = (store, MetadataIndex.load_for(store))
+    return _metadata[1]
+
+
+def bm25_mask(bm25, mask):
+    """Mask per baris chunk store -> mask per dokumen BM25 (pemetaan di-cache per build)."""
+    global _bm25_rows
+    store = get_chunk_store()
+    if _bm25_rows is None or _bm25_rows[0] is not bm25 or _bm25_rows[1] is not store:
+        _bm25_rows = (bm25, store, store_rows(store, bm25.ids))
+    return positions_mask(mask, _bm25_rows[2])
+
+
+def source_options(books=None) -> dict:
+    """Pilihan filter untuk UI: semua buku, dan bab yang ada di `books` terpilih (semua bila kosong)."""
+    meta = get_metadata_index()
+    if meta is None:
+        return {"book": [], "chapter": []}
+    within = meta.mask({"book": books}) if books else None
+    return {"book": meta.values("book"), "chapter": meta.values("chapter", within=within)}
+
+
+def attach_text(hits: list) -> list:
+    """Isi hit['chunk'] yang masih kosong: dari chunk store, sisanya dari Chroma."""
+    todo = [h for h in hits if h['chunk'] is None]
+    if not todo:
+        return hits
+    with span("fetch_text"):
+        return _attach_text(todo, hits)
+
+
+def _attach_text(todo: list, hits: list) -> list:
+    store = get_chunk_store()
+    if store is not None:
+        for h, text in zip(todo, store.texts([h['id'] for h in todo])):
+            h['chunk'] = text
+        todo = [h for h in todo if h['chunk'] is None]
+    if todo:
+        res = services.get("chroma_collection").get(ids=[h['id'] for h in todo], include=["documents"])
+        docs = dict(zip(res['ids'], res['documents']))
+        for h in todo:
+            h['chunk'] = docs.get(h['id'], "")
+    return hits
+
+
+def retrieve(query: str, k: int = 5, mode: str = RETRIEVAL_MODE, candidates: int = None,
+             with_embeddings: bool = False, with_text: bool = True, filters: dict = None) -> list:
+    """
+    Satu API retrieval: mode "dense" (Chroma), "sparse" (BM25) atau
+    "hybrid" (keduanya, digabung dengan reciprocal rank fusion).
+    with_embeddings=True menyertakan hit['embedding'] untuk DenseReranker.
+    with_text=False menunda pembacaan teks (hit['chunk'] = None) sampai
+    attach_text() dipanggil untuk hit final.
+    filters={"book"|"chapter"|"section"|"type": nilai atau [nilai]} diterapkan
+    di dalam pencarian (`where` Chroma, mask BM25), bukan setelah top-k.
+    """
+    collection = services.get("chroma_collection")
+    store = get_chunk_store()
+    where = mask = None
+    if filters:
+        meta = get_metadata_index()
+        if meta is None:
+            raise RuntimeError("Filter metadata membutuhkan chunk store; jalankan indexer mode update")
+        with span("metadata_filter"):
+            mask = meta.mask(filters)
+            where = meta.where(filters)
+        if mask is not None and not mask.any():
+            return []
+    # Dengan chunk store, Chroma hanya mengembalikan ID + jarak (+ embedding)
+    payload = ["documents", "metadatas"] if store is None else []
+    extra = ["embeddings"] if with_embeddings else []
+    found = {}
+
+    def dense_fn(q, n):
+        with span("embed_query"):
+            q_emb = services.get("query_embedder").encode(q)
+        with span("vector_search"):
+            res = collection.query(
+                query_embeddings=[q_emb.tolist()],
+                n_results=n,
+                where=where,
+                include=payload + extra + ["distances"]
+            )
+        ranked = []
+        for pos, (i, dist) in enumerate(zip(res['ids'][0], res['distances'][0])):
+            found[i] = {key: res[key][0][pos] for key in payload + extra}
+            ranked.append((i, -float(dist)))  # jarak kecil = lebih relevan
+        return ranked
+
+    def sparse_fn(q, n):
+        with span("bm25"):
+            return bm25.search(q, n, mask=sparse_mask)
+
+    bm25 = get_bm25()
+    sparse_mask = bm25_mask(bm25, mask) if bm25 is not None and mask is not None else None
+    ranked = fuse(query, k, mode, dense_fn, sparse_fn if bm25 else None, candidates)
+    with span("fetch_metadata"):
+        hits = _make_hits(collection, store, ranked, found, extra, with_embeddings)
+    return attach_text(hits) if with_text else hits
+
+
+def _make_hits(collection, store, ranked, found, extra, with_embeddings) -> list:
+    ids = [i for i, _ in ranked]
+    if store is not None:
+        # Metadata kolumnar dari store; teks hanya bila diminta
+        for i, m in zip(ids, store.metadatas(ids)):
+            if m is not None:
+                found.setdefault(i, {})['metadatas'] = m
+    # ID yang tidak ada di store / hasil dense: ambil dari Chroma
+    missing = [i for i in ids if 'metadatas' not in found.get(i, {})]
+    if missing:
+        res = collection.get(ids=missing, include=["documents", "metadatas"] + extra)
+        for pos, i in enumerate(res['ids']):
+            found.setdefault(i, {}).update({key: res[key][pos] for key in ["documents", "metadatas"] + extra})
+    need_emb = [i for i in ids if with_embeddings and i in found and 'embeddings' not in found[i]]
+    if need_emb:
+        res = collection.get(ids=need_emb, include=extra)
+        for i, e in zip(res['ids'], res['embeddings']):
+            found[i]['embeddings'] = e
     hits = []
-    for rank_idx, (score, idx) in enumerate(scores[:final_k], start=1):
-        m = metas[idx]
-        chapter = m.get('chapters') or m.get('chapter') or '–'
-        section = m.get('sections') or m.get('section') or '–'
-        hits.append({
-            'chunk': docs[idx],
-            'metadata': m,
-            'book': m.get('book') or m.get('source'),
-            'chapters': chapter,
-            'sections': section,
-            'pages': m.get('pages') or '–',
-            'score': score,
-            'rank': rank_idx
-        })
+    for i, score in ranked:
+        if 'metadatas' not in found.get(i, {}):
+            continue
+        f = found[i]
+        hit = make_hit(f.get('documents'), f['metadatas'], score, len(hits) + 1)
+        hit['id'] = i
+        if with_embeddings:
+            hit['embedding'] = f.get('embeddings')
+        hits.append(hit)
     return hits
 
 
-def build_prompt(query: str, hits: list) -> str:
-    system = (
-        "Anda adalah asisten medis. Jawab dengan parafrase, "
-        "sisipkan inline citation [1], [2], … di akhir setiap poin. "
-        "Di akhir, tuliskan daftar referensi.\n"
-    )
+def search_images(query: str, k: int = 4) -> list:
+    """Gambar paling relevan untuk query teks: [{'id', 'source', 'score', 'metadata'}]."""
+    collection = services.get("image_collection")
+    if collection is None:
+        return []
+    with span("embed_query_clip"):
+        q_emb = services.get("clip_text_encoder").encode([query])[0]
+    with span("image_search"):
+        res = collection.query(query_embeddings=[q_emb.tolist()], n_results=k,
+                               include=["metadatas", "distances"])
+    return [
+        {'id': i, 'source': m.get('source'), 'score': 1.0 - float(d), 'metadata': m}
+        for i, m, d in zip(res['ids'][0], res['metadatas'][0], res['distances'][0])
+    ]
+
+
+def retrieve_and_rerank(query: str, coarse_k: int = 20, final_k: int = 5, mode: str = RETRIEVAL_MODE,
+                        filters: dict = None) -> list:
+    """
+    Dua tahap: `coarse_k` kandidat dari retrieve() (terfilter bila `filters`),
+    lalu reranker (config rerank.method) memilih `final_k` teratas.
+    """
+    reranker = services.get("reranker")
+    hits = retrieve(query, k=coarse_k, mode=mode, candidates=coarse_k, filters=filters,
+                    with_embeddings=reranker.needs_embeddings, with_text=reranker.needs_text)
+    with span("rerank"):
+        q_emb = services.get("query_embedder").encode(query) if reranker.needs_embeddings else None
+        hits = reranker.rerank(query, hits, final_k, q_emb=q_emb)
+    # Teks chunk hanya dibaca untuk final_k hit yang lolos rerank
+    return attach_text(hits)
+
+
+# Prefix prompt yang identik di setiap request (dan setiap giliran sesi), sehingga
+# prefix KV cache LLM bisa dipakai ulang; bagian yang berubah selalu di ujung.
+SYSTEM_PROMPT = (
+    "Anda adalah asisten medis. Jawab dengan parafrase, "
+    "sisipkan inline citation [1], [2], … di akhir setiap poin. "
+    "Di akhir, tuliskan daftar referensi.\n"
+)
+
+
+def format_context(hits: list, start: int = 1) -> str:
+    """Sumber bernomor `[start]`, `[start+1]`, … dengan metadata sitasinya."""
     context_lines = []
-    for i, hit in enumerate(hits, start=1):
+    for i, hit in enumerate(hits, start=start):
         parts = [hit['book']]
         if hit['chapters'] != '–': parts.append(hit['chapters'])
         if hit['sections'] != '–': parts.append(hit['sections'])
         parts.append(f"Halaman {hit['pages']}")
         meta_str = ", ".join(parts)
         context_lines.append(f"[{i}] {hit['chunk']} — {meta_str}")
-    context = "\n".join(context_lines)
+    return "\n".join(context_lines)
+
+
+def build_prompt(query: str, hits: list) -> str:
     prompt = (
-        f"{system}Pertanyaan: {query}\nKonteks:\n{context}\nJawaban akhir:"
+        f"{SYSTEM_PROMPT}Konteks:\n{format_context(hits)}\nPertanyaan: {query}\nJawaban akhir:"
     )
-    with open('last_prompt.txt','w',encoding='utf-8') as f:
-        f.write(prompt)
+    log_prompt(query, prompt)
     return prompt
 
 
+def log_prompt(query: str, prompt: str, extra: dict = None):
+    # Dump prompt untuk debug: opt-in, di-sampling, ditulis thread latar
+    dump_prompt(services.get("prompt_sink"), query, prompt, extra)
+
+
 def post_process(raw: str, hits: list) -> str:
-    text = raw.strip()
-    # Tentukan jumlah referensi unik yang akan ditampilkan
-    unique_keys = []
-    for hit in hits:
-        m = hit['metadata']
-        key = (hit['book'], hit['chapters'], hit['sections'], hit['pages'])
-        if key not in unique_keys:
-            unique_keys.append(key)
-    n_refs = len(unique_keys)
-
-    # Jika model tidak menyisipkan citation, tambahkan hanya untuk kalimat hingga jumlah referensi
-    if not re.search(r"\[\d+\]", text):
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        new_sents = []
-        for idx, s in enumerate(sentences, start=1):
-            s = s.strip()
-            if idx <= n_refs and not re.search(r"\[\d+\]$", s):
-                new_sents.append(f"{s} [{idx}]")
-            else:
-                new_sents.append(s)
-        text = ' '.join(new_sents)
-
-    # Normalisasi nomor citation sesuai urutan unik
-    nums = [int(n) for n in re.findall(r"\[(\d+)\]", text)]
-    def repl(m):
-        num = int(m.group(1))
-        # Map original num to its index in citation order (1..n_refs)
-        return f"[{nums.index(num)+1}]"
-    text = re.sub(r"\[(\d+)\]", repl, text)
-
-    # Bangun daftar referensi
-    refs = []
-    for idx, key in enumerate(unique_keys, start=1):
-        book, chap, sec, page = key
-        parts = [book]
-        if chap != '–': parts.append(f"Bab: {chap}")
-        if sec != '–': parts.append(f"Subbab: {sec}")
-        parts.append(f"Halaman {page}")
-        refs.append(f"{idx}. {', '.join(parts)}")
-
-    return f"{text}\n\nReferensi:\n" + "\n".join(refs)
-
-
-def generate_answer(query: str, top_k: int = 5) -> str:
-    hits = retrieve_and_rerank(query, coarse_k=top_k*4, final_k=top_k)
+    """Jawaban final: <think> dibuang, sitasi dipetakan ke referensi unik, daftar referensi di akhir."""
+    return format_answer(raw, hits)
+
+
+@contextmanager
+def request_trace(name: str, **attrs):
+    """Trace satu request chat (None bila tracing dimatikan); status di trace.attrs."""
+    tracer = services.get("tracer")
+    tr = tracer.start(name, **attrs) if tracer else None
+    try:
+        yield tr
+    except BaseException as e:
+        if tr is not None:
+            tr.attrs.setdefault("status", type(e).__name__)
+        raise
+    finally:
+        if tr is not None:
+            tr.attrs.setdefault("status", "ok")
+            tracer.finish(tr)
+
+
+def timed_tokens(tokens, tr):
+    """Teruskan token LLM sambil mencatat llm_ttft, first_token (sejak awal request) dan llm_total."""
+    t0 = time.perf_counter()
+    first = True
+    for token in tokens:
+        if first:
+            mark("llm_ttft", t0, tr)
+            mark("first_token", None, tr)
+            first = False
+        yield token
+    mark("llm_total", t0, tr)
+
+
+def generate_answer(query: str, top_k: int = 5, filters: dict = None) -> str:
+    with request_trace("chat", top_k=top_k) as tr:
+        return bind(_generate_answer, tr)(query, top_k, tr, filters)
+
+
+def _generate_answer(query: str, top_k: int, tr, filters: dict = None) -> str:
+    # Cache jawaban dikunci pada (query, top_k): jawaban terfilter tidak disimpan/diambil
+    cache = services.get("answer_cache") if not filters else None
+    with span("cache_lookup"):
+        cached = cache.get(query, top_k) if cache else None
+    if cached is not None:
+        if tr is not None:
+            tr.attrs["status"] = "cache_hit"
+        return cached
+    t0 = time.perf_counter()
+    hits = _retrieve_for_answer(query, top_k, filters)
     if not hits:
         return "Tidak ditemukan konteks."
-    prompt = build_prompt(query, hits)
-    proc = subprocess.run(
-        ['ollama', 'run', 'registry.ollama.ai/library/deepseek-r1:7b'],
-        input=prompt,
-        text=True,
-        encoding='utf-8',
-        errors='replace',
-        capture_output=True
-    )
-    if proc.returncode != 0:
-        return f"Model error: {proc.stderr.strip()}"
-    return post_process(proc.stdout, hits)
+    with span("build_prompt"):
+        prompt = build_prompt(query, hits)
+    try:
+        raw = "".join(timed_tokens(services.get("llm").stream(prompt), tr))
+    except OllamaError as e:
+        if tr is not None:
+            tr.attrs["status"] = "llm_error"
+        return f"Model error: {e}"
+    with span("post_process"):
+        answer = post_process(raw, hits)
+    if cache:
+        cache.put(query, top_k, answer, time.perf_counter() - t0)
+    return answer
+
+
+def stream_answer(query: str, top_k: int = 5, filters: dict = None):
+    """
+    Seperti generate_answer, tetapi yield jawaban parsial setiap kali token
+    baru tiba; yield terakhir adalah jawaban final hasil post_process.
+    """
+    with request_trace("chat_stream", top_k=top_k) as tr:
+        # Generator: trace dipasang per langkah lewat bind(), bukan di konteks pemanggil
+        cache = services.get("answer_cache") if not filters else None
+        with span("cache_lookup", tr):
+            cached = cache.get(query, top_k) if cache else None
+        if cached is not None:
+            if tr is not None:
+                tr.attrs["status"] = "cache_hit"
+            yield cached
+            return
+        t0 = time.perf_counter()
+        hits = bind(_retrieve_for_answer, tr)(query, top_k, filters)
+        if not hits:
+            yield "Tidak ditemukan konteks."
+            return
+        with span("build_prompt", tr):
+            prompt = bind(build_prompt, tr)(query, hits)
+        # Sitasi ditulis ulang dan <think> dibuang saat token tiba
+        cs = CitationStream(hits)
+        try:
+            for token in timed_tokens(services.get("llm").stream(prompt), tr):
+                if cs.feed(token):
+                    yield cs.text
+        except OllamaError as e:
+            if tr is not None:
+                tr.attrs["status"] = "llm_error"
+            yield f"Model error: {e}"
+            return
+        with span("post_process", tr):
+            answer = cs.finish()
+        if cache:
+            cache.put(query, top_k, answer, time.perf_counter() - t0)
+        yield answer
+
+
+def pack_context(query: str, hits: list) -> list:
+    """Hit dengan teks dipangkas ke anggaran token prompt; apa adanya bila packer dimatikan."""
+    packer = services.get("context_packer")
+    if packer is None or not hits:
+        return hits
+    with span("pack_context"):
+        hits, stats = packer.pack(query, hits)
+    tr = current()
+    if tr is not None:
+        tr.attrs.update(stats.as_attrs())
+    return hits
+
+
+def _retrieve_for_answer(query: str, top_k: int, filters: dict = None) -> list:
+    return pack_context(query, retrieve_and_rerank(query, coarse_k=top_k*4, final_k=top_k, filters=filters))
+
+
+services.register("answer_service", lambda: make_service(
+    _retrieve_for_answer, build_prompt, post_process, make_async_client(),
+    cache=services.get("answer_cache"), tracer=services.get("tracer"), stream_formatter=CitationStream,
+    conversation=make_conversation(SYSTEM_PROMPT, format_context), dump_prompt_fn=log_prompt))
+
+
+def answer_cache_stats() -> dict:
+    """Hit rate (exact/semantik) dan total detik yang dihemat cache jawaban."""
+    cache = services.get("answer_cache")
+    return cache.stats() if cache else {}
+
+
+def latency_breakdown(n: int = None) -> dict:
+    """p50/p95 per span (embed_query, vector_search, rerank, llm_ttft, ...) dari n trace terakhir."""
+    tracer = services.get("tracer")
+    return tracer.summary(n) if tracer else {}
+
+
+def metrics_text() -> str:
+    """Histogram span per request dalam format teks Prometheus."""
+    tracer = services.get("tracer")
+    return tracer.prometheus_text() if tracer else ""
+
+
+async def astream_answer(query: str, top_k: int = 5, session_id: str = None, filters: dict = None):
+    """
+    Versi asyncio dari stream_answer untuk banyak sesi bersamaan: retrieval
+    di thread pool terbatas, token LLM di-stream async, dengan batas antrean
+    dan timeout (lihat serving.* di config.yml). Dengan `session_id`,
+    pertanyaan melanjutkan percakapan sesi itu (conversation.* di config);
+    `filters` membatasi sumber (buku/bab/subbab/tipe, lihat retrieve).
+    """
+    service = services.get("answer_service")
+    async for partial in service.stream_answer(query, top_k=top_k, session_id=session_id, filters=filters):
+        yield partial
+
+
+def reset_conversation(session_id: str):
+    """Lupakan riwayat, chunk, dan context LLM sebuah sesi (mis. chat dikosongkan)."""
+    conv = services.get("answer_service").conversation
+    if conv is not None:
+        conv.store.drop(session_id)
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('-q','--query',required=True)
     parser.add_argument('-k','--top_k',type=int,default=5)
+    parser.add_argument('--book', action='append', help="batasi ke buku ini (boleh berulang)")
+    parser.add_argument('--chapter', action='append', help="batasi ke bab ini (boleh berulang)")
+    parser.add_argument('--images', type=int, default=0, help="tampilkan juga N gambar terkait (CLIP)")
+    parser.add_argument('--images_only', action='store_true', help="hanya cari gambar, tanpa jawaban LLM")
     args = parser.parse_args()
-    print(generate_answer(args.query, top_k=args.top_k))
+    filters = {k: v for k, v in (("book", args.book), ("chapter", args.chapter)) if v} or None
+    if not args.images_only:
+        print(generate_answer(args.query, top_k=args.top_k, filters=filters))
+    if args.images or args.images_only:
+        images = search_images(args.query, k=args.images or 4)
+        if not images:
+            print("[✗] Belum ada gambar ter-index")
+        for img in images:
+            print(f"[IMG] {img['score']:.3f}  {img['source']}")
 
 if __name__=='__main__':
     main()
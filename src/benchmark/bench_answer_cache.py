@@ -0,0 +1,85 @@
+"""
+Benchmark cache jawaban pada beban pertanyaan klinis berulang (distribusi
+Zipf): hit rate exact/semantik, latensi rata-rata dengan vs tanpa cache,
+dan detik yang dihemat. Generasi (retrieval + LLM) disimulasikan dengan
+sleep; embedding memakai StubEmbedder (cosine antar-parafrase lebih rendah
+dari model sungguhan, karena itu --threshold default 0.8 di sini).
+
+    python -m src.benchmark.bench_answer_cache --requests 400 --gen_ms 50
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.benchmark.stub_embedder import StubEmbedder
+from src.serving.answer_cache import AnswerCache
+
+QUESTIONS = [
+    "apa itu sciatica", "pemeriksaan awal nyeri dada akut", "dosis metformin untuk diabetes tipe 2",
+    "tatalaksana stroke iskemik akut", "kriteria diagnosis sepsis", "antibiotik pneumonia komunitas",
+    "tanda gagal jantung kongestif", "interpretasi troponin meningkat", "penyebab anemia defisiensi besi",
+    "terapi awal hipertensi esensial", "gejala hepatitis b kronik", "indikasi dialisis gagal ginjal",
+]
+# Variasi permukaan (tingkat exact) dan parafrase ringan (tingkat semantik)
+SURFACE = ["{q}", "{Q}?", "  {q} ?", "{Q}"]
+PARAPHRASE = ["tolong jelaskan {q}", "{q} menurut pedoman", "{q} pada pasien dewasa"]
+
+
+def workload(n, seed=0, paraphrase_rate=0.2):
+    rng = np.random.default_rng(seed)
+    ranks = np.arange(1, len(QUESTIONS) + 1)
+    p = 1.0 / ranks
+    p /= p.sum()
+    out = []
+    for _ in range(n):
+        q = QUESTIONS[rng.choice(len(QUESTIONS), p=p)]
+        tmpl = (rng.choice(PARAPHRASE) if rng.random() < paraphrase_rate else rng.choice(SURFACE))
+        out.append(tmpl.format(q=q, Q=q.capitalize()))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--gen_ms", type=float, default=50.0, help="biaya simulasi retrieval + LLM")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--invalidate_every", type=int, default=200,
+                        help="ganti versi index setiap N request (0 = tidak pernah)")
+    args = parser.parse_args()
+
+    emb = StubEmbedder()
+    version = {"v": "v0"}
+    queries = workload(args.requests)
+
+    def generate(q):
+        time.sleep(args.gen_ms / 1000)
+        return f"jawaban untuk {q}"
+
+    t0 = time.perf_counter()
+    for q in queries:
+        generate(q)
+    base = (time.perf_counter() - t0) / len(queries)
+
+    for label, threshold in (("exact", None), ("exact+semantik", args.threshold)):
+        cache = AnswerCache(lambda: version["v"], emb.encode, semantic_threshold=threshold)
+        version["v"] = "v0"
+        lat = []
+        for i, q in enumerate(queries):
+            if args.invalidate_every and i and i % args.invalidate_every == 0:
+                version["v"] = f"v{i}"  # manifest berubah setelah update index
+            t = time.perf_counter()
+            if cache.get(q, 5) is None:
+                g = time.perf_counter()
+                answer = generate(q)
+                cache.put(q, 5, answer, time.perf_counter() - g)
+            lat.append(time.perf_counter() - t)
+        s = cache.stats()
+        print(f"[{label}] hit rate {s['hit_rate']:.1%} (exact {s['exact_hits']}, "
+              f"semantik {s['semantic_hits']}, miss {s['misses']}), invalidasi {s['invalidations']}")
+        print(f"    latensi rata-rata {1000 * np.mean(lat):.1f} ms vs {1000 * base:.1f} ms tanpa cache, "
+              f"p50 {1000 * np.percentile(lat, 50):.2f} ms, dihemat {s['saved_seconds']:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
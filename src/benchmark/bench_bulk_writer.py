@@ -0,0 +1,122 @@
+"""
+Benchmark ingestion ke Chroma: jalur lama (encode satu chunk + add satu ID
+per chunk) vs BulkWriter (encode per batch, upsert per write_batch).
+
+Tanpa chromadb dipakai collection in-memory dengan biaya tetap per request
+(`--call_ms`, round trip + commit SQLite/HNSW) dan per item (`--item_us`);
+dengan `--chroma` dipakai PersistentClient sungguhan di direktori sementara.
+
+    python -m src.benchmark.bench_bulk_writer --docs 20 --chunks 500
+    python -m src.benchmark.bench_bulk_writer --chroma
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+from src.benchmark.stub_embedder import StubEmbedder, synthetic_corpus
+from src.indexer.bulk_writer import BulkWriter
+
+
+class SimCollection:
+    """Pengganti collection Chroma: dict id -> item, biaya simulasi per request."""
+
+    def __init__(self, call_s: float = 0.0, item_s: float = 0.0):
+        self.call_s = call_s
+        self.item_s = item_s
+        self.rows = {}
+        self.requests = 0
+
+    def _put(self, ids, documents, embeddings, metadatas, replace):
+        self.requests += 1
+        time.sleep(self.call_s + self.item_s * len(ids))
+        for i, d, e, m in zip(ids, documents, embeddings, metadatas):
+            if i in self.rows and not replace:
+                continue  # Chroma add(): ID yang sudah ada diabaikan
+            self.rows[i] = (d, e, m)
+
+    def add(self, ids, documents, embeddings, metadatas):
+        self._put(ids, documents, embeddings, metadatas, replace=False)
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        self._put(ids, documents, embeddings, metadatas, replace=True)
+
+    def count(self):
+        return len(self.rows)
+
+
+def chunks_of(n_docs, chunks_per_doc):
+    for d, chunks in enumerate(synthetic_corpus(n_docs, chunks_per_doc)):
+        for c, text in enumerate(chunks):
+            yield f"buku{d}.pdf_chunk{c}", text, {"source": f"buku{d}.pdf", "type": "pdf_chunk"}
+
+
+def legacy(collection, model, items):
+    """Salinan jalur lama index_pdf_files."""
+    for chunk_id, text, meta in items:
+        emb = model.encode(text).tolist()
+        collection.add(ids=[chunk_id], documents=[text], embeddings=[emb], metadatas=[meta])
+
+
+def bulk(collection, model, items, encode_batch, write_batch):
+    writer = BulkWriter(collection, model.encode, encode_batch=encode_batch,
+                        write_batch=write_batch, report_every=0)
+    for chunk_id, text, meta in items:
+        writer.add(chunk_id, text, meta)
+    writer.flush()
+    return writer.stats
+
+
+def make_collection(args, tmp, name):
+    if not args.chroma:
+        return SimCollection(args.call_ms / 1000, args.item_us / 1e6)
+    import chromadb
+    from chromadb.config import Settings
+    client = chromadb.PersistentClient(path=f"{tmp}/{name}", settings=Settings(anonymized_telemetry=False))
+    return client.get_or_create_collection(name)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=10)
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--encode_batch", type=int, default=256)
+    parser.add_argument("--write_batch", type=int, default=2000)
+    parser.add_argument("--encode_call_ms", type=float, default=4.0, help="overhead tetap per forward pass")
+    parser.add_argument("--encode_text_ms", type=float, default=0.3, help="biaya encode per chunk dalam batch")
+    parser.add_argument("--call_ms", type=float, default=3.0, help="biaya tetap per request collection")
+    parser.add_argument("--item_us", type=float, default=20.0, help="biaya per item di collection")
+    parser.add_argument("--chroma", action="store_true", help="pakai chromadb PersistentClient")
+    args = parser.parse_args()
+
+    items = list(chunks_of(args.docs, args.chunks))
+    tmp = tempfile.mkdtemp(prefix="bench_bulk_")
+    try:
+        print(f"[→] {len(items)} chunk ({args.docs} dokumen), "
+              f"{'chromadb' if args.chroma else 'collection simulasi'}")
+        model = StubEmbedder(cost_per_text=args.encode_text_ms / 1000, cost_per_call=args.encode_call_ms / 1000)
+        coll = make_collection(args, tmp, "legacy")
+        t0 = time.perf_counter()
+        legacy(coll, model, items)
+        old_s = time.perf_counter() - t0
+        print(f"[lama] {old_s:7.2f} s  {len(items) / old_s:8,.0f} chunk/s  "
+              f"({model.calls} encode, {len(items)} add)")
+
+        model = StubEmbedder(cost_per_text=args.encode_text_ms / 1000, cost_per_call=args.encode_call_ms / 1000)
+        coll = make_collection(args, tmp, "bulk")
+        t0 = time.perf_counter()
+        stats = bulk(coll, model, items, args.encode_batch, args.write_batch)
+        new_s = time.perf_counter() - t0
+        print(f"[baru] {new_s:7.2f} s  {len(items) / new_s:8,.0f} chunk/s  "
+              f"({stats.encode_calls} encode, {stats.write_calls} upsert)")
+
+        # Restart di tengah jalan: ulangi separuh korpus, jumlah item tidak berubah
+        bulk(coll, model, items[: len(items) // 2], args.encode_batch, args.write_batch)
+        print(f"[→] Percepatan {old_s / new_s:.1f}×; setelah ulang separuh korpus: "
+              f"{coll.count()} item (harus {len(items)})")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
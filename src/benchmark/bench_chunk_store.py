@@ -0,0 +1,128 @@
+"""
+Benchmark chunk store (mmap) vs docstore pickle in-RAM: waktu muat,
+tambahan RSS setelah muat, dan latensi mengambil teks top-k. Tiap varian
+dimuat di proses baru agar RSS tidak saling memengaruhi.
+
+Docstore meniru InMemoryDocstore LangChain: dict id -> objek Document
+(page_content + metadata) yang di-pickle bersama index_to_docstore_id.
+
+    python -m src.benchmark.bench_chunk_store --docs 2000 --chunks_per_doc 100
+"""
+import argparse
+import json
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from src.benchmark.stub_embedder import synthetic_corpus
+from src.indexer.chunk_store import ChunkStore
+
+
+class Document:
+    """Pengganti ringan langchain Document agar pickle bisa dibaca tanpa langchain."""
+
+    def __init__(self, page_content, metadata):
+        self.page_content = page_content
+        self.metadata = metadata
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def items(n_docs, chunks_per_doc, words):
+    for d, chunks in enumerate(synthetic_corpus(n_docs, chunks_per_doc, words)):
+        for c, text in enumerate(chunks):
+            yield f"buku{d}.pdf_chunk{c}", text, {
+                "source": f"buku{d}.pdf", "book": f"Buku Ajar {d}", "chapters": f"Bab {c // 10 + 1}",
+                "sections": f"Subbab {c % 10 + 1}", "pages": f"{c * 2 + 1}, {c * 2 + 2}", "type": "pdf_chunk",
+            }
+
+
+def measure(kind, path, ids_path, k, repeat):
+    """Dijalankan di proses anak: muat, ukur RSS, lalu ambil teks top-k acak."""
+    import random
+    with open(ids_path, encoding="utf-8") as f:
+        ids = f.read().split("\n")
+    rng = random.Random(0)
+    queries = [rng.sample(ids, k) for _ in range(repeat)]
+    before = rss_mb()
+    t0 = time.perf_counter()
+    if kind == "docstore":
+        with open(path, "rb") as f:
+            docstore, _ = pickle.load(f)
+        fetch = lambda q: [(docstore[i].page_content, docstore[i].metadata) for i in q]  # noqa: E731
+    else:
+        store = ChunkStore(path)
+        store.row_of  # peta ID dibangun saat muat, bukan saat query pertama
+        fetch = store.get
+    load_s = time.perf_counter() - t0
+    rss = rss_mb() - before
+    t0 = time.perf_counter()
+    for q in queries:
+        fetch(q)
+    fetch_us = 1e6 * (time.perf_counter() - t0) / repeat
+    print(json.dumps({"load_s": load_s, "rss_mb": rss, "fetch_us": fetch_us}))
+
+
+def run_child(kind, path, ids_path, k, repeat):
+    out = subprocess.run(
+        [sys.executable, "-m", "src.benchmark.bench_chunk_store", "--child", kind, path, ids_path,
+         "--k", str(k), "--repeat", str(repeat)],
+        capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument("--chunks_per_doc", type=int, default=100)
+    parser.add_argument("--words", type=int, default=150)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--child", nargs=3, metavar=("KIND", "PATH", "IDS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        measure(*args.child, args.k, args.repeat)
+        return
+
+    tmp = tempfile.mkdtemp(prefix="bench_chunks_")
+    try:
+        docstore, ids = {}, []
+        store = ChunkStore.create(os.path.join(tmp, "chunks"))
+        t0 = time.perf_counter()
+        for chunk_id, text, meta in items(args.docs, args.chunks_per_doc, args.words):
+            store.append(chunk_id, text, meta)
+            docstore[chunk_id] = Document(text, meta)
+            ids.append(chunk_id)
+        store.flush()
+        write_s = time.perf_counter() - t0
+        pkl = os.path.join(tmp, "index.pkl")
+        with open(pkl, "wb") as f:
+            pickle.dump((docstore, dict(enumerate(ids))), f)
+        del docstore
+        ids_path = os.path.join(tmp, "ids.txt")
+        with open(ids_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(ids))
+        store_mb = sum(os.path.getsize(os.path.join(store.path, fn)) for fn in os.listdir(store.path)) / 2**20
+
+        print(f"[→] {len(ids)} chunk, pickle {os.path.getsize(pkl) / 2**20:.0f} MB, "
+              f"chunk store {store_mb:.0f} MB (tulis {write_s:.1f} s)")
+        print(f"{'varian':>12} {'muat s':>8} {'RSS MB':>8} {f'ambil top-{args.k} µs':>16}")
+        for kind, path in (("docstore", pkl), ("chunk_store", store.path)):
+            r = run_child(kind, path, ids_path, args.k, args.repeat)
+            print(f"{kind:>12} {r['load_s']:8.2f} {r['rss_mb']:8.0f} {r['fetch_us']:16.1f}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
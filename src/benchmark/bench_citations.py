@@ -0,0 +1,126 @@
+"""
+Benchmark post-processing sitasi: post_process lama (scan list untuk
+dedupe referensi, `nums.index` di callback regex, beberapa pass regex
+atas jawaban penuh) vs CitationStream yang memproses token saat tiba.
+
+Juga memeriksa kebenaran: hasil streaming dengan potongan token acak sama
+dengan hasil sekali jalan, isi <think> tidak pernah muncul di teks parsial
+mana pun, dan format_answer (jalur non-streaming) tidak lebih lambat dari
+post_process lama.
+
+    python -m src.benchmark.bench_citations --citations 2000 --sources 20
+"""
+import argparse
+import re
+import time
+
+import numpy as np
+
+from src.serving.citations import CitationStream, format_answer
+
+
+def legacy_post_process(raw: str, hits: list) -> str:
+    """Salinan post_process sebelum mesin sitasi (pembanding)."""
+    text = raw.strip()
+    unique_keys = []
+    for hit in hits:
+        key = (hit['book'], hit['chapters'], hit['sections'], hit['pages'])
+        if key not in unique_keys:
+            unique_keys.append(key)
+    n_refs = len(unique_keys)
+    if not re.search(r"\[\d+\]", text):
+        sentences = re.split(r'(?<=[.!?])\s+', text)
+        new_sents = []
+        for idx, s in enumerate(sentences, start=1):
+            s = s.strip()
+            if idx <= n_refs and not re.search(r"\[\d+\]$", s):
+                new_sents.append(f"{s} [{idx}]")
+            else:
+                new_sents.append(s)
+        text = ' '.join(new_sents)
+    nums = [int(n) for n in re.findall(r"\[(\d+)\]", text)]
+
+    def repl(m):
+        return f"[{nums.index(int(m.group(1))) + 1}]"
+    text = re.sub(r"\[(\d+)\]", repl, text)
+    refs = []
+    for idx, key in enumerate(unique_keys, start=1):
+        book, chap, sec, page = key
+        parts = [book]
+        if chap != '–': parts.append(f"Bab: {chap}")
+        if sec != '–': parts.append(f"Subbab: {sec}")
+        parts.append(f"Halaman {page}")
+        refs.append(f"{idx}. {', '.join(parts)}")
+    return f"{text}\n\nReferensi:\n" + "\n".join(refs)
+
+
+def make_answer(n_citations: int, n_sources: int, rng) -> str:
+    think = "<think>\nPertimbangkan sumber [1] dan [2]; rahasia-internal.\n</think>\n\n"
+    sents = []
+    for _ in range(n_citations):
+        n = int(rng.integers(1, n_sources + 1))
+        sents.append(f"Pasien dengan gejala ini diberikan terapi sesuai pedoman [{n}].")
+    return think + " ".join(sents)
+
+
+def best_of(fn, reps: int = 5) -> float:
+    """Detik terbaik dari `reps` run (satu run terlalu bising untuk dibandingkan)."""
+    best = float("inf")
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def tokenize(text: str, rng) -> list:
+    """Potongan acak 1-6 karakter: penanda dan tag sering terbelah antar token."""
+    out, i = [], 0
+    while i < len(text):
+        n = int(rng.integers(1, 7))
+        out.append(text[i:i + n])
+        i += n
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--citations", type=int, default=2000)
+    parser.add_argument("--sources", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Setengah sumber berbagi buku/halaman dengan sumber lain (referensi terdeduplikasi)
+    hits = [{"book": f"Buku {i // 2}", "chapters": "Bab 1", "sections": "–", "pages": str(i // 2)}
+            for i in range(args.sources)]
+    raw = make_answer(args.citations, args.sources, rng)
+    tokens = tokenize(raw, rng)
+
+    legacy = legacy_post_process(raw, hits)
+    t_legacy = best_of(lambda: legacy_post_process(raw, hits))
+    full = format_answer(raw, hits)
+    t_full = best_of(lambda: format_answer(raw, hits))
+
+    cs = CitationStream(hits)
+    leaked = 0
+    t0 = time.perf_counter()
+    for tok in tokens:
+        if cs.feed(tok):
+            leaked += "rahasia" in cs.delta or "think>" in cs.delta
+    streamed = cs.finish()
+    t_stream = time.perf_counter() - t0
+
+    print(f"[→] {args.citations} sitasi, {args.sources} sumber → {len(cs.keys)} referensi, {len(tokens)} token")
+    print(f"    post_process lama      : {1000 * t_legacy:8.1f} ms (think ikut tampil: {'rahasia' in legacy})")
+    print(f"    format_answer (sekali) : {1000 * t_full:8.1f} ms")
+    print(f"    CitationStream (token) : {1000 * t_stream:8.1f} ms total, "
+          f"{1e6 * t_stream / len(tokens):.2f} µs/token")
+    print(f"    hasil lama == baru     : {legacy == full} (nomor lama = urutan kemunculan, baru = referensi unik)")
+    ok = streamed == full and not leaked and "rahasia" not in full and t_full <= t_legacy
+    print("[✓] OK: streaming = sekali jalan, <think> tidak pernah tampil, sekali jalan tidak lebih lambat" if ok
+          else f"[✗] GAGAL: sama={streamed == full}, bocor={leaked}, "
+               f"sekali jalan {1000 * t_full:.1f} ms vs lama {1000 * t_legacy:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Load test jalur async chat dengan LLM palsu: latensi p50/p95 (dan TTFT)
+pada 1, 8, dan 32 pengguna bersamaan, dibanding eksekusi serial
+(max_concurrency=1, setara respond() blocking lama).
+
+    python -m src.benchmark.bench_concurrency --users 1,8,32 --requests 3
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from src.benchmark.fake_ollama import FakeOllamaServer
+from src.llm.ollama_client import AsyncOllamaClient
+from src.serving.async_answer import AsyncAnswerService, Overloaded
+
+
+def fake_retrieve(delay):
+    def retrieve(query, top_k):
+        time.sleep(delay)  # embedding + vector search (melepas GIL seperti I/O/BLAS)
+        return [{"chunk": f"konteks {i}"} for i in range(top_k)]
+    return retrieve
+
+
+async def user(service, n_requests, lat, ttft, errors):
+    for _ in range(n_requests):
+        t0 = time.perf_counter()
+        first = None
+        try:
+            async for _ in service.stream_answer("apa itu sciatica?", top_k=5):
+                if first is None:
+                    first = time.perf_counter() - t0
+        except (Overloaded, asyncio.TimeoutError) as e:
+            errors.append(type(e).__name__)
+            continue
+        lat.append(time.perf_counter() - t0)
+        ttft.append(first)
+
+
+async def run(url, users, n_requests, concurrency, retrieval_delay, workers):
+    llm = AsyncOllamaClient(url=url, model="fake", pool_size=64)
+    service = AsyncAnswerService(
+        fake_retrieve(retrieval_delay), lambda q, hits: q, lambda raw, hits: raw, llm,
+        max_concurrency=concurrency, max_queue=256, retrieval_workers=workers, timeout=300,
+    )
+    lat, ttft, errors = [], [], []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(user(service, n_requests, lat, ttft, errors) for _ in range(users)))
+    wall = time.perf_counter() - t0
+    await llm.aclose()
+    service.executor.shutdown()
+    return lat, ttft, errors, wall
+
+
+def pct(samples, q):
+    return 1000 * float(np.percentile(samples, q)) if samples else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", default="1,8,32")
+    parser.add_argument("--requests", type=int, default=3, help="request per pengguna")
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--token_delay", type=float, default=0.005)
+    parser.add_argument("--retrieval_ms", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    answer = " ".join(f"kata{i}" for i in range(args.tokens))
+    with FakeOllamaServer(answer, token_delay=args.token_delay) as srv:
+        print(f"{'mode':8} {'users':>5} {'p50':>9} {'p95':>9} {'TTFT p50':>9} {'TTFT p95':>9} {'req/s':>7} gagal")
+        for users in map(int, args.users.split(",")):
+            for mode, conc in (("serial", 1), ("async", args.concurrency)):
+                lat, ttft, errors, wall = asyncio.run(run(
+                    srv.url, users, args.requests, conc, args.retrieval_ms / 1000, args.workers))
+                print(f"{mode:8} {users:>5} {pct(lat, 50):>7.0f}ms {pct(lat, 95):>7.0f}ms "
+                      f"{pct(ttft, 50):>7.0f}ms {pct(ttft, 95):>7.0f}ms {len(lat) / wall:>7.1f} {len(errors)}")
+
+
+if __name__ == "__main__":
+    main()
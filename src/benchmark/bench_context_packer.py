@@ -0,0 +1,113 @@
+"""
+Benchmark pengemasan konteks: token prompt dan time-to-first-token dengan
+konteks penuh (top-k chunk utuh) vs ContextPacker, terhadap server Ollama
+palsu yang menunda prefill `--prefill_ms` per token prompt.
+
+Hit disusun seperti keluaran chunker: chunk panjang dengan tumpang tindih
+antar tetangga, beberapa dari buku/halaman yang sama. Di tiap chunk ada
+satu kalimat "fakta" yang memuat istilah query; `fakta` = fraksi kalimat
+itu yang masih ada di prompt.
+
+    python -m src.benchmark.bench_context_packer --chunk_words 1024 --top_k 5
+    python -m src.benchmark.bench_context_packer --max_tokens 600 --prefill_ms 5
+"""
+import argparse
+import time
+
+import numpy as np
+
+from archive.retriever import build_prompt, make_hit, post_process
+from src.benchmark.fake_ollama import FakeOllamaServer
+from src.llm.ollama_client import OllamaClient
+from src.serving.context_packer import ContextPacker
+
+VOCAB = ("pasien nyeri dada sesak napas demam batuk terapi dosis obat pemeriksaan klinis "
+         "laboratorium diagnosis riwayat gejala tekanan darah jantung paru ginjal hati "
+         "infeksi peradangan kronis akut pengobatan rawat inap evaluasi komplikasi").split()
+QUERY = "terapi lini pertama sciatica lumbal dan dosis gabapentin"
+
+
+def sentence(rng, n_words: int) -> str:
+    words = rng.choice(VOCAB, size=n_words)
+    return " ".join(words).capitalize() + "."
+
+
+def make_hits(top_k: int, chunk_words: int, overlap_words: int, seed: int = 0) -> list:
+    """top_k hit; hit genap/ganjil berpasangan sebagai chunk berurutan dari halaman bersebelahan."""
+    rng = np.random.default_rng(seed)
+    hits, prev_tail = [], []
+    for i in range(top_k):
+        sents = list(prev_tail) if i % 2 else []
+        while sum(len(s.split()) for s in sents) < chunk_words:
+            sents.append(sentence(rng, int(rng.integers(8, 25))))
+        fact = f"Fakta {i}: sciatica lumbal diterapi gabapentin dosis {100 * (i + 1)} mg sebagai lini pertama."
+        sents.insert(int(rng.integers(len(prev_tail) if i % 2 else 0, len(sents))), fact)
+        # Kalimat terakhir diulang di chunk berikutnya (overlap chunker)
+        tail, n = [], 0
+        for s in reversed(sents):
+            if n >= overlap_words:
+                break
+            tail.insert(0, s)
+            n += len(s.split())
+        prev_tail = tail
+        book = f"Buku Neurologi {i // 2}"
+        meta = {"book": book, "chapter": "Bab 4", "section": "Nyeri punggung", "pages": str(40 + i % 2)}
+        hits.append(dict(make_hit(" ".join(sents), meta, 1.0 - i / 10, i), id=f"c{i}"))
+    return hits
+
+
+def measure(client: OllamaClient, prompt: str) -> dict:
+    t0 = time.perf_counter()
+    first = None
+    raw = ""
+    for tok in client.stream(prompt):
+        if first is None:
+            first = time.perf_counter() - t0
+        raw += tok
+    return {"ttft": first, "total": time.perf_counter() - t0, "raw": raw,
+            "prompt_tokens": client.last_stats.get("prompt_eval_count", 0)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top_k", type=int, default=5)
+    parser.add_argument("--chunk_words", type=int, default=1024)
+    parser.add_argument("--overlap_words", type=int, default=32)
+    parser.add_argument("--max_tokens", type=int, default=1200)
+    parser.add_argument("--prefill_ms", type=float, default=2.0, help="jeda prefill per token prompt")
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    hits = make_hits(args.top_k, args.chunk_words, args.overlap_words)
+    packer = ContextPacker(max_tokens=args.max_tokens)
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        packed, stats = packer.pack(QUERY, hits)
+    pack_ms = 1000 * (time.perf_counter() - t0) / args.repeat
+    facts = [f"Fakta {i}:" for i in range(args.top_k)]
+
+    answer = "Gabapentin adalah lini pertama [1]. Dosis disesuaikan [2]."
+    with FakeOllamaServer(answer, token_delay=0.001, prefill_delay=args.prefill_ms / 1000) as srv:
+        client = OllamaClient(url=srv.url, model="fake")
+        print(f"{'konteks':>8} {'blok':>5} {'tok prompt':>10} {'TTFT ms':>9} {'total ms':>9} {'fakta':>6} {'referensi':>9}")
+        rows = {}
+        for name, hs in (("penuh", hits), ("packed", packed)):
+            prompt = build_prompt(QUERY, hs)
+            runs = [measure(client, prompt) for _ in range(args.repeat)]
+            refs = post_process(runs[0]["raw"], hs).split("Referensi:\n")[1].count("\n") + 1
+            kept = sum(f in prompt for f in facts) / len(facts)
+            r = rows[name] = {"ttft": 1000 * float(np.median([x["ttft"] for x in runs])),
+                              "total": 1000 * float(np.median([x["total"] for x in runs])),
+                              "tokens": runs[0]["prompt_tokens"]}
+            print(f"{name:>8} {len(hs):>5} {r['tokens']:>10,} {r['ttft']:>9.1f} {r['total']:>9.1f} "
+                  f"{kept:>6.0%} {refs:>9}")
+        client.close()
+
+    print(f"[→] Packing: {pack_ms:.2f} ms; {stats.duplicate_sentences} kalimat duplikat, "
+          f"{stats.dropped_sentences} kalimat dibuang, taksiran {stats.tokens_in:,} → {stats.tokens_out:,} token")
+    print(f"[✓] Token prompt {rows['penuh']['tokens'] / max(1, rows['packed']['tokens']):.1f}× lebih sedikit, "
+          f"TTFT {rows['penuh']['ttft'] / max(1e-9, rows['packed']['ttft']):.1f}× lebih cepat")
+
+
+if __name__ == "__main__":
+    main()
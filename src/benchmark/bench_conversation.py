@@ -0,0 +1,108 @@
+"""
+Benchmark percakapan multi-giliran: token prefill dan TTFT per giliran
+tanpa sesi (setiap pertanyaan berdiri sendiri, prompt lengkap) vs dengan
+sesi (context Ollama + chunk giliran sebelumnya dipakai ulang), lewat
+AsyncAnswerService terhadap server Ollama palsu yang menunda prefill
+`--prefill_ms` per token prompt baru.
+
+    python -m src.benchmark.bench_conversation
+    python -m src.benchmark.bench_conversation --chunk_words 400 --prefill_ms 5
+"""
+import argparse
+import asyncio
+
+import numpy as np
+
+from archive.retriever import SYSTEM_PROMPT, build_prompt, format_context, make_hit, post_process
+from src.benchmark.bench_context_packer import sentence
+from src.benchmark.fake_ollama import FakeOllamaServer
+from src.llm.ollama_client import AsyncOllamaClient
+from src.serving.async_answer import AsyncAnswerService
+from src.serving.conversation import Conversation, SessionStore, content_terms
+from src.serving.tracing import Tracer
+
+TOPICS = {
+    "sciatica": "Sciatica lumbal diterapi gabapentin sebagai lini pertama; dosis awal gabapentin 300 mg "
+                "dinaikkan bertahap. Efek samping gabapentin: kantuk dan pusing.",
+    "stroke": "Stroke iskemik akut ditangani trombolisis alteplase dalam 4,5 jam; prognosis stroke "
+              "bergantung luas infark dan rehabilitasi dini.",
+}
+TURNS = [
+    "Apa terapi lini pertama sciatica lumbal?",
+    "Bagaimana dengan dosis gabapentin?",
+    "Apa efek samping gabapentin?",
+    "Bagaimana prognosis stroke iskemik?",
+    "Berapa jam batas trombolisis stroke?",
+]
+
+
+def make_pool(chunk_words: int, per_topic: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    pool = []
+    for topic, fact in TOPICS.items():
+        for j in range(per_topic):
+            sents = []
+            while sum(len(s.split()) for s in sents) < chunk_words:
+                sents.append(sentence(rng, int(rng.integers(8, 25))))
+            sents.insert(int(rng.integers(0, len(sents))), fact)
+            meta = {"book": f"Buku {topic}", "chapter": "Bab 1", "section": "–", "pages": str(10 + 5 * j)}
+            pool.append(dict(make_hit(" ".join(sents), meta, 0.0, 0), id=f"{topic}{j}"))
+    return pool
+
+
+def retriever(pool: list):
+    def retrieve(query: str, k: int) -> list:
+        terms = content_terms(query)
+        scored = sorted(pool, key=lambda h: -len(terms & content_terms(h["chunk"])))
+        return [dict(h, rank=i) for i, h in enumerate(scored[:k])]
+    return retrieve
+
+
+async def run(service: AsyncAnswerService, top_k: int, session_id) -> list:
+    rows = []
+    for query in TURNS:
+        async for _ in service.stream_answer(query, top_k=top_k, session_id=session_id):
+            pass
+        tr = service.tracer.recent(1)[0]
+        spans = {name: d for name, _, d in tr.spans}
+        rows.append({"query": query, "prefill": tr.attrs.get("prefill_tokens", 0),
+                     "ttft": 1000 * spans.get("llm_ttft", 0.0),
+                     "retrieval": "retrieval" in spans})
+    return rows
+
+
+async def main_async(args):
+    pool = make_pool(args.chunk_words, args.per_topic)
+    answer = "Gabapentin adalah lini pertama [1]. Dosis dinaikkan bertahap [2]."
+    results = {}
+    with FakeOllamaServer(answer, token_delay=0.001, prefill_delay=args.prefill_ms / 1000) as srv:
+        for name, with_session in (("tanpa sesi", False), ("sesi", True)):
+            llm = AsyncOllamaClient(url=srv.url, model="fake")
+            conv = Conversation(SessionStore(), SYSTEM_PROMPT, format_context) if with_session else None
+            service = AsyncAnswerService(retriever(pool), build_prompt, post_process, llm,
+                                         tracer=Tracer(), conversation=conv)
+            results[name] = await run(service, args.top_k, "bench" if with_session else None)
+            await llm.aclose()
+            service.executor.shutdown()
+
+    print(f"{'giliran':<42} {'prefill tanpa':>13} {'prefill sesi':>12} {'TTFT tanpa':>11} {'TTFT sesi':>10} {'retrieval':>9}")
+    for a, b in zip(results["tanpa sesi"], results["sesi"]):
+        print(f"{a['query']:<42} {a['prefill']:>13,} {b['prefill']:>12,} {a['ttft']:>9.0f}ms "
+              f"{b['ttft']:>8.0f}ms {'ya' if b['retrieval'] else 'pakai ulang':>9}")
+    total_a = sum(r["prefill"] for r in results["tanpa sesi"][1:])
+    total_b = sum(r["prefill"] for r in results["sesi"][1:])
+    print(f"[✓] Token prefill giliran lanjutan: {total_a:,} → {total_b:,} "
+          f"({total_a / max(1, total_b):.1f}× lebih sedikit)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk_words", type=int, default=250)
+    parser.add_argument("--per_topic", type=int, default=4)
+    parser.add_argument("--top_k", type=int, default=3)
+    parser.add_argument("--prefill_ms", type=float, default=2.0, help="jeda prefill per token prompt baru")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark cache embedding: build pertama vs rebuild korpus yang tidak berubah.
+
+    python -m src.benchmark.bench_embedding_cache --docs 50 --cost_ms 2
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+from src.benchmark.stub_embedder import StubEmbedder, synthetic_corpus
+from src.indexer.embedding_cache import EmbeddingCache
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=50)
+    parser.add_argument("--chunks", type=int, default=40)
+    parser.add_argument("--cost_ms", type=float, default=2.0, help="biaya encode simulasi per teks")
+    parser.add_argument("--max_mb", type=float, default=64)
+    args = parser.parse_args()
+
+    texts = [t for doc in synthetic_corpus(args.docs, args.chunks) for t in doc]
+    model = StubEmbedder(cost_per_text=args.cost_ms / 1000)
+    root = tempfile.mkdtemp(prefix="embcache_")
+    try:
+        cache = EmbeddingCache(root, model.name, 128, shard_rows=1024,
+                               max_bytes=int(args.max_mb * (1 << 20)))
+        t0 = time.perf_counter()
+        first = cache.encode(texts, model.encode)
+        t_first = time.perf_counter() - t0
+        cache.close()
+
+        # Proses baru: LRU kosong, semua hit berasal dari shard di disk
+        cache = EmbeddingCache(root, model.name, 128, shard_rows=1024,
+                               max_bytes=int(args.max_mb * (1 << 20)))
+        encoded_before = model.encoded
+        t0 = time.perf_counter()
+        second = cache.encode(texts, model.encode)
+        t_second = time.perf_counter() - t0
+        assert (first == second).all(), "vektor dari cache berbeda"
+
+        t0 = time.perf_counter()
+        cache.encode(texts[:1000], model.encode)
+        t_lru = time.perf_counter() - t0
+
+        st = cache.stats()
+        print(f"[→] Teks                : {len(texts)}")
+        print(f"[→] Build pertama       : {t_first:.2f} s")
+        print(f"[→] Rebuild (disk hit)  : {t_second:.2f} s  (encode ulang: {model.encoded - encoded_before})")
+        print(f"[→] 1000 query (LRU hit): {1000 * t_lru:.1f} ms")
+        print(f"[→] Stats               : {st}")
+        cache.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark tipe index FAISS CPU (src/indexer/faiss_index.py) pada vektor
+sintetis berkluster: recall@k terhadap pencarian exact (Flat), QPS (per
+query dan batch), ukuran file, dan resident memory saat dimuat (mmap vs
+dibaca penuh, diukur di proses terpisah; halaman mmap yang tersentuh ikut
+terhitung di RSS tetapi berupa page cache yang bisa dilepas kernel).
+
+    python -m src.benchmark.bench_faiss_index --n 200000 --dim 768 --types flat,ivf_pq,hnsw,sq_int8
+"""
+import argparse
+import gc
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from src.indexer.faiss_index import INDEX_TYPES, apply_search_params, build_index, read_index
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def load_rss(path, mmap, queries, k, cfg) -> float:
+    """RSS (MB) yang ditambahkan read_index + satu batch query, di proses baru."""
+    code = (
+        "import numpy as np, sys\n"
+        "from src.benchmark.bench_faiss_index import rss_mb\n"
+        "from src.indexer.faiss_index import apply_search_params, read_index\n"
+        "q = np.load(sys.argv[1]); before = rss_mb()\n"
+        f"idx = read_index({path!r}, mmap={mmap}); apply_search_params(idx, {cfg!r})\n"
+        f"idx.search(q, {k}); print(rss_mb() - before)\n"
+    )
+    qpath = path + ".q.npy"
+    np.save(qpath, queries)
+    try:
+        out = subprocess.run([sys.executable, "-c", code, qpath], capture_output=True, text=True, check=True)
+    finally:
+        os.remove(qpath)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def clustered(n, dim, n_clusters=256, seed=0):
+    """Campuran Gaussian, mirip sebaran embedding chunk per topik."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, size=n)
+    return centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def recall_at_k(found, truth, k):
+    return float(np.mean([len(set(f[:k]) & set(t[:k])) / k for f, t in zip(found, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", default=",".join(INDEX_TYPES))
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--ef_search", type=int, default=64)
+    parser.add_argument("--pq_m", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=0, help="0 = default OpenMP")
+    args = parser.parse_args()
+    if args.threads:
+        faiss.omp_set_num_threads(args.threads)
+
+    data = clustered(args.n, args.dim)
+    rng = np.random.default_rng(1)
+    queries = data[rng.choice(args.n, args.queries, replace=False)] + \
+        0.3 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    exact = faiss.IndexFlatL2(args.dim)
+    exact.add(data)
+    _, truth = exact.search(queries, args.k)
+    del exact
+    gc.collect()
+
+    cfg = {"nprobe": args.nprobe, "ef_search": args.ef_search, "pq_m": args.pq_m}
+    tmp = tempfile.mkdtemp(prefix="bench_faiss_")
+    print(f"[→] n={args.n} dim={args.dim} queries={args.queries} k={args.k} "
+          f"(raw float32 {data.nbytes / 2**20:.0f} MB)")
+    print(f"{'tipe':>9} {'build s':>8} {'file MB':>8} {'RSS MB':>7} {'RSS mmap':>9} "
+          f"{f'recall@{args.k}':>10} {'QPS 1q':>8} {'QPS batch':>10}")
+    for index_type in args.types.split(","):
+        t0 = time.perf_counter()
+        index = build_index(data, dict(cfg, index_type=index_type))
+        index.add(data)
+        build_s = time.perf_counter() - t0
+        path = os.path.join(tmp, f"{index_type}.faiss")
+        faiss.write_index(index, path)
+        del index
+        gc.collect()
+
+        loaded = {mmap: load_rss(path, mmap, queries[:50], args.k, cfg) for mmap in (False, True)}
+        idx = read_index(path, mmap=True)
+        apply_search_params(idx, cfg)
+        t0 = time.perf_counter()
+        for q in queries:
+            idx.search(q[None, :], args.k)
+        qps_single = len(queries) / (time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        _, found = idx.search(queries, args.k)
+        qps_batch = len(queries) / (time.perf_counter() - t0)
+        del idx
+        gc.collect()
+        print(f"{index_type:>9} {build_s:8.1f} {os.path.getsize(path) / 2**20:8.0f} "
+              f"{loaded[False]:7.0f} {loaded[True]:9.0f} {recall_at_k(found, truth, args.k):10.3f} "
+              f"{qps_single:8.0f} {qps_batch:10.0f}")
+        os.remove(path)
+    os.rmdir(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Benchmark retrieval terfilter (src/indexer/metadata_index.py): top-k global
+lalu dibuang yang di luar filter (satu-satunya cara sebelumnya) vs filter
+di dalam pencarian (filtered_search FAISS, mask BM25), per tipe index.
+
+Recall@k diukur terhadap top-k eksak di antara chunk yang lolos filter.
+Korpus sintetis: `--books` buku × `--chapters` bab, metadata ditulis ke
+chunk store seperti indexer multimodal (chapter_list + string gabungan).
+
+    python -m src.benchmark.bench_filtered_search --chunks 50000 --index_types flat,ivf_flat,hnsw
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from src.benchmark.stub_embedder import StubEmbedder, synthetic_corpus
+from src.indexer.chunk_store import ChunkStore
+from src.indexer.faiss_index import build_index, filtered_search
+from src.indexer.metadata_index import MetadataIndex, build_metadata_index, positions_mask, store_rows
+from src.retriever.bm25 import BM25Index, build_bm25
+
+
+def make_corpus(folder: str, n_chunks: int, books: int, chapters: int, dim: int):
+    per_doc = 20
+    docs = synthetic_corpus(max(1, n_chunks // per_doc), chunks_per_doc=per_doc, words_per_chunk=60)
+    rng = np.random.default_rng(1)
+    store = ChunkStore.create(os.path.join(folder, "chunks"))
+    texts = []
+    for d, chunks in enumerate(docs):
+        book = f"Buku {d % books}"
+        for i, text in enumerate(chunks):
+            # Sebagian chunk melintasi dua bab (string gabungan seperti multimodal_indexer)
+            ch = sorted({f"Bab {int(rng.integers(chapters))}" for _ in range(int(rng.integers(1, 3)))})
+            store.append(f"d{d}_{i}", text, {"book": book, "chapters": ", ".join(ch), "chapter_list": ch,
+                                             "type": "pdf_chunk"})
+            texts.append(text)
+    store.flush()
+    # Vektor teks + komponen per buku (buku berbeda menempati wilayah ruang vektor berbeda)
+    vectors = StubEmbedder(dim=dim).encode(texts)
+    centers = np.random.default_rng(2).standard_normal((books, dim)).astype(np.float32) * 0.15
+    book_of = np.array([int(m["book"].split()[1]) for _, _, m in store.items()])
+    return store, np.ascontiguousarray(vectors + centers[book_of], dtype=np.float32)
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f[f >= 0]) & set(t[t >= 0])) for f, t in zip(found, truth))
+    return hits / max(1, sum(int((t >= 0).sum()) for t in truth))
+
+
+def exact_filtered(vectors: np.ndarray, queries: np.ndarray, mask: np.ndarray, k: int) -> np.ndarray:
+    idx = np.flatnonzero(mask)
+    d = ((queries[:, None, :] - vectors[idx][None, :, :]) ** 2).sum(-1)
+    order = np.argsort(d, axis=1)[:, :k]
+    return idx[order]
+
+
+def timed(fn, reps: int):
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        out = fn()
+    return out, 1000 * (time.perf_counter() - t0) / reps
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--books", type=int, default=20)
+    parser.add_argument("--chapters", type=int, default=12)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--index_types", default="flat,ivf_flat,hnsw")
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(1)
+    tmp = tempfile.mkdtemp(prefix="bench_filter_")
+    try:
+        store, vectors = make_corpus(tmp, args.chunks, args.books, args.chapters, args.dim)
+        t0 = time.perf_counter()
+        build_metadata_index(store)
+        t_build = time.perf_counter() - t0
+        meta = MetadataIndex.load_for(ChunkStore(store.path))
+        ids = [i for i, _, _ in store.items()]
+        rows = store_rows(store, ids)
+        print(f"[→] {len(ids)} chunk, {args.books} buku × {args.chapters} bab; bitmap dibangun {1000 * t_build:.0f} ms")
+
+        filters = {
+            "1 buku": {"book": "Buku 3"},
+            "buku + bab": {"book": "Buku 3", "chapter": "Bab 5"},
+        }
+        rng = np.random.default_rng(3)
+        queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+        queries = queries + rng.standard_normal(queries.shape).astype(np.float32) * 0.05
+        k = args.k
+
+        print(f"\n{'index':<9} {'filter':<11} {'lolos':>6} {'tanpa filter':>12} {'post-filter':>22} "
+              f"{'filter di search':>22}")
+        for index_type in args.index_types.split(","):
+            index = build_index(vectors, {"index_type": index_type})
+            index.add(vectors)
+            _, t_plain = timed(lambda: index.search(queries, k), 3)
+            for name, f in filters.items():
+                pos_mask = positions_mask(meta.mask(f), rows)
+                truth = exact_filtered(vectors, queries, pos_mask, k)
+                # Lama: top-k global, buang yang tidak lolos filter
+                (_, I_post), t_post = timed(lambda: index.search(queries, k), 3)
+                I_post = np.where(pos_mask[np.maximum(I_post, 0)] & (I_post >= 0), I_post, -1)
+                # Baru: selector di dalam scan index
+                (_, I_new), t_new = timed(lambda: filtered_search(index, queries, k, pos_mask), 3)
+                print(f"{index_type:<9} {name:<11} {pos_mask.mean():>6.1%} {t_plain / len(queries):>10.3f}ms "
+                      f"{t_post / len(queries):>8.3f}ms recall {recall(I_post, truth):>5.2f} "
+                      f"{t_new / len(queries):>8.3f}ms recall {recall(I_new, truth):>5.2f}")
+                assert all(pos_mask[i] for i in I_new.ravel() if i >= 0)
+            del index
+
+        # BM25: mask di dalam akumulasi skor vs top-k global lalu dibuang
+        build_bm25(((i, t) for i, t, _ in store.items()), os.path.join(tmp, "bm25"))
+        bm25 = BM25Index(os.path.join(tmp, "bm25"))
+        bm25_rows = store_rows(store, bm25.ids)
+        words = [t.split()[3:6] for _, t, _ in list(store.items())[:args.queries]]
+        print(f"\n{'BM25':<9} {'filter':<11} {'post-filter hasil/k':>20} {'mask hasil/k':>14} {'ms/query':>9}")
+        for name, f in filters.items():
+            bm_mask = positions_mask(meta.mask(f), bm25_rows)
+            post = new = 0
+            t0 = time.perf_counter()
+            for w in words:
+                new += len(bm25.search(" ".join(w), k, mask=bm_mask))
+            t_new = 1000 * (time.perf_counter() - t0) / len(words)
+            for w in words:
+                post += sum(bm_mask[i] for i in bm25.search_indices(" ".join(w), k)[0])
+            print(f"{'':<9} {name:<11} {post / (k * len(words)):>20.2f} {new / (k * len(words)):>14.2f} {t_new:>9.2f}")
+
+        t0 = time.perf_counter()
+        for _ in range(100):
+            meta.mask(filters["buku + bab"])
+        print(f"\n[✓] mask() ter-cache: {1e6 * (time.perf_counter() - t0) / 100:.1f} µs; "
+              f"Chroma where: {meta.where(filters['buku + bab'])}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
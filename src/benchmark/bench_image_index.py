@@ -0,0 +1,180 @@
+"""
+Benchmark ingest gambar: jalur lama (buka penuh + convert RGB resolusi
+asli, encode satu per satu) vs build_image_index (decode paralel dengan
+Image.draft, encode batch, skip file tak berubah, pakai ulang vektor file
+yang berganti nama).
+
+Encoder CLIP disimulasikan (StubClip): preprocessing resize ke 224 seperti
+CLIP asli + biaya tetap per panggilan forward. Gambar uji: JPEG besar mirip
+scan radiologi. Terakhir, query teks → gambar (archive.retriever.search_images)
+dijalankan terhadap collection hasil build.
+
+    python -m src.benchmark.bench_image_index --images 40 --width 3000 --height 2400
+"""
+import argparse
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from src.benchmark.bench_bulk_writer import SimCollection
+from src.indexer import image_index
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StubClip:
+    """
+    encode(list gambar) -> (n, dim): resize 224 per gambar + `call_s` per
+    panggilan. Teks (query) dipetakan deterministik dari hash-nya.
+    """
+
+    def __init__(self, dim: int = 512, call_s: float = 0.02):
+        self.dim = dim
+        self.call_s = call_s
+        self.calls = 0
+
+    def encode(self, items, batch_size: int = 32, **_):
+        single = not isinstance(items, list)
+        items = [items] if single else items
+        self.calls += 1
+        time.sleep(self.call_s)
+        out = np.empty((len(items), self.dim), dtype=np.float32)
+        for i, img in enumerate(items):
+            if isinstance(img, str):
+                rng = np.random.default_rng(sum(img.encode("utf-8")))
+                out[i] = rng.standard_normal(self.dim)
+                continue
+            px = np.asarray(img.resize((224, 224), Image.BICUBIC), dtype=np.float32)
+            rng = np.random.default_rng(int(px.mean() * 1000))
+            out[i] = rng.standard_normal(self.dim)
+        return out[0] if single else out
+
+
+class ImageSimCollection(SimCollection):
+    def get(self, ids, include=()):
+        found = [i for i in ids if i in self.rows]
+        return {"ids": found,
+                "embeddings": [self.rows[i][1] for i in found],
+                "metadatas": [self.rows[i][2] for i in found]}
+
+    def delete(self, ids):
+        for i in ids:
+            self.rows.pop(i, None)
+
+    def query(self, query_embeddings, n_results, include=()):
+        """Jarak cosine eksak ke semua gambar, seperti collection Chroma ber-space cosine."""
+        ids = list(self.rows)
+        m = np.asarray([self.rows[i][1] for i in ids], dtype=np.float32)
+        q = np.asarray(query_embeddings, dtype=np.float32)
+        m /= np.linalg.norm(m, axis=1, keepdims=True)
+        q /= np.linalg.norm(q, axis=1, keepdims=True)
+        order = np.argsort(-(m @ q.T), axis=0)[:n_results].T
+        return {"ids": [[ids[j] for j in o] for o in order],
+                "metadatas": [[self.rows[ids[j]][2] for j in o] for o in order],
+                "distances": [[1.0 - float(m[j] @ qv) for j in o] for o, qv in zip(order, q)]}
+
+
+class SimClient:
+    def __init__(self):
+        self.collections = {}
+
+    def get_or_create_collection(self, name, metadata=None):
+        return self.collections.setdefault(name, ImageSimCollection())
+
+    def delete_collection(self, name):
+        self.collections.pop(name, None)
+
+
+def make_images(folder: str, n: int, width: int, height: int):
+    """Noise + gradien dibuat di C oleh PIL (tanpa array besar) agar puncak RSS awal rendah."""
+    gradient = Image.linear_gradient("L").resize((width, height))
+    for i in range(n):
+        noise = Image.effect_noise((width, height), 20 + i % 10)
+        Image.blend(gradient, noise, 0.5).save(os.path.join(folder, f"scan{i:04d}.jpg"), quality=90)
+
+
+def legacy(folder: str, model: StubClip):
+    """Salinan jalur lama index_image_files (tanpa Chroma)."""
+    for fn in sorted(os.listdir(folder)):
+        img = Image.open(os.path.join(folder, fn)).convert('RGB')
+        model.encode(img)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--width", type=int, default=3000)
+    parser.add_argument("--height", type=int, default=2400)
+    parser.add_argument("--call_ms", type=float, default=20.0, help="biaya tetap per forward CLIP")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_img_")
+    folder = os.path.join(tmp, "images")
+    os.makedirs(folder)
+    try:
+        make_images(folder, args.images, args.width, args.height)
+        print(f"[→] {args.images} JPEG {args.width}×{args.height}, {args.workers} thread decode")
+
+        # Jalur baru dulu: puncak RSS (ru_maxrss) hanya bisa naik, jadi jalur lama diukur sesudahnya
+        model = StubClip(call_s=args.call_ms / 1000)
+        image_index.load_clip = lambda name=None: model
+        orig_settings = image_index.image_settings
+        image_index.image_settings = lambda: dict(orig_settings(), decode_workers=args.workers)
+        client = SimClient()
+        peak0 = peak_rss_mb()
+        t0 = time.perf_counter()
+        image_index.build_image_index(folder, client, tmp, mode="rebuild")
+        t_new = time.perf_counter() - t0
+        peak_new = peak_rss_mb() - peak0
+        new_calls = model.calls
+
+        legacy_model = StubClip(call_s=args.call_ms / 1000)
+        peak0 = peak_rss_mb()
+        t0 = time.perf_counter()
+        legacy(folder, legacy_model)
+        t_legacy = time.perf_counter() - t0
+        peak_legacy = peak_rss_mb() - peak0 + peak_new
+        print(f"    lama : {t_legacy:6.2f} s ({args.images / t_legacy:5.1f} gambar/s), "
+              f"{legacy_model.calls} panggilan encode, puncak RSS +{peak_legacy:.0f} MB")
+        print(f"    baru : {t_new:6.2f} s ({args.images / t_new:5.1f} gambar/s), "
+              f"{new_calls} panggilan encode, puncak RSS +{peak_new:.0f} MB")
+
+        # Update tanpa perubahan, lalu satu file berganti nama
+        calls = model.calls
+        t0 = time.perf_counter()
+        image_index.build_image_index(folder, client, tmp, mode="update")
+        t_noop = time.perf_counter() - t0
+        os.rename(os.path.join(folder, "scan0000.jpg"), os.path.join(folder, "renamed.jpg"))
+        image_index.build_image_index(folder, client, tmp, mode="update")
+        coll = client.collections[image_index.IMAGE_COLLECTION]
+        ok = model.calls == calls and "renamed.jpg" in coll.rows and "scan0000.jpg" not in coll.rows
+        print(f"    update tanpa perubahan: {1000 * t_noop:.0f} ms; ganti nama: 0 encode baru = {model.calls == calls}")
+        print(f"[{'✓' if ok else '✗'}] {t_legacy / t_new:.1f}× lebih cepat dari jalur lama")
+
+        # Query teks → gambar lewat jalur yang sama dengan app/CLI
+        from archive.retriever import search_images
+        from src import services
+        services.register("image_collection", lambda: coll)
+        services.register("clip_text_encoder", lambda: model)
+        t0 = time.perf_counter()
+        found = search_images("foto rontgen dada", k=4)
+        t_query = time.perf_counter() - t0
+        scores = [h["score"] for h in found]
+        ok = (len(found) == min(4, args.images) and scores == sorted(scores, reverse=True)
+              and all(os.path.exists(os.path.join(folder, h["source"])) for h in found))
+        print(f"[{'✓' if ok else '✗'}] Query teks → gambar: {len(found)} hasil dalam {1000 * t_query:.0f} ms "
+              f"({', '.join(h['source'] for h in found)})")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark update inkremental: tambah satu dokumen ke korpus sintetis besar,
+bandingkan rebuild penuh vs `build_faiss.update` (FAISS + manifest).
+
+    python -m src.benchmark.bench_incremental_update --docs 2000 --cost_ms 1
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from src.benchmark.stub_embedder import StubEmbedder, synthetic_corpus
+from src.indexer import build_faiss
+from src.indexer.manifest import Manifest
+from src.ingestion.section_file import SECTION_EXT, SectionWriter
+
+
+def write_json_corpus(json_dir, docs, offset=0):
+    for d, chunks in enumerate(docs, start=offset):
+        with SectionWriter(os.path.join(json_dir, f"doc{d:05d}{SECTION_EXT}"), f"doc{d:05d}", len(chunks)) as w:
+            for i, c in enumerate(chunks):
+                w.write({"title": f"Bab {i}", "content": c, "page_start": i + 1, "page_end": i + 1})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--cost_ms", type=float, default=1.0, help="biaya encode simulasi per chunk")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="incr_")
+    json_dir, index_dir = os.path.join(work, "json"), os.path.join(work, "index")
+    os.makedirs(json_dir)
+    try:
+        write_json_corpus(json_dir, synthetic_corpus(args.docs, args.chunks))
+        embedder = StubEmbedder(cost_per_text=args.cost_ms / 1000)
+        manifest = Manifest(os.path.join(index_dir, "manifest.json"))
+
+        t0 = time.perf_counter()
+        db = build_faiss.build(embedder, build_faiss.list_sources(json_dir), manifest)
+        db.save_local(index_dir)
+        manifest.save()
+        t_full = time.perf_counter() - t0
+
+        # Tambah satu artikel baru lalu jalankan mode update
+        write_json_corpus(json_dir, synthetic_corpus(1, args.chunks, seed=1), offset=args.docs)
+        embedder.encoded = 0
+        manifest = Manifest(os.path.join(index_dir, "manifest.json"))
+        t0 = time.perf_counter()
+        db = build_faiss.update(embedder, build_faiss.list_sources(json_dir), manifest, index_dir=index_dir)
+        db.save_local(index_dir)
+        manifest.save()
+        t_update = time.perf_counter() - t0
+
+        print(f"[→] Korpus              : {args.docs} dokumen × {args.chunks} chunk")
+        print(f"[→] Rebuild penuh       : {t_full:.2f} s")
+        print(f"[→] Update +1 dokumen   : {t_update:.2f} s  ({embedder.encoded} chunk di-embed)")
+        print(f"[→] Percepatan          : {t_full / t_update:.1f}×")
+        print(f"[→] Vektor di index     : {db.index.ntotal}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
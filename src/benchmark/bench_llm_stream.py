@@ -0,0 +1,57 @@
+"""
+Benchmark klien Ollama streaming terhadap server palsu lokal:
+time-to-first-token vs latensi jawaban penuh, dan reuse koneksi keep-alive.
+
+    python -m src.benchmark.bench_llm_stream --turns 5 --tokens 200
+"""
+import argparse
+import sys
+import time
+
+from src.benchmark.fake_ollama import FakeOllamaServer
+from src.llm.ollama_client import OllamaClient
+
+
+def run(turns: int, n_tokens: int, token_delay: float) -> dict:
+    answer = " ".join(f"kata{i}" for i in range(n_tokens))
+    with FakeOllamaServer(answer, token_delay=token_delay) as srv:
+        client = OllamaClient(url=srv.url, model="fake")
+        ttfts, totals = [], []
+        for _ in range(turns):
+            t0 = time.perf_counter()
+            first = None
+            text = ""
+            for tok in client.stream("Apa itu sciatica?"):
+                if first is None:
+                    first = time.perf_counter() - t0
+                text += tok
+            totals.append(time.perf_counter() - t0)
+            ttfts.append(first)
+            assert text == answer, "jawaban stream tidak utuh"
+        client.close()
+        return {
+            "ttft_ms": 1000 * sum(ttfts) / turns,
+            "total_ms": 1000 * sum(totals) / turns,
+            "requests": srv.requests,
+            "connections": srv.connections,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--token_delay", type=float, default=0.005)
+    args = parser.parse_args()
+
+    r = run(args.turns, args.tokens, args.token_delay)
+    print(f"[→] TTFT rata-rata      : {r['ttft_ms']:.1f} ms")
+    print(f"[→] Jawaban penuh       : {r['total_ms']:.1f} ms")
+    print(f"[→] Request / koneksi   : {r['requests']} / {r['connections']}")
+    ok = r["ttft_ms"] < 0.1 * r["total_ms"] and r["connections"] == 1
+    print("[✓] OK" if ok else "[✗] GAGAL: TTFT tidak jauh di bawah latensi penuh atau koneksi tidak dipakai ulang")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
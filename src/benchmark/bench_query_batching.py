@@ -0,0 +1,102 @@
+"""
+Benchmark micro-batching embedding query: query/detik dan latensi
+p50/p95 untuk N thread klien bersamaan, encode satu-per-satu (satu model,
+diserialkan seperti satu forward pass per query) vs MicroBatchEncoder.
+
+Tanpa torch dipakai StubEmbedder dengan overhead tetap per forward pass;
+--model minilm / sapbert memakai model sungguhan di CPU.
+
+    python -m src.benchmark.bench_query_batching --clients 1,8,32 --model stub
+    python -m src.benchmark.bench_query_batching --model minilm --max_wait_ms 2
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from src.benchmark.stub_embedder import StubEmbedder
+from src.serving.micro_batch import MicroBatchEncoder
+
+QUERIES = [
+    "nyeri dada saat beraktivitas", "dosis metformin untuk diabetes tipe 2",
+    "tatalaksana stroke iskemik akut", "kode ICD I21.4", "sesak napas dan demam",
+    "antibiotik untuk pneumonia komunitas", "troponin meningkat setelah infark",
+    "nyeri pinggang menjalar ke kaki", "ceftriaxone 1g IV", "gagal ginjal kronik stadium 5",
+]
+
+
+def load_model(name):
+    """encode(list) -> array (n, dim) untuk model yang dipilih."""
+    if name == "stub":
+        # ~4 ms overhead per forward pass + 0.3 ms per query (kira-kira MiniLM di CPU)
+        return StubEmbedder(cost_per_call=0.004, cost_per_text=0.0003).encode
+    if name == "minilm":
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2", device="cpu")
+        return lambda texts: model.encode(texts, batch_size=64, convert_to_numpy=True)
+    if name == "sapbert":
+        from src.indexer.sapbert_embeddings import SapBERTUMLSEmbeddings
+        return SapBERTUMLSEmbeddings(device="cpu", use_cache=False).encode
+    raise ValueError(name)
+
+
+def run(encode_one, clients, per_client):
+    """Jalankan `clients` thread masing-masing `per_client` query; (qps, p50, p95) dalam ms."""
+    lat = []
+    lock = threading.Lock()
+
+    def client(cid):
+        local = []
+        for i in range(per_client):
+            # Query unik agar dedupe dalam batch tidak menguntungkan micro-batching
+            q = f"{QUERIES[(cid + i) % len(QUERIES)]} #{cid}-{i}"
+            t0 = time.perf_counter()
+            encode_one(q)
+            local.append(time.perf_counter() - t0)
+        with lock:
+            lat.extend(local)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    lat = np.asarray(lat) * 1000
+    return len(lat) / wall, float(np.percentile(lat, 50)), float(np.percentile(lat, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", choices=["stub", "minilm", "sapbert"], default="stub")
+    parser.add_argument("--clients", default="1,8,32")
+    parser.add_argument("--queries", type=int, default=50, help="query per klien")
+    parser.add_argument("--max_batch", type=int, default=32)
+    parser.add_argument("--max_wait_ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    encode = load_model(args.model)
+    encode(["warmup"])
+    model_lock = threading.Lock()
+
+    def single(q):
+        with model_lock:  # satu model, satu forward pass per query
+            return encode([q])[0]
+
+    print(f"[→] model={args.model} max_batch={args.max_batch} max_wait_ms={args.max_wait_ms}")
+    print(f"{'klien':>6} {'mode':>8} {'query/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'batch':>6}")
+    for clients in map(int, args.clients.split(",")):
+        qps, p50, p95 = run(single, clients, args.queries)
+        print(f"{clients:6d} {'single':>8} {qps:9.1f} {p50:8.2f} {p95:8.2f} {1:6.1f}")
+        batcher = MicroBatchEncoder(encode, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+        qps_b, p50, p95 = run(batcher.encode, clients, args.queries)
+        mean_batch = batcher.stats()["mean_batch"]
+        batcher.close()
+        print(f"{clients:6d} {'batched':>8} {qps_b:9.1f} {p50:8.2f} {p95:8.2f} {mean_batch:6.1f}"
+              f"   ({qps_b / qps:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark tahap rerank untuk berbagai coarse_k / final_k: loop cosine per
+hit (jalur lama) vs satu matmul (DenseReranker), opsional cross-encoder.
+Waktu dipecah per sub-tahap agar terlihat ke mana waktunya habis.
+
+    python -m src.benchmark.bench_rerank --coarse 20,50,100,200 --final 5
+    python -m src.benchmark.bench_rerank --cross_encoder
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.benchmark.stub_embedder import StubEmbedder, synthetic_corpus
+from src.retriever.rerank import CrossEncoderReranker, DenseReranker, normalize_rows, top_k
+
+
+def legacy_rerank(q_emb, embs, final_k):
+    """Salinan jalur lama: np.array per hit + cosine skalar + sort Python."""
+    def cosine_similarity(a, b):
+        return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b) + 1e-8))
+    scores = [(cosine_similarity(q_emb, np.array(e)), i) for i, e in enumerate(embs)]
+    scores.sort(key=lambda x: x[0], reverse=True)
+    return scores[:final_k]
+
+
+def timeit(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return 1e6 * (time.perf_counter() - t0) / repeat  # µs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--coarse", default="20,50,100,200")
+    parser.add_argument("--final", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--cross_encoder", action="store_true")
+    args = parser.parse_args()
+
+    emb = StubEmbedder()
+    texts = [t for d in synthetic_corpus(10, 40) for t in d]
+    matrix = emb.encode(texts)
+    q_emb = emb.encode("nyeri dada saat beraktivitas troponin")
+    dense = DenseReranker()
+    cross = CrossEncoderReranker() if args.cross_encoder else None
+
+    print(f"{'coarse_k':>8} {'lama (list)':>12} {'konversi':>10} {'norm. query':>12} "
+          f"{'matmul':>8} {'top-k':>8} {'total baru':>11}  (µs)")
+    for coarse_k in map(int, args.coarse.split(",")):
+        # Chroma mengembalikan list of list; vektor sudah dinormalisasi saat indexing
+        cand_list = normalize_rows(matrix[:coarse_k]).tolist()
+        legacy = timeit(lambda: legacy_rerank(q_emb, cand_list, args.final), args.repeat)
+        conv = timeit(lambda: np.asarray(cand_list, dtype=np.float32), args.repeat)
+        c_n = np.asarray(cand_list, dtype=np.float32)
+        norm = timeit(lambda: normalize_rows(q_emb), args.repeat)
+        q_n = normalize_rows(q_emb)[0]
+        mm = timeit(lambda: c_n @ q_n, args.repeat)
+        scores = c_n @ q_n
+        tk = timeit(lambda: top_k(scores, args.final), args.repeat)
+        total = timeit(lambda: top_k(dense.scores(q_emb, cand_list), args.final), args.repeat)
+        print(f"{coarse_k:>8} {legacy:>12.1f} {conv:>10.1f} {norm:>12.1f} {mm:>8.1f} {tk:>8.1f} {total:>11.1f}")
+        if cross is not None:
+            t0 = time.perf_counter()
+            cross.scores("nyeri dada saat beraktivitas", texts[:coarse_k])
+            print(f"{'':>8} cross-encoder (CPU, batch {cross.batch_size}): {1000 * (time.perf_counter() - t0):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark CPU SapBERTUMLSEmbeddings: kalimat/detik sebelum (pad ke
+max_length, tanpa inference_mode, .tolist()) vs sesudah (bucket panjang,
+padding dinamis, inference_mode, opsional bf16/int8).
+
+    python -m src.benchmark.bench_sapbert --n 2000 --threads 8
+"""
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from src.indexer.sapbert_embeddings import SapBERTUMLSEmbeddings
+
+MODEL = "cambridgeltl/SapBERT-UMLS-2020AB-all-lang-from-XLMR"
+
+TERMS = [
+    "infark miokard akut", "nyeri dada", "sciatica", "hipertensi esensial",
+    "diabetes melitus tipe 2", "metformin 500mg", "I21.4", "E11.9",
+    "pneumonia komunitas", "ceftriaxone 1g IV", "stroke iskemik", "troponin I",
+]
+SENTENCE = (
+    "Pasien laki-laki 54 tahun datang dengan {a} sejak dua jam, riwayat {b}, "
+    "pemeriksaan menunjukkan {c} dan direncanakan terapi {d}."
+)
+
+
+def synthetic_medical(n: int, seed: int = 0):
+    """Campuran istilah pendek (gaya SapBERT) dan kalimat klinis panjang."""
+    rng = np.random.default_rng(seed)
+    out = []
+    for i in range(n):
+        if i % 3 == 0:
+            out.append(rng.choice(TERMS))
+        else:
+            a, b, c, d = rng.choice(TERMS, size=4)
+            out.append(" ".join([SENTENCE.format(a=a, b=b, c=c, d=d)] * int(rng.integers(1, 4))))
+    return out
+
+
+def legacy_encode(emb: SapBERTUMLSEmbeddings, texts, bs: int = 64):
+    """Salinan jalur lama: padding="max_length", tanpa inference_mode, .tolist()."""
+    all_embs = []
+    for i in range(0, len(texts), bs):
+        toks = emb.tokenizer.batch_encode_plus(
+            texts[i : i + bs], padding="max_length", truncation=True,
+            max_length=128, return_tensors="pt",
+        )
+        cls_rep = emb.model(**toks)[0][:, 0, :].detach().cpu().numpy()
+        all_embs.append(cls_rep)
+    return np.vstack(all_embs).tolist()
+
+
+def timed(fn, texts):
+    t0 = time.perf_counter()
+    fn(texts)
+    return len(texts) / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--precisions", default="fp32,bf16,int8")
+    args = parser.parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    texts = synthetic_medical(args.n)
+    base = SapBERTUMLSEmbeddings(MODEL, device="cpu", use_cache=False)
+    legacy_encode(base, texts[:64])  # warm-up
+    print(f"[→] Korpus sintetis: {len(texts)} teks, {torch.get_num_threads()} thread CPU")
+    before = timed(lambda t: legacy_encode(base, t), texts)
+    print(f"[→] sebelum (pad max_length)  : {before:8.1f} kalimat/detik")
+    for precision in args.precisions.split(","):
+        emb = base if precision == "fp32" else SapBERTUMLSEmbeddings(
+            MODEL, device="cpu", precision=precision, use_cache=False)
+        emb.encode(texts[:64])
+        after = timed(emb.encode, texts)
+        print(f"[→] sesudah ({precision:4s})            : {after:8.1f} kalimat/detik  ({after / before:.2f}×)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Benchmark format hasil ekstraksi: JSON indent=2 (format lama, dibaca dengan
+json.load utuh) vs file section biner (src/ingestion/section_file.py).
+
+Diukur pada korpus sintetis: ukuran di disk, baca semua section (build
+index), ringkasan validasi (jumlah section + judul sampel), dan akses satu
+section di tengah dokumen; plus puncak memori Python (tracemalloc, di run
+terpisah dari pengukuran waktu). File .sec dibuat lewat converter dari
+JSON lama dan diperiksa identik isinya. Terakhir, pipeline ingestion diuji
+pada siklus hapus → tambah kembali dokumen berbasis .sec.
+
+    python -m src.benchmark.bench_section_file --docs 50 --sections 400
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from src.benchmark.stub_embedder import StubEmbedder, synthetic_corpus
+from src.ingestion.section_file import SECTION_EXT, SectionFile, SectionWriter, convert_dir, corpus_index
+
+
+def write_legacy(json_dir, docs):
+    """Salinan format lama extract_pdf: JSON indent=2."""
+    for d, sections in enumerate(docs):
+        data = {"filename": f"doc{d:04d}", "num_pages": len(sections),
+                "sections": [{"title": f"Bab {i} Subbab", "content": c} for i, c in enumerate(sections)]}
+        with open(os.path.join(json_dir, f"doc{d:04d}.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def dir_size(folder, ext):
+    return sum(os.path.getsize(os.path.join(folder, fn)) for fn in os.listdir(folder) if fn.endswith(ext))
+
+
+def timed(fn, reps: int = 3):
+    """(hasil, detik terbaik dari `reps`, puncak memori); memori diukur di run terpisah."""
+    best = float("inf")
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, best, peak
+
+
+def json_files(folder):
+    return [os.path.join(folder, fn) for fn in sorted(os.listdir(folder)) if fn.endswith(".json")]
+
+
+def sec_files(folder):
+    return [os.path.join(folder, fn) for fn in sorted(os.listdir(folder)) if fn.endswith(SECTION_EXT)]
+
+
+def readd_cycle(work):
+    """
+    Pipeline: PDF yang dihapus lalu ditambahkan kembali dengan fingerprint
+    sama harus ter-index ulang (checkpoint "index"-nya dihapus saat dokumen
+    hilang). Ekstraksi dilewati: .sec ditulis langsung dan stage extract
+    ditandai selesai. Return daftar sumber manifest setelah tiap run.
+    """
+    from src.indexer.manifest import Manifest
+    from src.ingestion.pipeline import Checkpoint, IngestionPipeline, fingerprint
+
+    pdf_dir, sec_dir, work_dir, index_dir, held = (os.path.join(work, d)
+                                                   for d in ("pdf", "sec", "pipeline", "index", "held"))
+    for d in (pdf_dir, sec_dir, work_dir, held):
+        os.makedirs(d)
+    checkpoint = Checkpoint(os.path.join(work_dir, "checkpoint.jsonl"))
+    for d, sections in enumerate(synthetic_corpus(3, chunks_per_doc=5, words_per_chunk=40)):
+        name = f"doc{d}"
+        with open(os.path.join(pdf_dir, name + ".pdf"), "wb") as f:
+            f.write(b"%PDF-stub")
+        with SectionWriter(os.path.join(sec_dir, name + SECTION_EXT), name, len(sections)) as w:
+            for i, c in enumerate(sections):
+                w.write({"title": f"Bab {i}", "content": c})
+        checkpoint.mark("extract", name, fingerprint(os.path.join(pdf_dir, name + ".pdf")))
+    checkpoint.close()
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            IngestionPipeline(pdf_dir, sec_dir, work_dir, index_dir, workers=1,
+                              embedder=StubEmbedder()).run()
+        return sorted(Manifest(os.path.join(index_dir, "manifest.json")).sources)
+
+    moved = ("doc2.pdf", "doc2" + SECTION_EXT)
+    states = [run()]
+    # os.rename mempertahankan mtime → fingerprint sama saat dikembalikan
+    os.rename(os.path.join(pdf_dir, moved[0]), os.path.join(held, moved[0]))
+    os.rename(os.path.join(sec_dir, moved[1]), os.path.join(held, moved[1]))
+    states.append(run())
+    os.rename(os.path.join(held, moved[0]), os.path.join(pdf_dir, moved[0]))
+    os.rename(os.path.join(held, moved[1]), os.path.join(sec_dir, moved[1]))
+    states.append(run())
+    return states
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=50)
+    parser.add_argument("--sections", type=int, default=400, help="section per dokumen")
+    parser.add_argument("--words", type=int, default=150, help="kata per section")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_sec_")
+    json_dir, sec_dir = os.path.join(tmp, "json"), os.path.join(tmp, "sec")
+    os.makedirs(json_dir)
+    try:
+        write_legacy(json_dir, synthetic_corpus(args.docs, chunks_per_doc=args.sections, words_per_chunk=args.words))
+        t0 = time.perf_counter()
+        convert_dir(json_dir, sec_dir)
+        t_convert = time.perf_counter() - t0
+        print(f"[→] {args.docs} dokumen × {args.sections} section; konversi {t_convert:.2f} s; "
+              f"JSON {dir_size(json_dir, '.json') / 1e6:.1f} MB vs .sec {dir_size(sec_dir, SECTION_EXT) / 1e6:.1f} MB")
+
+        def legacy_all():
+            n = 0
+            for p in json_files(json_dir):
+                with open(p, encoding="utf-8") as f:
+                    n += sum(len(s["content"]) for s in json.load(f)["sections"])
+            return n
+
+        def new_all():
+            n = 0
+            for p in sec_files(sec_dir):
+                with SectionFile(p) as sf:
+                    n += sum(len(sf.content(i)) for i in range(len(sf)))
+            return n
+
+        def legacy_summary():
+            # validate_extraction lama: json.load per file, file pertama dua kali
+            out = []
+            for p in json_files(json_dir):
+                with open(p, encoding="utf-8") as f:
+                    data = json.load(f)
+                out.append((data["num_pages"], len(data["sections"]), [s["title"] for s in data["sections"][:2]]))
+            with open(json_files(json_dir)[0], encoding="utf-8") as f:
+                json.load(f)
+            return out
+
+        def new_summary():
+            docs = corpus_index(sec_dir)
+            out = []
+            for fn, e in docs.items():
+                with SectionFile(os.path.join(sec_dir, fn)) as sf:
+                    out.append((e["num_pages"], e["n_sections"], [sf.title(i) for i in range(min(2, len(sf)))]))
+            return out
+
+        mid = args.sections // 2
+
+        def legacy_one():
+            with open(json_files(json_dir)[-1], encoding="utf-8") as f:
+                return json.load(f)["sections"][mid]["content"]
+
+        def new_one():
+            with SectionFile(sec_files(sec_dir)[-1]) as sf:
+                return sf.content(mid)
+
+        print(f"\n{'operasi':<26} {'JSON s':>9} {'.sec s':>9} {'speedup':>8} {'puncak JSON':>12} {'puncak .sec':>12}")
+        ok = True
+        for name, old, new in [("baca semua section", legacy_all, new_all),
+                               ("ringkasan validasi", legacy_summary, new_summary),
+                               ("satu section (lazy)", legacy_one, new_one)]:
+            r_old, t_old, m_old = timed(old)
+            r_new, t_new, m_new = timed(new)
+            ok &= r_old == r_new
+            print(f"{name:<26} {t_old:>9.4f} {t_new:>9.4f} {t_old / t_new:>7.1f}× "
+                  f"{m_old / 1e6:>10.1f}MB {m_new / 1e6:>10.1f}MB")
+
+        same = True
+        for pj, ps in zip(json_files(json_dir), sec_files(sec_dir)):
+            with open(pj, encoding="utf-8") as f:
+                data = json.load(f)
+            with SectionFile(ps) as sf:
+                same &= [(s["title"], s["content"]) for s in data["sections"]] == \
+                        [(sf.title(i), sf.content(i)) for i in range(len(sf))]
+        print(f"[{'✓' if ok and same else '✗'}] Hasil konversi dan semua pembacaan identik dengan JSON lama")
+
+        states = readd_cycle(os.path.join(tmp, "cycle"))
+        full = ["doc0.sec", "doc1.sec", "doc2.sec"]
+        cycle_ok = states == [full, full[:2], full]
+        print(f"[{'✓' if cycle_ok else '✗'}] Pipeline hapus → tambah kembali: "
+              + " → ".join(str(len(s)) for s in states) + " dokumen ter-index")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark scaling embedding ter-shard (src.indexer.shard_embed): satu
+proses dengan semua thread vs N worker process × (core / N) thread, pada
+chunk store sintetis. Encoder CPU-bound (CpuEmbedder: feature hashing +
+beberapa lapis matmul BLAS, mirip beban forward transformer) sehingga
+angka mencerminkan komputasi, bukan sleep.
+
+Efisiensi = waktu 1 worker / (N × waktu N worker). Hasil merge diperiksa
+sama persis dengan embedding satu proses dan dipakai membangun index FAISS.
+
+    python -m src.benchmark.bench_shard_embed --chunks 4000 --workers 1,2,4,8
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from src.benchmark.stub_embedder import StubEmbedder, synthetic_corpus
+from src.indexer import shard_embed
+from src.indexer.chunk_store import ChunkStore
+from src.indexer.faiss_index import build_index
+
+EMBEDDER_SPEC = "src.benchmark.bench_shard_embed:cpu_embedder"
+
+
+class CpuEmbedder(StubEmbedder):
+    """Vektor hashing StubEmbedder dilewatkan `layers` lapis dense (bobot tetap, seed 0)."""
+
+    def __init__(self, dim: int = 384, hidden: int = 1536, layers: int = 4):
+        super().__init__(dim=dim, name="cpu-mlp")
+        rng = np.random.default_rng(0)
+        self.weights = [rng.standard_normal((a, b)).astype(np.float32) / np.sqrt(a)
+                        for a, b in zip([dim] + [hidden] * (layers - 1), [hidden] * (layers - 1) + [dim])]
+
+    def encode(self, texts, batch_size: int = 64, **_):
+        x = super().encode(texts)
+        for w in self.weights:
+            x = np.tanh(x @ w)
+        return x
+
+
+def cpu_embedder():
+    return CpuEmbedder(layers=int(os.environ.get("BENCH_SHARD_LAYERS", 4)))
+
+
+def make_store(path: str, n_chunks: int) -> ChunkStore:
+    docs = synthetic_corpus(max(1, n_chunks // 20), chunks_per_doc=20, words_per_chunk=120)
+    store = ChunkStore.create(path)
+    for d, chunks in enumerate(docs):
+        store.append_many((f"doc{d}_{i}", text, {"document": f"doc{d}"}) for i, text in enumerate(chunks))
+    store.flush()
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=4000)
+    parser.add_argument("--workers", default=None, help="daftar jumlah worker, default 1,2,4..CPU")
+    parser.add_argument("--shards", type=int, default=None, help="default 4 × worker maksimum")
+    parser.add_argument("--layers", type=int, default=4, help="lapis matmul CpuEmbedder (biaya per chunk)")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    counts = ([int(w) for w in args.workers.split(",")] if args.workers
+              else sorted({1, *[2 ** i for i in range(1, 7) if 2 ** i <= cores], cores}))
+    os.environ["BENCH_SHARD_LAYERS"] = str(args.layers)  # diwarisi worker spawn
+    tmp = tempfile.mkdtemp(prefix="bench_shard_")
+    try:
+        store_dir, shard_dir = os.path.join(tmp, "chunks"), os.path.join(tmp, "shards")
+        store = make_store(store_dir, args.chunks)
+        num_shards = args.shards or 4 * max(counts)
+        print(f"[→] {len(store)} chunk, {num_shards} shard, {cores} CPU, CpuEmbedder {args.layers} lapis")
+
+        reference = cpu_embedder().encode([text for _, text, _ in store.items()])
+        rows = []
+        for w in counts:
+            shard_embed.write_plan(shard_dir, store_dir, num_shards, EMBEDDER_SPEC)
+            threads = max(1, cores // w)
+            t0 = time.perf_counter()
+            shard_embed.embed_shards(shard_dir, workers=w, threads=threads)
+            wall = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            ids, vectors = shard_embed.load_shards(shard_dir)
+            index = build_index(vectors, {"index_type": "flat"})
+            index.add(vectors)
+            t_merge = time.perf_counter() - t0
+            ok = index.ntotal == len(store) and np.allclose(vectors, reference, atol=1e-5)
+            rows.append((w, threads, wall, t_merge, ok))
+
+        t1 = rows[0][2]
+        print(f"\n{'worker':>6} {'thread':>6} {'embed s':>8} {'chunk/s':>9} {'speedup':>8} "
+              f"{'efisiensi':>9} {'merge s':>8} {'hasil':>6}")
+        for w, threads, wall, t_merge, ok in rows:
+            print(f"{w:>6} {threads:>6} {wall:>8.2f} {len(store) / wall:>9,.0f} {t1 / wall:>7.2f}× "
+                  f"{t1 / (w * wall):>9.0%} {t_merge:>8.2f} {'sama' if ok else 'BEDA':>6}")
+        ok = all(r[4] for r in rows)
+        print("[✓] Merge semua konfigurasi identik dengan embedding satu proses" if ok
+              else "[✗] Hasil merge berbeda dari embedding satu proses")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark cold start: waktu import modul (proses baru, terisolasi) dan
+latensi request pertama vs berikutnya, dengan rincian inisialisasi service.
+
+    python -m src.benchmark.bench_startup
+    python -m src.benchmark.bench_startup --first_request "apa itu sciatica?"
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+MODULES = ["src.services", "archive.retriever", "src.retriever.retriever_faiss", "app"]
+
+
+def import_time(module: str) -> float:
+    code = (
+        "import time; t0 = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - t0)"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1])
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--first_request", default=None,
+                        help="query untuk mengukur retrieval pertama vs kedua (butuh index & model)")
+    args = parser.parse_args()
+
+    print("=== Waktu import (proses baru) ===")
+    for module in MODULES:
+        try:
+            print(f"  {module:35s} {1000 * import_time(module):8.0f} ms")
+        except Exception as e:
+            print(f"  {module:35s} gagal: {e}")
+
+    if args.first_request:
+        from archive.retriever import retrieve_and_rerank
+        from src import services
+        for label in ("pertama", "kedua"):
+            t0 = time.perf_counter()
+            retrieve_and_rerank(args.first_request)
+            print(f"[→] Retrieval {label:7s}: {1000 * (time.perf_counter() - t0):8.0f} ms")
+        print("=== Inisialisasi service (lazy) ===")
+        for name, secs in services.registry.init_seconds.items():
+            print(f"  {name:35s} {1000 * secs:8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Suite benchmark retrieval offline (CPU): korpus medis sintetis dengan
+query yang chunk relevannya diketahui, dijalankan untuk tiap kombinasi
+embedder × chunker (jendela) × tipe index × mode (dense/sparse/hybrid) ×
+reranker. Per konfigurasi diukur throughput indexing, persentil latensi
+query, memori (ukuran index + RSS), recall@k dan MRR@k.
+
+Hasil ditulis sebagai JSON lines (satu record per konfigurasi) agar bisa
+dibandingkan antar run; `--baseline` membandingkan dengan file hasil
+sebelumnya dan keluar dengan kode 1 bila recall/MRR turun lebih dari
+`--tolerance` (regresi).
+
+    python -m src.benchmark.bench_suite
+    python -m src.benchmark.bench_suite --windows 64,256 --index_types flat,hnsw,ivf_pq \\
+        --modes dense,hybrid --rerankers none,dense --out results/bench_suite.jsonl
+    python -m src.benchmark.bench_suite --embedders st:sentence-transformers/all-MiniLM-L6-v2
+    python -m src.benchmark.bench_suite --baseline results/main.jsonl
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+import faiss
+import numpy as np
+
+from src.benchmark.bench_faiss_index import rss_mb
+from src.benchmark.stub_embedder import StubEmbedder
+from src.indexer.chunker import Chunker, model_tokenizer
+from src.indexer.faiss_index import apply_search_params, build_index
+from src.retriever.bm25 import BM25Index, build_bm25
+from src.retriever.hybrid import fuse
+from src.retriever.rerank import make_reranker, normalize_rows
+
+TOPICS = {
+    "kardiologi": "nyeri dada angina infark miokard EKG troponin hipertensi aspirin statin "
+                  "nitrogliserin aritmia fibrilasi atrium gagal jantung ekokardiografi",
+    "neurologi": "stroke iskemik hemoragik trombolisis sciatica radikulopati lumbal saraf "
+                 "MRI kejang epilepsi migrain neuropati paresis afasia",
+    "infeksi": "sepsis antibiotik ceftriaxone pneumonia demam leukosit kultur amoksisilin "
+               "tuberkulosis malaria dengue hepatitis vaksin infeksi",
+    "endokrin": "diabetes insulin metformin glukosa HbA1c tiroid hipotiroid kortisol "
+                "obesitas dislipidemia ketoasidosis hipoglikemia",
+    "nefrologi": "gagal ginjal kreatinin dialisis proteinuria elektrolit kalium natrium "
+                 "hipertensi glomerulonefritis urinalisis edema diuretik",
+}
+COMMON = ("pasien dengan pada dan yang untuk diberikan dosis mg kg hari terapi diagnosis "
+          "prognosis pemeriksaan klinis gejala riwayat").split()
+SYLLABLES = "ka ri to sa ne mi lo pu ve da zo ri fen tin vas col mab pril sar lol".split()
+
+
+def fixture_corpus(n_docs: int, passages_per_doc: int, seed: int = 0):
+    """
+    Dokumen → passage → unit (baris). Tiap passage punya beberapa istilah
+    kunci (nama obat/temuan sintetis) yang jarang muncul di passage lain,
+    ditambah kosakata topik dokumen dan kata umum.
+    Return (units, passages): unit membawa 'passage' (ID passage sumber).
+    """
+    rng = np.random.default_rng(seed)
+    topics = list(TOPICS)
+    units, passages = [], {}
+    for d in range(n_docs):
+        topic = topics[d % len(topics)]
+        vocab = TOPICS[topic].split()
+        for p in range(passages_per_doc):
+            pid = f"d{d}p{p}"
+            keys = ["".join(rng.choice(SYLLABLES, size=3)) + str(rng.integers(10, 99)) for _ in range(3)]
+            words = list(rng.choice(vocab, size=int(rng.integers(30, 70)))) + \
+                list(rng.choice(COMMON, size=int(rng.integers(10, 25))))
+            for key in keys:
+                words.insert(int(rng.integers(0, len(words))), key)
+            passages[pid] = {"keys": keys, "topic": topic, "words": words}
+            for s in range(0, len(words), 12):
+                units.append({"book": f"Buku {topic} {d}", "chapter": f"Bab {p // 10 + 1}",
+                              "section": f"Subbab {p}", "page": str(p + 1), "passage": pid,
+                              "text": " ".join(words[s:s + 12])})
+    return units, passages
+
+
+def fixture_queries(passages: dict, n: int, seed: int = 1) -> List[Tuple[str, str]]:
+    """
+    (query, passage relevan): nol sampai dua istilah kunci + kata dari
+    passage + kata umum. Query tanpa istilah kunci menguji retriever di luar
+    pencocokan kata langka.
+    """
+    rng = np.random.default_rng(seed)
+    pids = list(passages)
+    out = []
+    for pid in rng.choice(pids, size=min(n, len(pids)), replace=False):
+        p = passages[pid]
+        words = list(rng.choice(p["keys"], size=int(rng.integers(0, 3)), replace=False))
+        words += list(rng.choice(p["words"], size=6))
+        words += list(rng.choice(COMMON, size=2))
+        rng.shuffle(words)
+        out.append((" ".join(words), str(pid)))
+    return out
+
+
+def make_embedder(spec: str):
+    """'stub' / 'stub:<dim>' (hash n-gram deterministik) atau 'st:<model>' (SentenceTransformer CPU)."""
+    if spec.startswith("stub"):
+        dim = int(spec.split(":")[1]) if ":" in spec else 384
+        return StubEmbedder(dim=dim, name=spec)
+    if spec.startswith("st:"):
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(spec[3:], device="cpu")
+    raise ValueError(f"embedder tidak dikenal: {spec!r}")
+
+
+def encode(model, texts, batch_size=64) -> np.ndarray:
+    return np.asarray(model.encode(texts, batch_size=batch_size), dtype=np.float32)
+
+
+def recall_mrr(ranked_passages: List[List[set]], truth: List[str], k: int) -> Tuple[float, float]:
+    """Chunk relevan = chunk yang memuat passage target; MRR dari posisi pertama yang relevan."""
+    hits, rr = 0, 0.0
+    for chunks, target in zip(ranked_passages, truth):
+        for pos, passages in enumerate(chunks[:k], start=1):
+            if target in passages:
+                hits += 1
+                rr += 1.0 / pos
+                break
+    return hits / len(truth), rr / len(truth)
+
+
+def pct(samples, q):
+    return 1000 * float(np.percentile(samples, q)) if samples else float("nan")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def dir_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+class Corpus:
+    """Chunk hasil satu (embedder, jendela): teks, ID, passage per chunk, embedding, BM25."""
+
+    def __init__(self, units, model, window, overlap, tmp):
+        t0 = time.perf_counter()
+        chunker = Chunker(model_tokenizer(model), window=window, overlap_tokens=overlap)
+        chunks = chunker.chunk(units)
+        self.chunk_s = time.perf_counter() - t0
+        self.stats = chunker.stats
+        self.texts = [" ".join(u["text"] for u in c) for c in chunks]
+        self.ids = [f"c{i}" for i in range(len(chunks))]
+        self.passages = [{u["passage"] for u in c} for c in chunks]
+        t0 = time.perf_counter()
+        self.vectors = encode(model, self.texts)
+        self.embed_s = time.perf_counter() - t0
+        self.unit_vectors = normalize_rows(self.vectors)  # seperti vektor Chroma dari indexer
+        self.bm25_dir = os.path.join(tmp, f"bm25_{window}")
+        t0 = time.perf_counter()
+        build_bm25(zip(self.ids, self.texts), self.bm25_dir)
+        self.bm25_s = time.perf_counter() - t0
+        self.bm25 = BM25Index(self.bm25_dir)
+        self.pos = {i: n for n, i in enumerate(self.ids)}
+
+
+def run_queries(corpus: Corpus, index, model, reranker, mode, queries, k, coarse_k):
+    """Latensi end-to-end per query (embed + search + fuse + rerank) dan passage per hit."""
+    latencies, ranked_passages = [], []
+    for query, _ in queries:
+        t0 = time.perf_counter()
+        q_vec = None
+
+        def dense_fn(q, n):
+            nonlocal q_vec
+            q_vec = encode(model, [q])
+            dists, idx = index.search(q_vec, n)
+            return [(corpus.ids[i], -float(d)) for d, i in zip(dists[0], idx[0]) if i != -1]
+
+        ranked = fuse(query, coarse_k, mode, dense_fn, corpus.bm25.search, candidates=coarse_k)
+        hits = [{"id": i, "score": s, "embedding": corpus.unit_vectors[corpus.pos[i]]} for i, s in ranked]
+        if reranker.needs_embeddings and q_vec is None:
+            q_vec = encode(model, [query])
+        hits = reranker.rerank(query, hits, k, q_emb=q_vec)
+        latencies.append(time.perf_counter() - t0)
+        ranked_passages.append([corpus.passages[corpus.pos[h["id"]]] for h in hits])
+    return latencies, ranked_passages
+
+
+def config_key(rec: dict) -> tuple:
+    c = rec["config"]
+    return tuple(c[f] for f in ("embedder", "window", "index_type", "mode", "reranker"))
+
+
+def compare(records: List[dict], baseline_path: str, k: int, tolerance: float) -> bool:
+    """Cetak delta terhadap baseline; False bila recall@k atau MRR turun > tolerance."""
+    with open(baseline_path, encoding="utf-8") as f:
+        base = {config_key(r): r for r in map(json.loads, f) if r.get("config")}
+    ok = True
+    print(f"\n=== Dibanding {baseline_path} ===")
+    for rec in records:
+        old = base.get(config_key(rec))
+        if old is None:
+            continue
+        d_recall = rec["quality"][f"recall@{k}"] - old["quality"].get(f"recall@{k}", 0.0)
+        d_mrr = rec["quality"][f"mrr@{k}"] - old["quality"].get(f"mrr@{k}", 0.0)
+        d_p95 = rec["query"]["p95_ms"] - old["query"]["p95_ms"]
+        flag = ""
+        if d_recall < -tolerance or d_mrr < -tolerance:
+            ok, flag = False, "  ← REGRESI"
+        print(f"  {'/'.join(map(str, config_key(rec)))}: recall {d_recall:+.3f}, MRR {d_mrr:+.3f}, p95 {d_p95:+.1f} ms{flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=40)
+    parser.add_argument("--passages", type=int, default=50, help="passage per dokumen")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--embedders", default="stub")
+    parser.add_argument("--windows", default="128,512", help="jendela chunker (token)")
+    parser.add_argument("--overlap", type=int, default=16)
+    parser.add_argument("--index_types", default="flat,hnsw,ivf_flat")
+    parser.add_argument("--modes", default="dense,sparse,hybrid")
+    parser.add_argument("--rerankers", default="none,dense")
+    parser.add_argument("--nlist", type=int, default=0, help="0 = otomatis (sqrt n)")
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--out", default="results/bench_suite.jsonl")
+    parser.add_argument("--baseline", default=None, help="file hasil sebelumnya untuk perbandingan")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="penurunan recall/MRR yang masih diterima")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    units, passages = fixture_corpus(args.docs, args.passages, args.seed)
+    queries = fixture_queries(passages, args.queries, args.seed + 1)
+    truth = [pid for _, pid in queries]
+    run = {"run_id": time.strftime("%Y%m%dT%H%M%S"), "git": git_commit(),
+           "corpus": {"docs": args.docs, "passages": len(passages), "units": len(units),
+                      "queries": len(queries), "seed": args.seed}}
+    print(f"[→] Korpus: {len(passages)} passage, {len(units)} unit, {len(queries)} query, k={args.k}")
+    header = (f"{'embedder':>10} {'win':>4} {'index':>8} {'mode':>6} {'rerank':>6} {'chunk':>6} "
+              f"{'idx ch/s':>9} {'MB':>6} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} "
+              f"{f'R@{args.k}':>6} {'MRR':>6}")
+    print(header)
+
+    records = []
+    tmp = tempfile.mkdtemp(prefix="bench_suite_")
+    try:
+        for spec in args.embedders.split(","):
+            model = make_embedder(spec)
+            for window in map(int, args.windows.split(",")):
+                rss0 = rss_mb()
+                corpus = Corpus(units, model, window, args.overlap, tmp)
+                for index_type in args.index_types.split(","):
+                    cfg = {"index_type": index_type, "nprobe": args.nprobe, "ef_search": 64,
+                           "nlist": args.nlist or None}
+                    t0 = time.perf_counter()
+                    index = build_index(corpus.vectors, cfg)
+                    index.add(corpus.vectors)
+                    apply_search_params(index, cfg)
+                    build_s = time.perf_counter() - t0
+                    index_bytes = int(faiss.serialize_index(index).nbytes)
+                    index_s = corpus.chunk_s + corpus.embed_s + build_s
+                    for mode, rr_name in itertools.product(args.modes.split(","), args.rerankers.split(",")):
+                        if mode == "sparse" and index_type != args.index_types.split(",")[0]:
+                            continue  # BM25 saja tidak bergantung tipe index
+                        reranker = make_reranker(rr_name)
+                        lat, ranked = run_queries(corpus, index, model, reranker, mode, queries,
+                                                  args.k, coarse_k=4 * args.k)
+                        recall, mrr = recall_mrr(ranked, truth, args.k)
+                        rec = dict(run, config={
+                            "embedder": spec, "window": window, "overlap": args.overlap,
+                            "index_type": index_type if mode != "sparse" else "-", "mode": mode,
+                            "reranker": rr_name, "nprobe": args.nprobe,
+                        }, index={
+                            "chunks": len(corpus.ids),
+                            "embedded_fraction": corpus.stats.embedded_fraction,
+                            "chunk_s": corpus.chunk_s, "embed_s": corpus.embed_s,
+                            "build_s": build_s, "bm25_s": corpus.bm25_s,
+                            "chunks_per_s": len(corpus.ids) / index_s if index_s else 0.0,
+                        }, memory={
+                            "index_bytes": index_bytes, "bm25_bytes": dir_bytes(corpus.bm25_dir),
+                            "vectors_bytes": int(corpus.vectors.nbytes),
+                            "rss_delta_mb": rss_mb() - rss0,
+                        }, query={
+                            "n": len(lat), "p50_ms": pct(lat, 50), "p95_ms": pct(lat, 95),
+                            "p99_ms": pct(lat, 99), "qps": len(lat) / sum(lat) if lat else 0.0,
+                        }, quality={f"recall@{args.k}": recall, f"mrr@{args.k}": mrr})
+                        records.append(rec)
+                        c, q = rec["config"], rec["query"]
+                        print(f"{spec:>10} {window:>4} {c['index_type']:>8} {mode:>6} {rr_name:>6} "
+                              f"{len(corpus.ids):>6} {rec['index']['chunks_per_s']:>9,.0f} "
+                              f"{index_bytes / 2**20:>6.1f} {q['p50_ms']:>7.2f} {q['p95_ms']:>7.2f} "
+                              f"{q['p99_ms']:>7.2f} {recall:>6.3f} {mrr:>6.3f}")
+                    del index
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "a", encoding="utf-8") as f:
+        for rec in records:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    print(f"[✓] {len(records)} konfigurasi → {args.out} (run {run['run_id']})")
+    if args.baseline and not compare(records, args.baseline, args.k, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
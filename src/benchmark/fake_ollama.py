@@ -0,0 +1,95 @@
+"""
+Server Ollama palsu (lokal, tanpa model) untuk benchmark jalur LLM.
+
+Meniru `/api/generate` dengan streaming NDJSON: setiap token dikirim
+sebagai satu baris JSON setelah `token_delay` detik, didahului jeda
+"prefill" sebesar `prefill_delay` per token prompt. Bila request membawa
+`context` (giliran lanjutan), token context dianggap sudah ada di KV cache:
+prefill hanya untuk token prompt baru, dan `context` balasan memuat token
+context + prompt + jawaban.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        req = json.loads(self.rfile.read(length) or b"{}")
+        srv = self.server
+        srv.requests += 1
+        prompt_tokens = len(req.get("prompt", "").split())
+        context = list(req.get("context") or [])
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        time.sleep(srv.prefill_delay * prompt_tokens)
+        stream = req.get("stream", True)
+        tokens = srv.answer_tokens()
+        if stream:
+            for tok in tokens:
+                time.sleep(srv.token_delay)
+                line = {"model": req.get("model"), "response": tok, "done": False}
+                self._write_chunk(json.dumps(line).encode() + b"\n")
+        else:
+            time.sleep(srv.token_delay * len(tokens))
+        final = {
+            "model": req.get("model"),
+            "response": "" if stream else "".join(tokens),
+            "done": True,
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": len(tokens),
+            "context": context + list(range(prompt_tokens + len(tokens))),
+        }
+        self._write_chunk(json.dumps(final).encode() + b"\n")
+        self._write_chunk(b"")
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, answer: str, token_delay: float = 0.01,
+                 prefill_delay: float = 0.0, port: int = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.answer = answer
+        self.token_delay = token_delay
+        self.prefill_delay = prefill_delay
+        self.connections = 0
+        self.requests = 0
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def answer_tokens(self) -> list:
+        words = self.answer.split(" ")
+        return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,30 @@
+"""
+Loader konfigurasi bersama: config/config.yml + config/.env.
+"""
+from functools import lru_cache
+from pathlib import Path
+
+import yaml
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+CONFIG_PATH = ROOT_DIR / "config" / "config.yml"
+ENV_PATH = ROOT_DIR / "config" / ".env"
+
+
+@lru_cache(maxsize=1)
+def load_config() -> dict:
+    """Muat .env lalu config.yml (sekali per proses)."""
+    load_dotenv(dotenv_path=ENV_PATH)
+    with open(CONFIG_PATH, encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def get(key: str, default=None):
+    """Ambil nilai bertingkat dengan notasi titik, mis. get("llm.url")."""
+    node = load_config()
+    for part in key.split("."):
+        if not isinstance(node, dict) or part not in node:
+            return default
+        node = node[part]
+    return node
@@ -1,54 +1,225 @@
 #!/usr/bin/env python3
 """
-Muat .env via absolute path, load config, bangun FAISS-GPU index menggunakan LangChain
+Muat .env via absolute path, load config, bangun FAISS index (CPU) menggunakan LangChain.
+Tipe index (flat, ivf_flat, ivf_pq, hnsw, sq_fp16, sq_int8) dari vectorstore.index_type.
+
+    python -m src.indexer.build_faiss                 # rebuild penuh
+    python -m src.indexer.build_faiss --mode update   # hanya file baru/berubah/dihapus
 """
+import argparse
 import os
-import json
-import yaml
-from pathlib import Path
-from dotenv import load_dotenv
-from langchain.vectorstores import FAISS
+from src import config
+from src.indexer.chunk_store import ChunkStore
+from src.indexer.chunker import Chunker
+from src.indexer.faiss_index import (build_index, index_settings, load_store, new_store,
+                                     save_store, supports_remove)
+from src.indexer.manifest import Manifest
+from src.indexer.metadata_index import build_metadata_index
 from src.indexer.sapbert_embeddings import SapBERTUMLSEmbeddings
+from src.ingestion.section_file import SectionFile, doc_name, list_documents
+from src.retriever.bm25 import build_bm25
 
-# 1. Muat .env menggunakan absolute path relatif terhadap file ini
-dotenv_path = Path(__file__).resolve().parents[2] / "config" / ".env"
-load_dotenv(dotenv_path=dotenv_path)
-
-# 2. Muat config.yaml menggunakan absolute path
-config_path = Path(__file__).resolve().parents[2] / "config" / "config.yaml"
-with open(config_path, encoding="utf-8") as f:
-    cfg = yaml.safe_load(f)
+# 1. Muat config.yml (+ .env) dari root repo
+cfg = config.load_config()
 
-# 3. Baca direktori sumber JSON dan path penyimpanan index dari config
+# 2. Baca direktori hasil ekstraksi (.sec) dan path penyimpanan index dari config
 JSON_DIR = cfg.get("pdf_texts_dir_json", "data/pdf_texts_json")
 INDEX_DIR = cfg.get("vectorstore", {}).get("path", "faiss_index")
+MANIFEST_PATH = os.path.join(INDEX_DIR, "manifest.json")
+BM25_DIR = os.path.join(INDEX_DIR, "bm25")
+CHUNKS_DIR = os.path.join(INDEX_DIR, "chunks")
+
+
+def list_sources(json_dir=JSON_DIR):
+    """{nama file .sec: path} untuk semua hasil ekstraksi."""
+    sources = list_documents(json_dir)
+    if not sources and any(fn.endswith(".json") for fn in os.listdir(json_dir)):
+        print(f"[✗] {json_dir} masih berisi JSON format lama; konversi dulu dengan "
+              f"`python -m src.ingestion.section_file convert --json_dir {json_dir}`")
+    return sources
+
+
+def load_chunks(fn, file_path, chunker=None):
+    """
+    Teks, metadata, dan ID stabil per section dari satu file .sec. Dengan
+    `chunker`, section dipecah per baris lalu dikumpulkan menjadi chunk yang
+    muat di jendela embedder (ID `{doc}_{section}_{k}`), bukan dipotong diam-diam.
+    """
+    texts, metas, ids = [], [], []
+    with SectionFile(file_path) as sf:
+        doc_id = sf.filename or doc_name(fn)
+        for i in range(len(sf)):
+            content = sf.content(i)
+            meta = {"document": doc_id, "section": sf.title(i)}
+            if chunker is None:
+                texts.append(content)
+                metas.append(meta)
+                ids.append(f"{doc_id}_{i}")
+                continue
+            units = [{"text": line} for line in content.split("\n") if line.strip()]
+            for k, chunk in enumerate(chunker.chunk(units)):
+                texts.append("\n".join(u["text"] for u in chunk))
+                metas.append(dict(meta))
+                ids.append(f"{doc_id}_{i}_{k}")
+    return texts, metas, ids
+
+
+def chunk_sources(embedder, sources, manifest, chunks_dir=CHUNKS_DIR) -> ChunkStore:
+    """Chunk semua `sources` ke chunk store baru; manifest diisi ulang."""
+    manifest.sources.clear()
+    store = ChunkStore.create(chunks_dir)
+    chunker = Chunker.for_model(embedder)
+    for fn, path in sources.items():
+        t, m, i = load_chunks(fn, path, chunker)
+        store.append_many(zip(i, t, m))
+        manifest.record(fn, path, i)
+    store.flush()
+    print(f"[→] Chunking: {chunker.stats}")
+    return store
+
+
+def index_vectors(embedder, store, ids, vectors):
+    """Latih index (IVF/PQ/SQ) pada sampel `vectors`, lalu tambahkan semua dengan teks dari `store`."""
+    cfg = index_settings()
+    index = build_index(vectors, cfg)
+    print(f"[→] Index {cfg['index_type']}: {len(ids)} vektor, dim {vectors.shape[1]}")
+    db = new_store(embedder, index)
+    db.add_embeddings(list(zip(store.texts(ids), vectors)), metadatas=store.metadatas(ids), ids=list(ids))
+    return db
+
+
+def build(embedder, sources, manifest, chunks_dir=CHUNKS_DIR):
+    """Bangun index (dan chunk store) dari nol untuk semua `sources`."""
+    store = chunk_sources(embedder, sources, manifest, chunks_dir)
+    ids, texts = [], []
+    for chunk_id, text, _ in store.items():
+        ids.append(chunk_id)
+        texts.append(text)
+    # Embed sekali dalam satu proses; untuk rebuild besar di CPU lihat --workers (shard_embed)
+    return index_vectors(embedder, store, ids, embedder.encode(texts))
+
+
+def build_sharded(workers, threads=None, num_shards=None):
+    """
+    Rebuild dengan embedding di `workers` process (shard_embed): chunking
+    sekali, tiap shard ke .npy di INDEX_DIR/shards, lalu merge ke FAISS.
+    """
+    from src.indexer import shard_embed
+    shard_dir = os.path.join(INDEX_DIR, shard_embed.SHARDS_DIRNAME)
+    num_shards = num_shards or shard_embed.shard_settings()["num_shards"] or 4 * workers
+    shard_embed.prepare("faiss", num_shards, "sapbert", shard_dir, chroma_path=None)
+    shard_embed.embed_shards(shard_dir, workers=workers, threads=threads)
+    return shard_embed.merge_faiss(shard_dir)
+
+
+def update(embedder, sources, manifest, index_dir=INDEX_DIR, chunks_dir=CHUNKS_DIR):
+    """
+    Update inkremental: hapus vektor milik file yang berubah/dihapus, lalu
+    embed dan tambahkan hanya file baru/berubah. None jika tidak ada perubahan.
+    """
+    plan = manifest.plan(sources)
+    print(f"[→] Rencana update: {plan}")
+    if not plan.to_index and not plan.to_delete:
+        return None
+    db = load_store(index_dir, embedder, mmap=False)
+    stale = manifest.chunk_ids(plan.to_delete)
+    if stale and not supports_remove(db.index):
+        # HNSW tidak mendukung remove_ids: bangun ulang (chunk lama diambil dari cache embedding)
+        print("[→] Index HNSW tidak bisa menghapus vektor, rebuild penuh")
+        return build(embedder, sources, manifest, chunks_dir)
+    store = ChunkStore(chunks_dir, writable=True)
+    if not len(store) and db.index_to_docstore_id:
+        # Index lama tanpa chunk store: salin dari docstore sekali
+        store.append_many(docstore_items(db))
+    if stale:
+        db.delete(stale)
+        store.delete(stale)
+    for fn in plan.removed:
+        manifest.forget(fn)
+    chunker = Chunker.for_model(embedder)
+    for fn in plan.to_index:
+        texts, metas, ids = load_chunks(fn, sources[fn], chunker)
+        if texts:
+            db.add_texts(texts, metadatas=metas, ids=ids)
+            store.append_many(zip(ids, texts, metas))
+        manifest.record(fn, sources[fn], ids)
+    store.flush()
+    if store.deleted_rows > len(store):
+        store.compact()
+    return db
+
+
+def docstore_items(db):
+    """(id, teks, metadata) untuk semua dokumen di docstore FAISS."""
+    for doc_id in db.index_to_docstore_id.values():
+        doc = db.docstore.search(doc_id)
+        yield doc_id, doc.page_content, doc.metadata
+
+
+def load_embedder(device=None, use_cache=True):
+    """
+    Embedder SapBERT-UMLS dari `embedding.*` (GPU bila ada; index tetap di CPU).
+    `device` menimpa `embedding.device`, mis. "cpu" untuk worker shard_embed.
+    """
+    emb_cfg = cfg.get("embedding", {})
+    model_name = os.getenv("EMBEDDING_MODEL") or emb_cfg.get("model")
+    return SapBERTUMLSEmbeddings(
+        model_name=model_name,
+        device=device or emb_cfg.get("device", "cuda"),
+        use_cache=use_cache,
+        max_length=emb_cfg.get("max_length", 128),
+        batch_size=emb_cfg.get("batch_size", 64),
+        max_batch_tokens=emb_cfg.get("max_batch_tokens", 8192),
+        precision=emb_cfg.get("precision", "fp32"),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["rebuild", "update"], default="rebuild")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="rebuild: embed di N worker process CPU (src.indexer.shard_embed)")
+    parser.add_argument("--threads", type=int, default=None, help="thread per worker, default CPU / workers")
+    args = parser.parse_args()
+
+    if args.mode == "rebuild" and args.workers > 1:
+        build_sharded(args.workers, args.threads)
+        return
+
+    # 3. Inisialisasi embedder SapBERT-UMLS
+    embedder = load_embedder()
+
+    sources = list_sources()
+    manifest = Manifest(MANIFEST_PATH)
+    has_index = os.path.exists(os.path.join(INDEX_DIR, "index.faiss"))
+    if args.mode == "update" and has_index:
+        db = update(embedder, sources, manifest)
+        if db is None:
+            manifest.save()
+            print("[✓] Index sudah mutakhir, tidak ada yang di-embed")
+            return
+    else:
+        db = build(embedder, sources, manifest)
+
+    save(db, manifest)
+
+
+def save(db, manifest=None):
+    """Simpan index, ID per posisi vektor, manifest, dan BM25 dari chunk store."""
+    # 4. Simpan index, ID per posisi vektor, dan manifest ke disk
+    save_store(db, INDEX_DIR)
+    if manifest is not None:
+        manifest.save()
+    print(f"FAISS index tersimpan di {INDEX_DIR}")
+
+    # 5. Indeks sparse BM25 dari chunk yang sama (untuk retrieval hybrid)
+    store = ChunkStore(CHUNKS_DIR)
+    n = build_bm25(((i, text) for i, text, _ in store.items()), BM25_DIR)
+    print(f"BM25 index ({n} chunk) tersimpan di {BM25_DIR}")
+
+    # 6. Bitmap metadata per buku/subbab untuk retrieval terfilter
+    build_metadata_index(store)
+
 
-# 4. Inisialisasi embedder SapBERT-UMLS di GPU
-model_name = os.getenv("EMBEDDING_MODEL")
-embedder = SapBERTUMLSEmbeddings(model_name=model_name, device="cuda")
-
-# 5. Kumpulkan teks dan metadata
-texts, metas = [], []
-for fn in os.listdir(JSON_DIR):
-    if not fn.endswith(".json"):
-        continue
-    file_path = os.path.join(JSON_DIR, fn)
-    with open(file_path, encoding="utf-8") as jf:
-        data = json.load(jf)
-    doc_id = data.get("filename", fn[:-5])
-    for sec in data.get("sections", []):
-        texts.append(sec.get("content", ""))
-        metas.append({"document": doc_id, "section": sec.get("title", "")})
-
-# 6. Bangun FAISS index (GPU acceleration)
-db = FAISS.from_texts(
-    texts,
-    embedder,
-    metadatas=metas,
-    faiss_mode="gpu"
-)
-
-# 7. Simpan index ke disk
-os.makedirs(INDEX_DIR, exist_ok=True)
-db.save_local(INDEX_DIR)
-print(f"FAISS index tersimpan di {INDEX_DIR}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
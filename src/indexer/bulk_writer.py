@@ -0,0 +1,152 @@
+"""
+Penulis bulk ke collection Chroma: chunk dikumpulkan lintas dokumen,
+di-encode per batch besar, lalu di-upsert per `write_batch`.
+
+Upsert (bukan add) membuat restart idempoten: chunk ID yang sudah ada
+ditimpa, bukan ditolak atau digandakan. Progress dan throughput dicetak
+tiap `report_every` chunk dan dirangkum di akhir.
+"""
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+
+from src import config
+
+
+@dataclass
+class WriteStats:
+    items: int = 0
+    encode_calls: int = 0
+    write_calls: int = 0
+    encode_seconds: float = 0.0
+    write_seconds: float = 0.0
+    started: float = 0.0
+
+    @property
+    def seconds(self) -> float:
+        return time.perf_counter() - self.started if self.started else 0.0
+
+    @property
+    def items_per_second(self) -> float:
+        s = self.seconds
+        return self.items / s if s else 0.0
+
+    def __str__(self):
+        return (f"{self.items} chunk, {self.items_per_second:,.0f} chunk/s "
+                f"(encode {self.encode_seconds:.1f} s / {self.encode_calls} batch, "
+                f"tulis {self.write_seconds:.1f} s / {self.write_calls} upsert)")
+
+
+class BulkWriter:
+    """
+    add(id, document, metadata, item) ... close().
+
+    `item` adalah input encoder (teks chunk atau gambar PIL); default
+    `document`. `encode_fn(list) -> array (n, dim)`. Buffer encode dibatasi
+    `encode_batch` sehingga gambar tidak menumpuk di memori.
+    """
+
+    def __init__(self, collection, encode_fn: Callable[[List[Any]], np.ndarray],
+                 encode_batch: int = 256, write_batch: int = 2000, report_every: int = 5000,
+                 label: str = "INDEX"):
+        self.collection = collection
+        self.encode_fn = encode_fn
+        self.encode_batch = max(1, encode_batch)
+        self.write_batch = max(1, min(write_batch, _max_batch_size(collection)))
+        self.report_every = report_every
+        self.label = label
+        self.stats = WriteStats()
+        self._inputs: List[Any] = []
+        self._pending: List[tuple] = []   # (id, document, metadata) menunggu encode
+        self._ready = {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
+        self._reported = 0
+
+    def add(self, chunk_id: str, document: str, metadata: dict, item: Any = None):
+        if not self.stats.started:
+            self.stats.started = time.perf_counter()
+        self._pending.append((chunk_id, document, metadata))
+        self._inputs.append(document if item is None else item)
+        if len(self._pending) >= self.encode_batch:
+            self._encode()
+
+    def flush(self):
+        """Encode dan tulis semua yang masih di buffer."""
+        self._encode()
+        self._write()
+
+    def close(self):
+        self.flush()
+        if self.stats.items:
+            print(f"[{self.label}] Bulk write selesai: {self.stats}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.close()
+        else:
+            self._write()  # saat error, simpan yang sudah di-encode; upsert aman diulang
+
+    # ---------- internal ----------
+    def _encode(self):
+        if not self._pending:
+            return
+        t0 = time.perf_counter()
+        vectors = np.asarray(self.encode_fn(self._inputs), dtype=np.float32)
+        self.stats.encode_seconds += time.perf_counter() - t0
+        self.stats.encode_calls += 1
+        ready = self._ready
+        for (chunk_id, document, metadata), vec in zip(self._pending, vectors.tolist()):
+            ready["ids"].append(chunk_id)
+            ready["documents"].append(document)
+            ready["metadatas"].append(metadata)
+            ready["embeddings"].append(vec)
+        self._pending, self._inputs = [], []
+        while len(ready["ids"]) >= self.write_batch:
+            self._write(self.write_batch)
+
+    def _write(self, n: Optional[int] = None):
+        ready = self._ready
+        n = len(ready["ids"]) if n is None else n
+        if not n:
+            return
+        t0 = time.perf_counter()
+        self.collection.upsert(**{k: v[:n] for k, v in ready.items()})
+        self.stats.write_seconds += time.perf_counter() - t0
+        self.stats.write_calls += 1
+        self.stats.items += n
+        for v in ready.values():
+            del v[:n]
+        if self.report_every and self.stats.items - self._reported >= self.report_every:
+            self._reported = self.stats.items
+            print(f"[{self.label}] {self.stats}")
+
+
+def _max_batch_size(collection) -> int:
+    """Batas jumlah item per request Chroma (tersedia di klien >= 0.4.x)."""
+    client = getattr(collection, "_client", None)
+    for attr in ("get_max_batch_size", "max_batch_size"):
+        value = getattr(client, attr, None)
+        try:
+            value = value() if callable(value) else value
+        except Exception:
+            continue
+        if isinstance(value, int) and value > 0:
+            return value
+    return 1 << 30
+
+
+def bulk_writer(collection, encode_fn, encode_batch: Optional[int] = None, **kwargs) -> BulkWriter:
+    """BulkWriter dengan ukuran batch dari `ingestion.*` di config."""
+    cfg = config.get("ingestion", {}) or {}
+    return BulkWriter(
+        collection,
+        encode_fn,
+        encode_batch=int(encode_batch or cfg.get("encode_batch", 256)),
+        write_batch=int(cfg.get("write_batch", 2000)),
+        report_every=int(cfg.get("report_every", 5000)),
+        **kwargs,
+    )
@@ -0,0 +1,332 @@
+"""
+Chunk store ringkas di disk: teks dan metadata chunk tanpa docstore in-RAM.
+
+Layout direktori:
+    text.bin          blob UTF-8 append-only, semua teks chunk berurutan
+    offsets.u64       uint64 (n + 1): rentang byte teks baris ke-i
+    ids.txt           chunk ID per baris (satu per baris)
+    col_<key>.u32     kode uint32 per baris untuk metadata `key` (0 = tidak ada)
+    col_<key>.jsonl   nilai unik kolom `key` (JSON per baris), kode = nomor baris
+    meta.json         jumlah baris ter-commit, daftar kolom, baris terhapus (tombstone)
+
+Semua file di-append lalu meta.json ditulis atomik saat flush(); pembaca
+hanya melihat baris hingga jumlah ter-commit. Teks dibaca lewat mmap, jadi
+memuat store hanya membaca ID dan kamus kolom, bukan isi chunk.
+"""
+import hashlib
+import json
+import mmap
+import os
+import shutil
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.indexer.manifest import atomic_write_json
+
+_U64 = np.dtype("<u8")
+_U32 = np.dtype("<u4")
+
+
+class ChunkStore:
+    """
+    Append: append(id, text, metadata) ... flush().
+    Baca: get(ids) -> [(teks, metadata)], texts(ids), metadatas(ids).
+    Chunk ID yang di-append ulang menimpa baris lama (baris terakhir menang);
+    tombstone hanya untuk delete() eksplisit.
+    """
+
+    def __init__(self, path: str, writable: bool = False):
+        self.path = path
+        self.writable = writable
+        if writable:
+            os.makedirs(path, exist_ok=True)
+        meta = self._read_meta()
+        self._n = meta["rows"]
+        self.columns: List[str] = list(meta["columns"])
+        self._deleted = set(meta.get("deleted", []))
+        self._text_bytes = 0
+        self._ids: List[str] = []
+        self._row_of: Optional[Dict[str, int]] = None
+        self._values: Dict[str, List] = {}
+        self._codes_of: Dict[str, Dict[str, int]] = {}
+        if self._n:
+            with open(self._file("ids.txt"), encoding="utf-8") as f:
+                self._ids = f.read().split("\n")[:self._n]
+            for col in self.columns:
+                with open(self._file(f"col_{col}.jsonl"), encoding="utf-8") as f:
+                    # Hanya "\n": splitlines() juga memecah U+2028/U+2029/U+0085 yang
+                    # dibiarkan apa adanya oleh json.dumps(ensure_ascii=False)
+                    self._values[col] = [None] + [json.loads(line) for line in f.read().split("\n") if line]
+            self._offsets = np.fromfile(self._file("offsets.u64"), dtype=_U64, count=self._n + 1)
+            self._text_bytes = int(self._offsets[-1])
+        else:
+            self._offsets = np.zeros(1, dtype=_U64)
+        self._codes = {col: self._load_codes(col) for col in self.columns}
+        self._blob = None
+        self._pending: List[Tuple[str, bytes, dict]] = []
+        if writable:
+            self._truncate_uncommitted()
+
+    @classmethod
+    def create(cls, path: str) -> "ChunkStore":
+        """Store kosong yang bisa ditulis (isi lama di `path` dihapus)."""
+        shutil.rmtree(path, ignore_errors=True)
+        return cls(path, writable=True)
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, "meta.json"))
+
+    # ---------- baca ----------
+    def __len__(self):
+        return len(self.row_of)
+
+    def __contains__(self, chunk_id: str):
+        return chunk_id in self.row_of
+
+    @property
+    def row_of(self) -> Dict[str, int]:
+        """chunk ID -> baris hidup terakhir (dibangun saat pertama dibutuhkan)."""
+        if self._row_of is None:
+            row_of = {}
+            for row, chunk_id in enumerate(self._ids):
+                row_of[chunk_id] = row
+            for row in self._deleted:
+                if row_of.get(self._ids[row]) == row:
+                    del row_of[self._ids[row]]
+            self._row_of = row_of
+        return self._row_of
+
+    def text_at(self, row: int) -> str:
+        lo, hi = int(self._offsets[row]), int(self._offsets[row + 1])
+        return self._mmap()[lo:hi].decode("utf-8")
+
+    def metadata_at(self, row: int) -> dict:
+        out = {}
+        for col in self.columns:
+            codes = self._codes[col]
+            code = int(codes[row]) if row < len(codes) else 0
+            if code:
+                out[col] = self._values[col][code]
+        return out
+
+    def get(self, ids: Sequence[str]) -> List[Optional[Tuple[str, dict]]]:
+        """(teks, metadata) per ID, None untuk ID yang tidak ada."""
+        out = []
+        for chunk_id in ids:
+            row = self.row_of.get(chunk_id)
+            out.append(None if row is None else (self.text_at(row), self.metadata_at(row)))
+        return out
+
+    def texts(self, ids: Sequence[str]) -> List[Optional[str]]:
+        rows = [self.row_of.get(i) for i in ids]
+        return [None if r is None else self.text_at(r) for r in rows]
+
+    def metadatas(self, ids: Sequence[str]) -> List[Optional[dict]]:
+        rows = [self.row_of.get(i) for i in ids]
+        return [None if r is None else self.metadata_at(r) for r in rows]
+
+    @property
+    def deleted_rows(self) -> int:
+        """Baris mati (dihapus atau tertimpa) yang bisa dibuang compact()."""
+        return len(self._ids) - len(self.row_of)
+
+    def column(self, col: str) -> Tuple[np.ndarray, List]:
+        """(kode uint32 per baris, nilai per kode) untuk filter/agregasi kolom."""
+        return self._codes[col], self._values[col]
+
+    def digest(self, columns: Iterable[str] = ()) -> str:
+        """
+        Hash isi ter-commit: ID per baris, baris terhapus, ukuran teks, serta
+        kode dan nilai `columns`. Isi teks sendiri tidak ikut di-hash.
+        """
+        h = hashlib.blake2b(digest_size=16)
+        h.update(json.dumps([self._n, self._text_bytes, sorted(self._deleted)]).encode("utf-8"))
+        h.update("\n".join(self._ids[:self._n]).encode("utf-8"))
+        for col in columns:
+            h.update(b"\0" + col.encode("utf-8"))
+            if col in self._codes:
+                h.update(self._codes[col][:self._n].tobytes())
+                h.update(json.dumps(self._values[col], ensure_ascii=False).encode("utf-8"))
+        return h.hexdigest()
+
+    def live_rows(self) -> List[int]:
+        """Nomor baris semua chunk hidup, urut baris (urutan items())."""
+        live = self.row_of
+        return [row for row, chunk_id in enumerate(self._ids) if live.get(chunk_id) == row]
+
+    def id_at(self, row: int) -> str:
+        return self._ids[row]
+
+    def items(self) -> Iterator[Tuple[str, str, dict]]:
+        """(id, teks, metadata) untuk semua chunk hidup, urut baris."""
+        for row in self.live_rows():
+            yield self._ids[row], self.text_at(row), self.metadata_at(row)
+
+    # ---------- tulis ----------
+    def append(self, chunk_id: str, text: str, metadata: Optional[dict] = None):
+        self._check_writable()
+        self._pending.append((chunk_id, (text or "").encode("utf-8"), metadata or {}))
+
+    def append_many(self, items: Iterable[Tuple[str, str, dict]]):
+        for chunk_id, text, metadata in items:
+            self.append(chunk_id, text, metadata)
+
+    def delete(self, ids: Iterable[str]):
+        """Tombstone; ruang dibebaskan oleh compact()."""
+        self._check_writable()
+        self.flush()
+        for chunk_id in ids:
+            row = self.row_of.pop(chunk_id, None)
+            if row is not None:
+                self._deleted.add(row)
+        self._commit()
+
+    def flush(self):
+        """Tulis baris tertunda lalu commit meta.json."""
+        self._check_writable()
+        if not self._pending:
+            if not self.exists(self.path):
+                self._commit()
+            return
+        start = self._n
+        rows = self._pending
+        self._pending = []
+        for _, _, metadata in rows:
+            for col in metadata:
+                if col not in self._codes:
+                    self._add_column(col)
+        ends = self._text_bytes + np.cumsum([len(b) for _, b, _ in rows], dtype=np.int64)
+        with open(self._file("text.bin"), "ab") as f:
+            for _, blob, _ in rows:
+                f.write(blob)
+        with open(self._file("offsets.u64"), "ab") as f:
+            if start == 0:
+                f.write(np.zeros(1, dtype=_U64).tobytes())
+            f.write(ends.astype(_U64).tobytes())
+        with open(self._file("ids.txt"), "a", encoding="utf-8") as f:
+            f.write(("\n" if start else "") + "\n".join(chunk_id for chunk_id, _, _ in rows))
+        for col in self.columns:
+            codes = np.fromiter((self._encode(col, m.get(col)) for _, _, m in rows), dtype=_U32, count=len(rows))
+            with open(self._file(f"col_{col}.u32"), "ab") as f:
+                f.write(codes.tobytes())
+            self._codes[col] = np.concatenate([self._codes[col], codes])
+        self._offsets = np.concatenate([self._offsets, ends.astype(_U64)])
+        self._text_bytes = int(self._offsets[-1])
+        for row, (chunk_id, _, _) in enumerate(rows, start=start):
+            self._ids.append(chunk_id)
+            if self._row_of is not None:
+                self._row_of[chunk_id] = row
+        self._n += len(rows)
+        if self._blob:
+            self._blob.close()  # blob bertambah: mmap dibuat ulang saat dibaca
+        self._blob = None
+        self._commit()
+
+    def compact(self):
+        """Tulis ulang store tanpa baris terhapus/tertimpa."""
+        self.flush()
+        tmp_path = f"{self.path.rstrip('/')}.compact{os.getpid()}"
+        fresh = ChunkStore.create(tmp_path)
+        fresh.append_many(self.items())
+        fresh.flush()
+        self.close()
+        shutil.rmtree(self.path)
+        os.replace(tmp_path, self.path)
+        self.__init__(self.path, writable=True)
+
+    def close(self):
+        if self.writable and self._pending:
+            self.flush()
+        if self._blob:
+            self._blob.close()
+        self._blob = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- internal ----------
+    def _check_writable(self):
+        if not self.writable:
+            raise PermissionError(f"ChunkStore {self.path} dibuka read-only")
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _read_meta(self) -> dict:
+        try:
+            with open(self._file("meta.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            if not self.writable:
+                raise
+            return {"rows": 0, "columns": []}
+
+    def _commit(self):
+        atomic_write_json(self._file("meta.json"), {
+            "rows": self._n,
+            "text_bytes": self._text_bytes,
+            "columns": self.columns,
+            "deleted": sorted(self._deleted),
+        })
+
+    def _truncate_uncommitted(self):
+        """Buang byte sisa append yang tidak sempat di-commit (mis. proses mati)."""
+        sizes = {
+            "text.bin": self._text_bytes,
+            "offsets.u64": (self._n + 1) * _U64.itemsize if self._n else 0,
+            **{f"col_{c}.u32": self._n * _U32.itemsize for c in self.columns},
+        }
+        for name, size in sizes.items():
+            path = self._file(name)
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+        ids = "\n".join(self._ids).encode("utf-8")
+        path = self._file("ids.txt")
+        if os.path.exists(path) and os.path.getsize(path) > len(ids):
+            with open(path, "r+b") as f:
+                f.truncate(len(ids))
+
+    def _mmap(self):
+        if self._blob is None:
+            with open(self._file("text.bin"), "rb") as f:
+                self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self._text_bytes else b""
+        return self._blob
+
+    def _load_codes(self, col: str) -> np.ndarray:
+        path = self._file(f"col_{col}.u32")
+        if not self._n or not os.path.exists(path):
+            return np.zeros(0, dtype=_U32)
+        return np.fromfile(path, dtype=_U32, count=self._n)
+
+    def _add_column(self, col: str):
+        """Kolom baru: baris lama diisi kode 0 (tidak ada)."""
+        self.columns.append(col)
+        self._values[col] = [None]
+        self._codes_of[col] = {}
+        zeros = np.zeros(self._n, dtype=_U32)
+        with open(self._file(f"col_{col}.u32"), "wb") as f:
+            f.write(zeros.tobytes())
+        open(self._file(f"col_{col}.jsonl"), "w", encoding="utf-8").close()
+        self._codes[col] = zeros
+
+    def _encode(self, col: str, value) -> int:
+        if value is None:
+            return 0
+        codes = self._codes_of.get(col)
+        if codes is None:
+            codes = self._codes_of[col] = {json.dumps(v, ensure_ascii=False): i
+                                           for i, v in enumerate(self._values[col]) if i}
+        key = json.dumps(value, ensure_ascii=False)
+        code = codes.get(key)
+        if code is None:
+            code = codes[key] = len(self._values[col])
+            self._values[col].append(value)
+            with open(self._file(f"col_{col}.jsonl"), "a", encoding="utf-8") as f:
+                f.write(key + "\n")
+        return code
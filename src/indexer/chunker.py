@@ -0,0 +1,192 @@
+"""
+Chunking berbasis token yang ukurannya mengikuti jendela embedder.
+
+Token tiap unit (paragraf/baris hasil ekstraksi) dihitung sekali dengan
+tokenizer model yang sama, per batch. Batas chunk dan overlap dicari di
+prefix sum panjang token (bisect), bukan dengan menjumlah ulang
+kata per unit. Unit yang sendirian lebih panjang dari jendela dipecah di
+batas token (offset karakter), sehingga seluruh teks benar-benar ter-embed.
+
+Hasil tetap list chunk berisi unit asli, jadi metadata TOC (book, chapter,
+section, page) tidak berubah.
+"""
+import re
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src import config
+
+_WORD_RE = re.compile(r"\S+")
+
+
+class WhitespaceTokenizer:
+    """Tokenizer kata (antarmuka mirip HF) untuk fallback tanpa model dan benchmark."""
+    model_max_length = 1024
+
+    def __call__(self, texts, return_offsets_mapping=False, **_):
+        if isinstance(texts, str):
+            texts = [texts]
+        if not return_offsets_mapping:
+            # Hanya panjang yang dipakai: range cukup, tanpa membuat list ID
+            return {"input_ids": [range(len(t.split())) for t in texts]}
+        spans = [[m.span() for m in _WORD_RE.finditer(t)] for t in texts]
+        return {"input_ids": [range(len(s)) for s in spans], "offset_mapping": spans}
+
+
+def model_tokenizer(model):
+    """Tokenizer HF dari SapBERTUMLSEmbeddings / SentenceTransformer / pembungkusnya."""
+    while model is not None:
+        tok = getattr(model, "tokenizer", None)
+        if tok is not None:
+            return tok
+        model = getattr(model, "model", None)
+    return None
+
+
+def model_window(model, default: int = 512) -> int:
+    """Panjang input maksimum embedder (token, termasuk token spesial)."""
+    while model is not None:
+        for attr in ("max_length", "max_seq_length"):
+            value = getattr(model, attr, None)
+            if isinstance(value, int) and value > 0:
+                return value
+        model = getattr(model, "model", None)
+    return default
+
+
+@dataclass
+class ChunkStats:
+    units: int = 0
+    chunks: int = 0
+    tokens: int = 0            # total token seluruh unit (tanpa overlap)
+    tokens_embedded: int = 0   # token yang masuk jendela embedder (tanpa duplikasi overlap)
+    seconds: float = 0.0
+
+    @property
+    def embedded_fraction(self) -> float:
+        return self.tokens_embedded / self.tokens if self.tokens else 1.0
+
+    @property
+    def units_per_second(self) -> float:
+        return self.units / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"{self.units} unit → {self.chunks} chunk, {self.tokens} token, "
+                f"{self.embedded_fraction:.1%} ter-embed, {self.units_per_second:,.0f} unit/s")
+
+
+def plan_chunks(lengths: np.ndarray, max_tokens: int, overlap_tokens: int) -> List[Tuple[int, int]]:
+    """
+    Rentang unit [start, end) per chunk: sebanyak mungkin unit dengan total
+    <= max_tokens; chunk berikutnya mulai dari unit-unit terakhir yang
+    totalnya <= overlap_tokens (dan tetap menyisakan tempat untuk unit baru).
+    """
+    n = len(lengths)
+    # list Python + bisect: pencarian skalar jauh lebih murah daripada np.searchsorted per langkah
+    prefix = [0] + np.cumsum(lengths, dtype=np.int64).tolist()
+    spans = []
+    start = 0
+    while start < n:
+        end = bisect_right(prefix, prefix[start] + max_tokens) - 1
+        end = max(end, start + 1)  # unit tunggal yang melebihi jendela tetap jadi satu chunk
+        spans.append((start, end))
+        if end >= n:
+            break
+        nxt = bisect_left(prefix, prefix[end] - overlap_tokens)
+        # Overlap + unit berikutnya harus muat dalam jendela
+        fit = bisect_left(prefix, prefix[end + 1] - max_tokens)
+        start = min(max(nxt, fit, start + 1), end)
+    return spans
+
+
+def embedded_fraction(lengths: Sequence[int], spans: Sequence[Tuple[int, int]], window: int) -> Tuple[int, int]:
+    """
+    (token ter-embed, total token) bila tiap chunk dipotong ke `window`
+    token pertama: gabungan interval token yang tercakup minimal satu chunk.
+    """
+    prefix = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=prefix[1:])
+    covered = 0
+    reach = 0
+    for s, e in sorted(spans):
+        lo, hi = int(prefix[s]), min(int(prefix[s]) + window, int(prefix[e]))
+        if hi > reach:
+            covered += hi - max(lo, reach)
+            reach = hi
+    return covered, int(prefix[-1])
+
+
+class Chunker:
+    """
+    chunk(units) -> list chunk (list unit). `window` adalah jendela embedder
+    dalam token; `reserved` token untuk token spesial ([CLS]/[SEP]).
+    """
+
+    def __init__(self, tokenizer=None, window: int = 512, overlap_tokens: int = 32,
+                 batch_size: int = 512, reserved: int = 2):
+        self.tokenizer = tokenizer or WhitespaceTokenizer()
+        self.max_tokens = max(1, window - reserved)
+        self.overlap_tokens = min(overlap_tokens, self.max_tokens // 2)
+        self.batch_size = batch_size
+        self.stats = ChunkStats()
+
+    @classmethod
+    def for_model(cls, model, overlap_tokens: Optional[int] = None):
+        """Chunker dengan tokenizer dan jendela milik embedder `model` (`chunking.*` di config)."""
+        cfg = config.get("chunking", {}) or {}
+        return cls(
+            model_tokenizer(model),
+            window=model_window(model),
+            overlap_tokens=int(overlap_tokens if overlap_tokens is not None else cfg.get("overlap_tokens", 32)),
+            batch_size=int(cfg.get("batch_size", 512)),
+        )
+
+    def count_tokens(self, texts: Sequence[str]) -> np.ndarray:
+        """Jumlah token per teks (tanpa token spesial), tokenisasi per batch."""
+        out = np.empty(len(texts), dtype=np.int64)
+        for i in range(0, len(texts), self.batch_size):
+            ids = self.tokenizer(list(texts[i:i + self.batch_size]), add_special_tokens=False,
+                                 truncation=False)["input_ids"]
+            out[i:i + len(ids)] = [len(x) for x in ids]
+        return out
+
+    def _split_long(self, units: List[dict], lengths: np.ndarray) -> Tuple[List[dict], np.ndarray]:
+        """Pecah unit yang > max_tokens di batas token; metadata disalin ke tiap potongan."""
+        long_idx = np.flatnonzero(lengths > self.max_tokens)
+        if not len(long_idx):
+            return units, lengths
+        enc = self.tokenizer([units[i]["text"] for i in long_idx], add_special_tokens=False,
+                             truncation=False, return_offsets_mapping=True)
+        pieces = {}
+        for i, offsets in zip(long_idx, enc["offset_mapping"]):
+            text = units[i]["text"]
+            parts = []
+            for s in range(0, len(offsets), self.max_tokens):
+                window = offsets[s:s + self.max_tokens]
+                parts.append((dict(units[i], text=text[window[0][0]:window[-1][1]].strip()), len(window)))
+            pieces[int(i)] = parts
+        new_units, new_lengths = [], []
+        for i, (u, n) in enumerate(zip(units, lengths)):
+            for part, m in pieces.get(i, [(u, int(n))]):
+                new_units.append(part)
+                new_lengths.append(m)
+        return new_units, np.asarray(new_lengths, dtype=np.int64)
+
+    def chunk(self, units: List[dict]) -> List[List[dict]]:
+        t0 = time.perf_counter()
+        if not units:
+            return []
+        lengths = self.count_tokens([u["text"] for u in units])
+        units, lengths = self._split_long(units, lengths)
+        spans = plan_chunks(lengths, self.max_tokens, self.overlap_tokens)
+        covered, total = embedded_fraction(lengths, spans, self.max_tokens)
+        self.stats.units += len(units)
+        self.stats.chunks += len(spans)
+        self.stats.tokens += total
+        self.stats.tokens_embedded += covered
+        self.stats.seconds += time.perf_counter() - t0
+        return [units[s:e] for s, e in spans]
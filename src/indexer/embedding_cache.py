@@ -0,0 +1,265 @@
+"""
+Cache embedding content-addressed di disk: kunci (model, hash teks, max_length).
+
+Vektor disimpan sebagai shard float32 yang di-memory-map, indeks kunci di
+SQLite, dengan LRU di memori di depannya. Ukuran dibatasi `max_bytes`;
+bila terlampaui, shard yang paling lama tidak diakses dibuang utuh.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from src import config
+
+_SQL_CHUNK = 900  # batas aman jumlah parameter SQLite per query
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class EmbeddingCache:
+    """Cache vektor untuk satu (model_name, max_length)."""
+
+    def __init__(
+        self,
+        root: str,
+        model_name: str,
+        max_length: int,
+        shard_rows: int = 16384,
+        max_bytes: int = 4 << 30,
+        lru_items: int = 50000,
+    ):
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.dir = Path(root) / f"{slug}__{max_length}"
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.model_name = model_name
+        self.max_length = max_length
+        self.shard_rows = shard_rows
+        self.max_bytes = max_bytes
+        self.lru_items = lru_items
+
+        self._lock = threading.RLock()
+        self._lru: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._maps = {}
+        self._touched = {}
+        self.hits_mem = self.hits_disk = self.misses = 0
+
+        self.db = sqlite3.connect(self.dir / "index.sqlite", check_same_thread=False)
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT);
+            CREATE TABLE IF NOT EXISTS shards (id INTEGER PRIMARY KEY, rows INTEGER, last_access REAL);
+            CREATE TABLE IF NOT EXISTS entries (key BLOB PRIMARY KEY, shard INTEGER, row INTEGER);
+            CREATE INDEX IF NOT EXISTS entries_shard ON entries (shard);
+            """
+        )
+        row = self.db.execute("SELECT v FROM meta WHERE k='dim'").fetchone()
+        self.dim: Optional[int] = int(row[0]) if row else None
+
+    # ---------- shard helpers ----------
+    def _shard_path(self, shard: int) -> Path:
+        return self.dir / f"shard_{shard:06d}.f32"
+
+    def _shard_bytes(self) -> int:
+        return self.shard_rows * self.dim * 4
+
+    def _map(self, shard: int) -> np.memmap:
+        mm = self._maps.get(shard)
+        if mm is None:
+            mm = np.memmap(self._shard_path(shard), dtype=np.float32, mode="r+",
+                           shape=(self.shard_rows, self.dim))
+            self._maps[shard] = mm
+        return mm
+
+    def _new_shard(self) -> int:
+        cur = self.db.execute("INSERT INTO shards (rows, last_access) VALUES (0, ?)", (time.time(),))
+        shard = cur.lastrowid
+        with open(self._shard_path(shard), "wb") as f:
+            f.truncate(self._shard_bytes())
+        return shard
+
+    def _evict(self):
+        n_shards = self.db.execute("SELECT COUNT(*) FROM shards").fetchone()[0]
+        while n_shards > 1 and n_shards * self._shard_bytes() > self.max_bytes:
+            (victim,) = self.db.execute(
+                "SELECT id FROM shards ORDER BY last_access ASC LIMIT 1"
+            ).fetchone()
+            self.db.execute("DELETE FROM entries WHERE shard=?", (victim,))
+            self.db.execute("DELETE FROM shards WHERE id=?", (victim,))
+            mm = self._maps.pop(victim, None)
+            del mm
+            self._touched.pop(victim, None)
+            os.remove(self._shard_path(victim))
+            n_shards -= 1
+
+    # ---------- API ----------
+    def get_many(self, keys: Sequence[bytes]) -> dict:
+        """Kembalikan {key: vektor} untuk kunci yang ada di cache."""
+        found = {}
+        with self._lock:
+            pending = []
+            for k in keys:
+                v = self._lru.get(k)
+                if v is not None:
+                    self._lru.move_to_end(k)
+                    found[k] = v
+                    self.hits_mem += 1
+                else:
+                    pending.append(k)
+            if pending and self.dim is not None:
+                now = time.time()
+                for i in range(0, len(pending), _SQL_CHUNK):
+                    part = pending[i : i + _SQL_CHUNK]
+                    rows = self.db.execute(
+                        f"SELECT key, shard, row FROM entries WHERE key IN ({','.join('?' * len(part))})",
+                        part,
+                    ).fetchall()
+                    for k, shard, r in rows:
+                        v = np.array(self._map(shard)[r])
+                        found[k] = v
+                        self._remember(k, v)
+                        self._touched[shard] = now
+                self.hits_disk += sum(1 for k in pending if k in found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, keys: Sequence[bytes], vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(keys) == 0:
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('dim', ?)", (str(self.dim),))
+            row = self.db.execute("SELECT id, rows FROM shards ORDER BY id DESC LIMIT 1").fetchone()
+            shard, used = row if row else (self._new_shard(), 0)
+            entries = []
+            i = 0
+            while i < len(keys):
+                if used >= self.shard_rows:
+                    self._map(shard).flush()
+                    self.db.execute("UPDATE shards SET rows=? WHERE id=?", (used, shard))
+                    shard, used = self._new_shard(), 0
+                n = min(self.shard_rows - used, len(keys) - i)
+                self._map(shard)[used : used + n] = vectors[i : i + n]
+                entries.extend((keys[i + j], shard, used + j) for j in range(n))
+                for j in range(n):
+                    self._remember(keys[i + j], vectors[i + j].copy())
+                used += n
+                i += n
+            self._map(shard).flush()
+            self.db.execute("UPDATE shards SET rows=?, last_access=? WHERE id=?", (used, time.time(), shard))
+            self.db.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", entries)
+            self._flush_touched()
+            self._evict()
+            self.db.commit()
+
+    def encode(self, texts: Sequence[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Embedding untuk `texts`; hanya teks yang belum ada di cache (unik)
+        yang dikirim ke `encode_fn`. Hasil: array float32 (n, dim).
+        """
+        keys = [text_key(t) for t in texts]
+        found = self.get_many(list(dict.fromkeys(keys)))
+        missing = {}
+        for k, t in zip(keys, texts):
+            if k not in found and k not in missing:
+                missing[k] = t
+        if missing:
+            new = np.asarray(encode_fn(list(missing.values())), dtype=np.float32)
+            self.put_many(list(missing.keys()), new)
+            found.update(zip(missing.keys(), new))
+        if not keys:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.stack([found[k] for k in keys]).astype(np.float32, copy=False)
+
+    def _remember(self, key: bytes, vec: np.ndarray):
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_items:
+            self._lru.popitem(last=False)
+
+    def _flush_touched(self):
+        if self._touched:
+            self.db.executemany(
+                "UPDATE shards SET last_access=? WHERE id=?",
+                [(t, s) for s, t in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits_mem + self.hits_disk + self.misses
+            n_entries = self.db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            n_shards = self.db.execute("SELECT COUNT(*) FROM shards").fetchone()[0]
+            return {
+                "model": self.model_name,
+                "max_length": self.max_length,
+                "hits_mem": self.hits_mem,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": (self.hits_mem + self.hits_disk) / lookups if lookups else 0.0,
+                "entries": n_entries,
+                "disk_bytes": n_shards * self._shard_bytes() if self.dim else 0,
+            }
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self.db.commit()
+            self._maps.clear()
+            self.db.close()
+
+
+class CachedSentenceTransformer:
+    """
+    Pembungkus `SentenceTransformer.encode` yang lewat EmbeddingCache.
+    `encode(str)` -> vektor 1-D, `encode(list)` -> array (n, dim).
+    """
+
+    def __init__(self, model, model_name: str, cache: Optional[EmbeddingCache] = None, batch_size: int = 64):
+        self.model = model
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache = cache or get_cache(model_name, model.max_seq_length)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True)
+
+    def encode(self, texts, **_):
+        if isinstance(texts, str):
+            return self.cache.encode([texts], self._encode)[0]
+        return self.cache.encode(list(texts), self._encode)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(model_name: str, max_length: int) -> EmbeddingCache:
+    """Cache bersama per proses, dikonfigurasi dari `embedding_cache.*`."""
+    key = (model_name, max_length)
+    with _caches_lock:
+        if key not in _caches:
+            cfg = config.get("embedding_cache", {}) or {}
+            root = Path(cfg.get("path", "cache/embeddings"))
+            if not root.is_absolute():
+                root = config.ROOT_DIR / root
+            _caches[key] = EmbeddingCache(
+                str(root),
+                model_name,
+                max_length,
+                shard_rows=int(cfg.get("shard_rows", 16384)),
+                max_bytes=int(float(cfg.get("max_gb", 4)) * (1 << 30)),
+                lru_items=int(cfg.get("lru_items", 50000)),
+            )
+        return _caches[key]
@@ -0,0 +1,224 @@
+"""
+Tipe index FAISS di CPU untuk vector store SapBERT, dipilih lewat
+`vectorstore.index_type` di config.yml:
+
+    flat      exact (IndexFlatL2), 4·d byte per vektor
+    ivf_flat  IVF{nlist},Flat      — exact per cluster, cari `nprobe` cluster
+    ivf_pq    IVF{nlist},PQ{m}x8   — ~m byte per vektor
+    hnsw      HNSW{M},Flat         — graf, `ef_search`; tidak mendukung remove_ids
+    sq_fp16   SQfp16               — 2·d byte per vektor
+    sq_int8   SQ8                  — d byte per vektor
+
+Index yang perlu training dilatih pada sampel acak vektor (`train_size`).
+Saat dimuat, index di-memory-map read-only (inverted list / kode vektor
+dibaca langsung dari page cache, bukan disalin ke RAM proses).
+"""
+import math
+import os
+import pickle
+from typing import Optional
+
+import faiss
+import numpy as np
+
+from src import config
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw", "sq_fp16", "sq_int8")
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "index.pkl"
+POSITIONS_FILE = "index_ids.txt"  # docstore ID per posisi vektor, satu per baris
+
+
+def index_settings(overrides: Optional[dict] = None) -> dict:
+    """`vectorstore.*` dari config dengan default, ditimpa `overrides`."""
+    cfg = dict(config.get("vectorstore", {}) or {})
+    cfg.update(overrides or {})
+    cfg.setdefault("index_type", "flat")
+    if cfg["index_type"] not in INDEX_TYPES:
+        raise ValueError(f"vectorstore.index_type harus salah satu dari {INDEX_TYPES}, "
+                         f"bukan {cfg['index_type']!r}")
+    return cfg
+
+
+def resolve_nlist(n_vectors: int, nlist=None) -> int:
+    """nlist eksplisit, atau ~4·sqrt(n); dibatasi agar tiap cluster punya >= 39 vektor latih."""
+    nlist = int(nlist or 4 * math.sqrt(max(n_vectors, 1)))
+    return max(1, min(nlist, n_vectors // 39 or 1))
+
+
+def factory_string(index_type: str, dim: int, n_vectors: int, cfg: dict) -> str:
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf_flat":
+        return f"IVF{resolve_nlist(n_vectors, cfg.get('nlist'))},Flat"
+    if index_type == "ivf_pq":
+        m = int(cfg.get("pq_m", 64))
+        if dim % m:
+            raise ValueError(f"vectorstore.pq_m={m} harus membagi dimensi {dim}")
+        return f"IVF{resolve_nlist(n_vectors, cfg.get('nlist'))},PQ{m}x{int(cfg.get('pq_nbits', 8))}"
+    if index_type == "hnsw":
+        return f"HNSW{int(cfg.get('hnsw_m', 32))},Flat"
+    if index_type == "sq_fp16":
+        return "SQfp16"
+    if index_type == "sq_int8":
+        return "SQ8"
+    raise ValueError(index_type)
+
+
+def train_sample(vectors: np.ndarray, size: int, seed: int = 0) -> np.ndarray:
+    """Sampel acak (tanpa pengembalian) maksimal `size` baris untuk training."""
+    if len(vectors) <= size:
+        return vectors
+    rng = np.random.default_rng(seed)
+    idx = np.sort(rng.choice(len(vectors), size=size, replace=False))
+    return vectors[idx]
+
+
+def build_index(vectors: np.ndarray, cfg: Optional[dict] = None) -> faiss.Index:
+    """Index kosong sesuai `cfg`, sudah dilatih pada sampel dari `vectors` (belum di-add)."""
+    cfg = index_settings(cfg)
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    index = faiss.index_factory(dim, factory_string(cfg["index_type"], dim, n, cfg), faiss.METRIC_L2)
+    if cfg["index_type"] == "hnsw":
+        index.hnsw.efConstruction = int(cfg.get("ef_construction", 200))
+    if not index.is_trained:
+        nlist = getattr(faiss.try_extract_index_ivf(index), "nlist", 1)
+        size = max(int(cfg.get("train_size", 100_000)), 39 * nlist)
+        index.train(train_sample(vectors, size, seed=int(cfg.get("seed", 0))))
+    apply_search_params(index, cfg)
+    return index
+
+
+def apply_search_params(index: faiss.Index, cfg: Optional[dict] = None):
+    """Set nprobe (IVF) / efSearch (HNSW) dari config."""
+    cfg = index_settings(cfg)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(int(cfg.get("nprobe", 16)), ivf.nlist)
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = int(cfg.get("ef_search", 64))
+
+
+def _selector(mask: np.ndarray):
+    bits = np.packbits(np.asarray(mask, dtype=bool), bitorder="little")
+    return bits, faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bits))
+
+
+def filtered_params(index: faiss.Index, mask: np.ndarray, cfg: Optional[dict] = None,
+                    exhaustive: bool = False) -> faiss.SearchParameters:
+    """
+    Parameter search yang hanya menerima posisi vektor dengan mask True
+    (IDSelectorBitmap, dicek di dalam scan index). Untuk filter selektif,
+    nprobe (IVF) / efSearch (HNSW) dinaikkan sebanding 1 / fraksi lolos,
+    maksimal `filter_max_boost`×, agar top-k tetap terisi vektor yang lolos.
+    exhaustive=True: IVF memeriksa semua list.
+    """
+    cfg = index_settings(cfg)
+    bits, sel = _selector(mask)
+    frac = max(int(np.count_nonzero(mask)), 1) / max(len(mask), 1)
+    boost = min(float(cfg.get("filter_max_boost", 8)), 1 / frac)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        nprobe = ivf.nlist if exhaustive else min(ivf.nlist, math.ceil(ivf.nprobe * boost))
+        params = faiss.SearchParametersIVF(sel=sel, nprobe=nprobe)
+    elif hasattr(index, "hnsw"):
+        params = faiss.SearchParametersHNSW(sel=sel, efSearch=math.ceil(index.hnsw.efSearch * boost))
+    else:
+        params = faiss.SearchParameters(sel=sel)
+    params.referenced_objects = [bits, sel]  # bitmap harus hidup selama params dipakai
+    return params
+
+
+def filtered_search(index: faiss.Index, queries: np.ndarray, k: int, mask: np.ndarray,
+                    cfg: Optional[dict] = None):
+    """
+    index.search yang dibatasi posisi dengan mask True. Filter yang meloloskan
+    <= `filter_exact_frac` vektor dicari eksak: tetangga terdekat di dalam
+    subset jarang berada di list IVF / wilayah graf HNSW dekat query, sehingga
+    boost nprobe/efSearch tetap kehilangan recall. IVF lalu memeriksa semua
+    list (jarak hanya dihitung untuk vektor lolos); HNSW memakai storage flat-nya.
+    """
+    cfg = index_settings(cfg)
+    frac = int(np.count_nonzero(mask)) / max(len(mask), 1)
+    exact = frac <= float(cfg.get("filter_exact_frac", 0.2))
+    if exact and hasattr(index, "hnsw"):
+        bits, sel = _selector(mask)
+        params = faiss.SearchParameters(sel=sel)
+        params.referenced_objects = [bits, sel]
+        return faiss.downcast_index(index.storage).search(queries, k, params=params)
+    return index.search(queries, k, params=filtered_params(index, mask, cfg, exhaustive=exact))
+
+
+def supports_remove(index: faiss.Index) -> bool:
+    return not hasattr(index, "hnsw")
+
+
+def read_index(path: str, mmap: bool = True) -> faiss.Index:
+    """Baca index; mmap=True memetakan data dari disk (read-only)."""
+    flags = 0
+    if mmap:
+        # IO_FLAG_MMAP_IFC (faiss >= 1.8) juga memetakan kode flat/HNSW/SQ, bukan hanya
+        # inverted list IVF; kedua flag tidak boleh digabung
+        flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+    return faiss.read_index(path, flags)
+
+
+def save_store(db, index_dir: str):
+    """
+    save_local LangChain yang atomik: index.faiss / index.pkl / index_ids.txt
+    ditulis dulu dengan nama sementara di direktori yang sama, baru lalu
+    di-os.replace berturut-turut. Retriever yang sedang memetakan index lama
+    (mmap) tetap memegang inode lama; menimpa file in-place akan memotongnya
+    dan bisa memicu SIGBUS di pembaca. Pembaca yang mulai di tengah replace
+    bisa melihat pasangan campuran, jadi jumlah ID tetap dicek saat dimuat.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    tmp_name = f"index.tmp{os.getpid()}"
+    db.save_local(index_dir, index_name=tmp_name)
+    ids_tmp = write_positions(db, index_dir)
+    for tmp, final in ((tmp_name + ".faiss", INDEX_FILE), (tmp_name + ".pkl", DOCSTORE_FILE),
+                       (ids_tmp, POSITIONS_FILE)):
+        os.replace(os.path.join(index_dir, tmp), os.path.join(index_dir, final))
+
+
+def write_positions(db, index_dir: str) -> str:
+    """Tulis ID per posisi vektor ke file sementara; return namanya (relatif ke `index_dir`)."""
+    ids = [db.index_to_docstore_id[i] for i in range(len(db.index_to_docstore_id))]
+    tmp = POSITIONS_FILE + f".tmp{os.getpid()}"
+    with open(os.path.join(index_dir, tmp), "w", encoding="utf-8") as f:
+        f.write("\n".join(ids))
+    return tmp
+
+
+def load_positions(index_dir: str) -> Optional[list]:
+    path = os.path.join(index_dir, POSITIONS_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    return text.split("\n") if text else []
+
+
+def new_store(embedder, index: faiss.Index):
+    """Vector store LangChain kosong di atas `index` yang sudah disiapkan."""
+    from langchain.docstore.in_memory import InMemoryDocstore
+    from langchain.vectorstores import FAISS
+    return FAISS(embedder, index, InMemoryDocstore(), {})
+
+
+def load_store(index_dir: str, embedder, mmap: bool = True, cfg: Optional[dict] = None):
+    """
+    Muat vector store dari `save_local` LangChain (index.faiss + index.pkl),
+    dengan index di-memory-map dan parameter pencarian dari config.
+    mmap=False untuk index yang akan dimodifikasi (mode update).
+    """
+    from langchain.vectorstores import FAISS
+    index = read_index(os.path.join(index_dir, INDEX_FILE), mmap=mmap)
+    apply_search_params(index, cfg)
+    with open(os.path.join(index_dir, DOCSTORE_FILE), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    if len(index_to_docstore_id) != index.ntotal:
+        raise ValueError(f"{index_dir}: {DOCSTORE_FILE} memetakan {len(index_to_docstore_id)} ID, "
+                         f"{INDEX_FILE} berisi {index.ntotal} vektor (index tidak sepasang)")
+    return FAISS(embedder, index, docstore, index_to_docstore_id)
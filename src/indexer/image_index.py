@@ -0,0 +1,189 @@
+"""
+Index gambar di collection Chroma tersendiri (ruang vektor CLIP).
+
+Sebelumnya gambar dibuka penuh dengan PIL, dikonversi RGB pada resolusi
+asli, di-encode satu per satu, dan vektornya (ruang CLIP) dicampur dengan
+vektor teks MiniLM di `rag_medical`. Di sini:
+
+  - decode paralel (thread; decoder PIL melepas GIL) dengan `Image.draft`
+    sehingga JPEG besar langsung di-decode pada skala 1/2…1/8, lalu
+    diperkecil ke sisi pendek `size` piksel (resolusi input CLIP);
+  - encode per batch lewat BulkWriter;
+  - file yang isinya sama (sha256) dilewati; file yang hanya berganti nama
+    memakai ulang vektornya tanpa decode/encode;
+  - vektor disimpan di collection `images.collection`; query teks → gambar
+    memakai encoder teks CLIP (`images.text_model`, lihat search_images di
+    archive/retriever.py).
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src import config
+from src.indexer.bulk_writer import bulk_writer
+from src.indexer.manifest import Manifest, file_sha256
+
+IMAGE_COLLECTION = "rag_medical_images"
+IMAGE_MODEL = "clip-ViT-B-32"
+IMAGE_MANIFEST_NAME = "image_manifest.json"
+IMAGE_SIZE = 224  # sisi pendek input CLIP ViT-B/32
+IMAGE_EXTS = ("png", "jpg", "jpeg", "bmp", "tif", "tiff")
+
+
+def image_settings() -> dict:
+    cfg = config.get("images", {}) or {}
+    return {
+        "collection": cfg.get("collection", IMAGE_COLLECTION),
+        "model": cfg.get("model", IMAGE_MODEL),
+        "text_model": cfg.get("text_model") or cfg.get("model", IMAGE_MODEL),
+        "size": int(cfg.get("size", IMAGE_SIZE)),
+        "encode_batch": int(cfg.get("encode_batch", 64)),
+        "decode_workers": cfg.get("decode_workers") or min(8, os.cpu_count() or 1),
+    }
+
+
+@lru_cache(maxsize=2)
+def load_clip(name: str = IMAGE_MODEL):
+    """SentenceTransformer CLIP, dimuat sekali per proses (bukan setiap build)."""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name)
+
+
+def load_image(path: str, size: int = IMAGE_SIZE):
+    """
+    Gambar RGB dengan sisi pendek ~`size`. `draft` membuat decoder JPEG
+    bekerja pada skala terkecil yang masih >= size, sehingga scan radiologi
+    beresolusi tinggi tidak pernah di-decode penuh.
+    """
+    from PIL import Image
+    with Image.open(path) as img:
+        width, height = img.size
+        scale = size / min(width, height)
+        if scale < 1:
+            img.draft("RGB", (max(size, round(width * scale)), max(size, round(height * scale))))
+        img.load()
+        if img.mode in ("I", "I;16", "I;16B", "I;16L"):
+            # Citra medis 16-bit: skala ke 8-bit sebelum RGB (convert langsung memotong nilai)
+            img = img.convert("I").point(lambda v: v * (1 / 256)).convert("L")
+        if min(img.size) > size:
+            scale = size / min(img.size)
+            img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))),
+                             Image.BICUBIC, reducing_gap=2.0)
+        return img.convert("RGB"), (width, height)
+
+
+def decode_images(paths: List[Tuple[str, str]], size: int = IMAGE_SIZE, workers: int = 4,
+                  window: int = 64) -> Iterator[Tuple[str, object, Optional[tuple], Optional[Exception]]]:
+    """
+    Yield (nama, gambar, ukuran asli, error) sesuai urutan `paths`. Paling
+    banyak `window` gambar ter-decode menunggu encoder (memori terbatas).
+    """
+    def job(path):
+        try:
+            img, orig = load_image(path, size)
+            return img, orig, None
+        except Exception as e:  # file rusak: dilaporkan, build jalan terus
+            return None, None, e
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="img-decode") as pool:
+        pending = []
+        it = iter(paths)
+        for name, path in it:
+            pending.append((name, pool.submit(job, path)))
+            if len(pending) >= window:
+                break
+        while pending:
+            name, fut = pending.pop(0)
+            nxt = next(it, None)
+            if nxt is not None:
+                pending.append((nxt[0], pool.submit(job, nxt[1])))
+            yield (name, *fut.result())
+
+
+def _reuse_renamed(collection, manifest: Manifest, todo: Dict[str, str], removed: Dict[str, dict]) -> List[str]:
+    """
+    File baru yang isinya sama dengan file yang dihapus/diganti nama: salin
+    vektornya dengan metadata baru. Return nama file yang sudah ditangani.
+    """
+    by_hash = {e["sha256"]: e for e in removed.values() if e.get("chunk_ids")}
+    if not by_hash:
+        return []
+    done = []
+    for name, path in todo.items():
+        entry = by_hash.get(file_sha256(path))
+        if entry is None:
+            continue
+        old = collection.get(ids=entry["chunk_ids"], include=["embeddings", "metadatas"])
+        if not old["ids"]:
+            continue
+        metadata = dict(old["metadatas"][0], source=name)
+        collection.upsert(ids=[name], embeddings=[list(old["embeddings"][0])],
+                          documents=[f"<Image: {name}>"], metadatas=[metadata])
+        manifest.record(name, path, [name])
+        done.append(name)
+    return done
+
+
+def index_images(collection, files: Dict[str, str], manifest: Manifest, model=None,
+                 settings: Optional[dict] = None) -> int:
+    """Decode paralel + encode batch untuk `{nama: path}`; return jumlah gambar ter-index."""
+    s = settings or image_settings()
+    model = model or load_clip(s["model"])
+    writer = bulk_writer(collection, model.encode, encode_batch=s["encode_batch"], label="IMAGE")
+    n = 0
+    for name, img, orig, err in decode_images(list(files.items()), s["size"], int(s["decode_workers"])):
+        if err is not None:
+            print(f"[✗] Gambar {name} dilewati: {err}")
+            continue
+        metadata = {"source": name, "type": "image", "width": orig[0], "height": orig[1]}
+        writer.add(name, f"<Image: {name}>", metadata, item=img)
+        manifest.record(name, files[name], [name])
+        n += 1
+    writer.close()
+    return n
+
+
+def build_image_index(image_folder: str, client, index_dir: str, mode: str = "update",
+                      exts: Tuple[str, ...] = IMAGE_EXTS) -> dict:
+    """
+    Sinkronkan collection gambar dengan isi `image_folder`. Manifest gambar
+    (hash, mtime, ukuran) disimpan di `index_dir`; mode "rebuild" mengosongkan
+    collection dan meng-encode semua gambar.
+    """
+    s = image_settings()
+    manifest = Manifest(os.path.join(index_dir, IMAGE_MANIFEST_NAME))
+    if mode == "rebuild":
+        try:
+            client.delete_collection(s["collection"])
+        except Exception:
+            pass  # collection belum ada
+        manifest.sources = {}
+    # Ruang vektor CLIP: metrik cosine, terpisah dari collection teks
+    collection = client.get_or_create_collection(s["collection"], metadata={"hnsw:space": "cosine"})
+
+    files = {}
+    if os.path.isdir(image_folder):
+        files = {fn: os.path.join(image_folder, fn) for fn in sorted(os.listdir(image_folder))
+                 if fn.lower().rsplit(".", 1)[-1] in exts}
+    plan = manifest.plan(files)
+    print(f"[INDEX] Gambar: {plan}")
+    removed = {fn: manifest.sources[fn] for fn in plan.to_delete}
+    stale = manifest.chunk_ids(plan.to_delete)
+    todo = {fn: files[fn] for fn in plan.to_index}
+
+    reused = _reuse_renamed(collection, manifest, {fn: todo[fn] for fn in plan.added}, removed)
+    for fn in reused:
+        todo.pop(fn)
+    if stale:
+        collection.delete(ids=stale)
+    for fn in plan.removed:
+        manifest.forget(fn)
+
+    n = index_images(collection, todo, manifest, settings=s) if todo else 0
+    manifest.save()
+    stats = {"indexed": n, "reused": len(reused), "deleted": len(plan.removed),
+             "unchanged": len(plan.unchanged), "total": collection.count()}
+    print(f"[INDEX] Gambar: {n} di-encode, {len(reused)} dipakai ulang (ganti nama), "
+          f"{len(plan.unchanged)} tetap → {stats['total']} di '{s['collection']}'")
+    return stats
@@ -0,0 +1,136 @@
+"""
+Manifest sumber yang sudah di-index: hash file, mtime, ukuran, dan chunk ID.
+
+Dipakai mode `update` agar hanya file baru/berubah yang di-embed ulang dan
+vektor milik file yang dihapus/berubah dibuang dari index.
+"""
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List
+
+
+def file_sha256(path: str, bufsize: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(bufsize), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def atomic_write_json(path: str, data, **kwargs):
+    """Tulis JSON ke file sementara lalu os.replace, supaya tidak pernah setengah jadi."""
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, **kwargs)
+    os.replace(tmp, path)
+
+
+@dataclass
+class UpdatePlan:
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+    @property
+    def to_index(self) -> List[str]:
+        return self.added + self.changed
+
+    @property
+    def to_delete(self) -> List[str]:
+        return self.changed + self.removed
+
+    def __str__(self):
+        return (f"+{len(self.added)} baru, ~{len(self.changed)} berubah, "
+                f"-{len(self.removed)} dihapus, ={len(self.unchanged)} tetap")
+
+
+class Manifest:
+    """Peta `source -> {sha256, mtime, size, chunk_ids}` yang disimpan sebagai JSON."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.sources: Dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.sources = json.load(f).get("sources", {})
+
+    def plan(self, paths: Dict[str, str]) -> UpdatePlan:
+        """
+        Bandingkan `{source: path}` di disk dengan manifest. File dengan mtime
+        dan ukuran sama dianggap tetap tanpa di-hash; sisanya di-hash ulang.
+        """
+        plan = UpdatePlan()
+        for source, path in paths.items():
+            entry = self.sources.get(source)
+            if entry is None:
+                plan.added.append(source)
+                continue
+            st = os.stat(path)
+            if st.st_mtime == entry["mtime"] and st.st_size == entry["size"]:
+                plan.unchanged.append(source)
+            elif file_sha256(path) == entry["sha256"]:
+                # Hanya tersentuh (touch/copy), isi sama: perbarui mtime saja
+                entry["mtime"], entry["size"] = st.st_mtime, st.st_size
+                plan.unchanged.append(source)
+            else:
+                plan.changed.append(source)
+        plan.removed = [s for s in self.sources if s not in paths]
+        return plan
+
+    def chunk_ids(self, sources: Iterable[str]) -> List[str]:
+        ids = []
+        for s in sources:
+            ids.extend(self.sources.get(s, {}).get("chunk_ids", []))
+        return ids
+
+    def record(self, source: str, path: str, chunk_ids: List[str]):
+        st = os.stat(path)
+        self.sources[source] = {
+            "sha256": file_sha256(path),
+            "mtime": st.st_mtime,
+            "size": st.st_size,
+            "chunk_ids": list(chunk_ids),
+        }
+
+    def forget(self, source: str):
+        self.sources.pop(source, None)
+
+    @property
+    def version(self) -> str:
+        """Hash isi index (sha256 per sumber); berubah setiap ada update nyata."""
+        h = hashlib.sha256()
+        for s in sorted(self.sources):
+            h.update(f"{s}\0{self.sources[s]['sha256']}\n".encode("utf-8"))
+        return h.hexdigest()[:16]
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        atomic_write_json(self.path, {"version": self.version, "sources": self.sources})
+
+
+class ManifestVersion:
+    """
+    Callable -> versi manifest di `path` ("" bila belum ada). File hanya
+    dibaca ulang bila mtime-nya berubah, jadi murah dipanggil per query.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime = None
+        self._version = ""
+
+    def __call__(self) -> str:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            self._mtime, self._version = None, ""
+            return ""
+        if mtime != self._mtime:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self._mtime = mtime
+            self._version = data.get("version", "")
+        return self._version
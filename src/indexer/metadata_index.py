@@ -0,0 +1,271 @@
+"""
+Bitmap metadata per buku, bab, subbab, dan tipe chunk untuk retrieval terfilter.
+
+Metadata chunk di Chroma berupa string gabungan ("Bab 1, Bab 3") yang tidak
+bisa di-query efisien. Di sini, saat index dibangun, kolom chunk store
+(kode uint32 per baris) diubah menjadi himpunan baris per nilai:
+
+    <chunks>/bitmaps/keys.json   {field: {nilai: [offset, byte, jenis, jumlah]}}, nilai mentah per kolom
+    <chunks>/bitmaps/data.bin    blob: bitmap packbits (nilai umum) atau baris uint32 terurut
+                                 (nilai jarang; lebih kecil dari bitmap bila < 1/32 baris)
+
+Bab/subbab dibaca dari metadata terstruktur (`chapter_list`/`section_list`,
+ditulis indexer multimodal) dan bila belum ada, dari string gabungannya.
+Filter {field: nilai | [nilai, ...]} = OR di dalam field, AND antar field.
+mask() memberi boolean per baris chunk store yang dipetakan ke posisi tiap
+retriever (vektor FAISS, dokumen BM25) dengan store_rows(); where() memberi
+klausa `where` Chroma setara. Filter diterapkan di dalam pencarian, bukan
+memotong hasil top-k global.
+"""
+import json
+import os
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.indexer.manifest import atomic_write_json
+
+FIELDS = ("book", "chapter", "section", "type")
+# Kolom chunk store per field, urut prioritas (build_faiss menyimpan `document`/`section`)
+FIELD_COLUMNS = {
+    "book": ("book", "document"),
+    "chapter": ("chapter_list", "chapters", "chapter"),
+    "section": ("section_list", "sections", "section"),
+    "type": ("type",),
+}
+LIST_COLUMNS = ("chapter_list", "section_list")  # hanya di chunk store; Chroma menerima skalar saja
+SPLIT_FIELDS = ("chapter", "section")  # string gabungan ", " dipecah bila kolom list tidak ada
+EMPTY = ("", "–")
+BITMAPS_DIRNAME = "bitmaps"
+_U32 = np.dtype("<u4")
+
+
+def scalar_metadata(meta: dict) -> dict:
+    """Metadata tanpa kolom list, untuk Chroma."""
+    return {k: v for k, v in meta.items() if k not in LIST_COLUMNS}
+
+
+def normalize_filters(filters: Optional[dict]) -> Optional[Dict[str, tuple]]:
+    """{field: nilai | [nilai]} -> {field: (nilai, ...)} terurut; None bila tidak ada filter."""
+    out = {}
+    for field, values in (filters or {}).items():
+        if field not in FIELDS:
+            raise ValueError(f"field filter harus salah satu dari {FIELDS}, bukan {field!r}")
+        values = [values] if isinstance(values, str) else list(values or [])
+        values = tuple(sorted({str(v) for v in values if v not in (None, *EMPTY)}))
+        if values:
+            out[field] = values
+    return out or None
+
+
+def _parts(value, split: bool) -> List[str]:
+    if isinstance(value, (list, tuple)):
+        parts = [str(v) for v in value]
+    elif split and isinstance(value, str):
+        parts = value.split(", ")
+    else:
+        parts = [str(value)]
+    return [p.strip() for p in parts if p is not None and p.strip() not in EMPTY]
+
+
+def store_rows(store, ids: Sequence[str]) -> np.ndarray:
+    """Baris chunk store per posisi `ids` (-1 bila tidak ada), untuk memetakan mask."""
+    row_of = store.row_of
+    return np.fromiter((row_of.get(i, -1) for i in ids), dtype=np.int64, count=len(ids))
+
+
+def positions_mask(mask: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Mask per baris store -> mask per posisi retriever (lihat store_rows)."""
+    out = np.zeros(len(rows), dtype=bool)
+    ok = rows >= 0
+    out[ok] = mask[rows[ok]]
+    return out
+
+
+class MetadataIndex:
+    """
+    values(field) untuk UI, rows(field, nilai), mask(filters) (di-cache per
+    filter), where(filters) untuk Chroma. Dibangun dengan build() dan
+    disimpan dengan save(); load_for(store) memakai file bila masih cocok.
+    """
+
+    def __init__(self, n_rows: int, entries: dict, raw: dict, blob, fingerprint: dict, max_cached: int = 16):
+        self.n_rows = n_rows
+        self.entries = entries  # field -> nilai -> (offset, nbytes, jenis, jumlah)
+        self.raw = raw          # field -> nilai -> kolom -> [string mentah di kolom itu]
+        self.blob = blob
+        self.fingerprint = fingerprint
+        self.max_cached = max_cached
+        self._masks: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+
+    # ---------- bangun / simpan / muat ----------
+    @classmethod
+    def build(cls, store) -> "MetadataIndex":
+        n = len(store) + store.deleted_rows
+        live = np.zeros(n, dtype=bool)
+        live[store.live_rows()] = True
+        found = {f: defaultdict(list) for f in FIELDS}
+        for field, cols in FIELD_COLUMNS.items():
+            assigned = ~live  # baris mati tidak pernah masuk bitmap
+            for col in cols:
+                if col not in store.columns:
+                    continue
+                codes, values = store.column(col)
+                rows = np.flatnonzero((codes[:n] > 0) & ~assigned)
+                if not len(rows):
+                    continue
+                assigned[rows] = True
+                # Kelompokkan baris per kode: satu sort, bukan satu scan per nilai unik
+                codes = codes[rows]
+                order = np.argsort(codes, kind="stable")
+                rows, codes = rows[order], codes[order]
+                uniq, starts = np.unique(codes, return_index=True)
+                ends = np.append(starts[1:], len(codes))
+                split = field in SPLIT_FIELDS and col not in LIST_COLUMNS
+                for code, lo, hi in zip(uniq.tolist(), starts.tolist(), ends.tolist()):
+                    for part in _parts(values[code], split):
+                        found[field][part].append(rows[lo:hi])
+        entries, raw, chunks, offset = {}, {}, [], 0
+        for field in FIELDS:
+            entries[field], raw[field] = {}, {}
+            scalar_cols = [c for c in FIELD_COLUMNS[field] if c in store.columns and c not in LIST_COLUMNS]
+            for value in sorted(found[field]):
+                rows = np.unique(np.concatenate(found[field][value]))
+                # String mentah kolom skalar (yang disimpan Chroma) milik baris-baris ini, untuk where()
+                raw[field][value] = {}
+                for col in scalar_cols:
+                    codes, values = store.column(col)
+                    strings = [values[c] for c in np.unique(codes[rows]).tolist() if c and isinstance(values[c], str)]
+                    if strings:
+                        raw[field][value][col] = strings
+                if len(rows) * 32 > n:
+                    mask = np.zeros(n, dtype=bool)
+                    mask[rows] = True
+                    data, kind = np.packbits(mask, bitorder="little").tobytes(), "bits"
+                else:
+                    data, kind = rows.astype(_U32).tobytes(), "rows"
+                entries[field][value] = (offset, len(data), kind, len(rows))
+                chunks.append(data)
+                offset += len(data)
+        return cls(n, entries, raw, b"".join(chunks), cls.store_fingerprint(store))
+
+    @staticmethod
+    def store_fingerprint(store) -> dict:
+        """Jumlah baris + hash ID dan kolom sumber bitmap: metadata yang diedit ikut terdeteksi."""
+        cols = [c for cs in FIELD_COLUMNS.values() for c in cs if c in store.columns]
+        return {"rows": len(store) + store.deleted_rows, "live": len(store), "digest": store.digest(cols)}
+
+    def save(self, out_dir: str):
+        os.makedirs(out_dir, exist_ok=True)
+        tmp = os.path.join(out_dir, f"data.bin.tmp{os.getpid()}")
+        with open(tmp, "wb") as f:
+            f.write(self.blob)
+        os.replace(tmp, os.path.join(out_dir, "data.bin"))
+        atomic_write_json(os.path.join(out_dir, "keys.json"), {
+            "n_rows": self.n_rows, "bytes": len(self.blob), "store": self.fingerprint,
+            "entries": self.entries, "raw": self.raw,
+        })
+
+    @classmethod
+    def load(cls, path: str) -> Optional["MetadataIndex"]:
+        """Index tersimpan di `path`; None bila tidak ada atau tidak utuh."""
+        try:
+            with open(os.path.join(path, "keys.json"), encoding="utf-8") as f:
+                keys = json.load(f)
+            data = os.path.join(path, "data.bin")
+            if os.path.getsize(data) != keys["bytes"]:
+                return None
+            blob = np.memmap(data, dtype=np.uint8, mode="r") if keys["bytes"] else b""
+        except (OSError, ValueError, KeyError):
+            return None
+        entries = {f: {v: tuple(e) for v, e in vals.items()} for f, vals in keys["entries"].items()}
+        return cls(keys["n_rows"], entries, keys["raw"], blob, keys["store"])
+
+    @classmethod
+    def load_for(cls, store, path: Optional[str] = None) -> "MetadataIndex":
+        """Bitmap tersimpan bila cocok dengan `store`; selain itu dibangun di memori."""
+        index = cls.load(path or os.path.join(store.path, BITMAPS_DIRNAME))
+        if index is None or index.fingerprint != cls.store_fingerprint(store):
+            index = cls.build(store)
+        return index
+
+    # ---------- query ----------
+    def values(self, field: str, within: Optional[np.ndarray] = None) -> List[str]:
+        """Nilai unik `field` (terurut); dengan `within`, hanya nilai yang punya baris di mask itu."""
+        values = list(self.entries.get(field, {}))
+        if within is None:
+            return values
+        return [v for v in values if within[self.rows(field, v)].any()]
+
+    def count(self, field: str, value: str) -> int:
+        entry = self.entries.get(field, {}).get(value)
+        return entry[3] if entry else 0
+
+    def rows(self, field: str, value: str) -> np.ndarray:
+        entry = self.entries.get(field, {}).get(value)
+        if entry is None:
+            return np.zeros(0, dtype=np.int64)
+        offset, nbytes, kind, _ = entry
+        data = np.frombuffer(self.blob[offset:offset + nbytes], dtype=np.uint8)
+        if kind == "bits":
+            return np.flatnonzero(np.unpackbits(data, count=self.n_rows, bitorder="little"))
+        return data.view(_U32).astype(np.int64)
+
+    def _dense(self, field: str, value: str) -> np.ndarray:
+        entry = self.entries.get(field, {}).get(value)
+        if entry is not None and entry[2] == "bits":
+            offset, nbytes = entry[0], entry[1]
+            data = np.frombuffer(self.blob[offset:offset + nbytes], dtype=np.uint8)
+            return np.unpackbits(data, count=self.n_rows, bitorder="little").view(bool)
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.rows(field, value)] = True
+        return mask
+
+    def mask(self, filters: Optional[dict]) -> Optional[np.ndarray]:
+        """Boolean per baris chunk store (read-only, di-cache); None = tanpa filter."""
+        filters = normalize_filters(filters)
+        if filters is None:
+            return None
+        key = tuple(sorted(filters.items()))
+        mask = self._masks.get(key)
+        if mask is not None:
+            self._masks.move_to_end(key)
+            return mask
+        for field, values in filters.items():
+            m = self._dense(field, values[0]).copy()
+            for value in values[1:]:
+                m |= self._dense(field, value)
+            mask = m if mask is None else mask & m
+        mask.flags.writeable = False
+        self._masks[key] = mask
+        if len(self._masks) > self.max_cached:
+            self._masks.popitem(last=False)
+        return mask
+
+    def where(self, filters: Optional[dict]) -> Optional[dict]:
+        """Klausa `where` Chroma setara mask(); None = tanpa filter."""
+        filters = normalize_filters(filters)
+        if filters is None:
+            return None
+        clauses = []
+        for field, values in filters.items():
+            by_col = defaultdict(set)
+            for value in values:
+                for col, raw in self.raw.get(field, {}).get(value, {}).items():
+                    by_col[col].update(raw)
+            if not by_col:
+                # Nilai tidak dikenal: klausa yang tidak cocok dengan chunk mana pun
+                by_col[next(c for c in FIELD_COLUMNS[field] if c not in LIST_COLUMNS)] = set(values)
+            ors = [{col: {"$in": sorted(raw)}} for col, raw in sorted(by_col.items())]
+            clauses.append(ors[0] if len(ors) == 1 else {"$or": ors})
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def build_metadata_index(store, out_dir: Optional[str] = None) -> MetadataIndex:
+    """Bangun bitmap dari `store` dan simpan di `<store>/bitmaps` (dipanggil indexer)."""
+    index = MetadataIndex.build(store)
+    index.save(out_dir or os.path.join(store.path, BITMAPS_DIRNAME))
+    sizes = {f: len(v) for f, v in index.entries.items()}
+    print(f"[INDEX] Bitmap metadata: {sizes} ({len(index.blob) / 1e6:.1f} MB)")
+    return index
@@ -4,33 +4,97 @@ import torch
 from transformers import AutoTokenizer, AutoModel
 from langchain.embeddings.base import Embeddings
 
+from src.indexer.embedding_cache import get_cache
+
+PRECISIONS = ("fp32", "bf16", "int8")
+
+
 class SapBERTUMLSEmbeddings(Embeddings):
-    """Embedding dengan SapBERT-UMLS menggunakan CLS-token rep."""
-    def __init__(self, model_name: str = "cambridgeltl/SapBERT-UMLS-2020AB-all-lang-from-XLMR", device: str = "cuda"):
+    """
+    Embedding dengan SapBERT-UMLS menggunakan CLS-token rep.
+
+    Encoder berorientasi throughput: input diurutkan menurut panjang token
+    lalu dibagi ke bucket dengan padding dinamis (bukan pad ke max_length),
+    dijalankan di bawah torch.inference_mode(), opsional bf16 / int8
+    (dynamic quantization, CPU), dan hasilnya array np.float32 kontigu.
+    embed_documents / embed_query hanyalah adapter list untuk LangChain.
+    """
+    def __init__(self, model_name: str = "cambridgeltl/SapBERT-UMLS-2020AB-all-lang-from-XLMR", device: str = "cuda",
+                 max_length: int = 128, batch_size: int = 64, max_batch_tokens: int = 8192,
+                 precision: str = "fp32", use_cache: bool = True):
+        if precision not in PRECISIONS:
+            raise ValueError(f"precision harus salah satu dari {PRECISIONS}, bukan {precision!r}")
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model     = AutoModel.from_pretrained(model_name).to(device)
+        model = AutoModel.from_pretrained(model_name).eval()
+        if precision == "int8":
+            if device != "cpu":
+                raise ValueError("precision='int8' hanya didukung di device='cpu'")
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        elif precision == "bf16":
+            model = model.to(torch.bfloat16)
+        self.model     = model.to(device)
         self.device    = device
+        self.precision = precision
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.dim       = self.model.config.hidden_size
+        # Cache content-addressed: teks yang sudah pernah di-embed tidak di-encode ulang.
+        # Vektor bf16/int8 berbeda dari fp32, jadi presisi ikut menentukan direktori cache
+        # (fp32 tetap memakai kunci lama agar cache yang ada terpakai)
+        cache_key = model_name if precision == "fp32" else f"{model_name}@{precision}"
+        self.cache     = get_cache(cache_key, max_length) if use_cache else None
 
+    # ---------- adapter LangChain ----------
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        return self._batch_encode(texts)
+        return self.encode(texts).tolist()
 
     def embed_query(self, text: str) -> List[float]:
-        return self._batch_encode([text])[0]
-
-    def _batch_encode(self, texts: List[str], bs: int = 64) -> List[List[float]]:
-        all_embs = []
-        for i in range(0, len(texts), bs):
-            batch = texts[i : i + bs]
-            toks = self.tokenizer.batch_encode_plus(
-                batch,
-                padding="max_length",
-                truncation=True,
-                max_length=128,
-                return_tensors="pt"
-            )
-            for k, v in toks.items():
-                toks[k] = v.to(self.device)
-            # output[0] shape: (bs, seq_len, hidden_size)
-            cls_rep = self.model(**toks)[0][:, 0, :].detach().cpu().numpy()
-            all_embs.append(cls_rep)
-        return np.vstack(all_embs).tolist()
\ No newline at end of file
+        return self.encode_query(text).tolist()
+
+    # ---------- API numpy ----------
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """(n, dim) float32 untuk banyak teks."""
+        if self.cache is None:
+            return self._encode(texts)
+        return self.cache.encode(texts, self._encode)
+
+    def encode_query(self, text: str) -> np.ndarray:
+        """(dim,) float32 untuk satu teks: tanpa sorting/bucketing."""
+        if self.cache is not None:
+            return self.cache.encode([text], self._encode)[0]
+        return self._encode([text])[0]
+
+    def _forward(self, input_ids: List[List[int]]) -> np.ndarray:
+        batch = self.tokenizer.pad({"input_ids": input_ids}, padding=True, return_tensors="pt")
+        batch = {k: v.to(self.device) for k, v in batch.items()}
+        # output[0] shape: (bs, seq_len, hidden_size)
+        cls_rep = self.model(**batch)[0][:, 0, :]
+        return cls_rep.float().cpu().numpy()
+
+    def _buckets(self, lengths: np.ndarray):
+        """Indeks terurut-panjang dipotong per batch_size / max_batch_tokens."""
+        order = np.argsort(lengths, kind="stable")
+        start = 0
+        for end in range(1, len(order) + 1):
+            size = end - start
+            # order terurut naik: elemen terakhir menentukan panjang padding
+            if size == self.batch_size or (end < len(order) and
+                                           (size + 1) * lengths[order[end]] > self.max_batch_tokens):
+                yield order[start:end]
+                start = end
+        if start < len(order):
+            yield order[start:]
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        if not texts:
+            return out
+        # Tokenisasi sekali (tanpa padding) untuk mengetahui panjang tiap input
+        ids = self.tokenizer(list(texts), truncation=True, max_length=self.max_length,
+                             padding=False)["input_ids"]
+        lengths = np.fromiter((len(x) for x in ids), dtype=np.int64, count=len(ids))
+        with torch.inference_mode():
+            for idx in self._buckets(lengths):
+                out[idx] = self._forward([ids[i] for i in idx])
+        return out
@@ -0,0 +1,415 @@
+"""
+Embedding ter-shard untuk rebuild besar di host CPU-only.
+
+Satu proses PyTorch tidak memakai puluhan core secara efisien dan tidak
+bisa dibagi ke beberapa mesin. Di sini chunk hidup di chunk store dibagi
+ke N shard (rentang baris berurutan); tiap shard di-embed oleh worker
+process sendiri dengan batas thread sendiri, atau oleh invocation terpisah
+di node lain yang melihat direktori yang sama (mis. NFS):
+
+    shards/plan.json                  jumlah shard, chunk, fingerprint chunk store, embedder
+    shards/shard-00003-of-00016.ids   chunk ID per baris
+    shards/shard-00003-of-00016.npy   float32 (n, dim), urutan baris = .ids
+
+File .npy ditulis atomik paling akhir, jadi shard yang sudah ada dilewati
+saat dijalankan ulang. Langkah merge memeriksa semua shard terhadap chunk
+store lalu membangun index FAISS (`vectorstore.*`) atau meng-upsert ke
+collection Chroma (teks PDF; gambar tetap lewat image_index).
+
+    python -m src.indexer.shard_embed prepare --num_shards 16            # chunking sekali
+    python -m src.indexer.shard_embed embed --workers 8 --threads 8      # semua shard di host ini
+    python -m src.indexer.shard_embed embed --shards 8-15                # sebagian shard di node lain
+    python -m src.indexer.shard_embed merge
+
+Tambahkan `--target chroma` untuk collection Chroma multimodal (MiniLM).
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src import config
+from src.indexer.chunk_store import ChunkStore
+from src.indexer.manifest import atomic_write_json
+
+PLAN_FILE = "plan.json"
+SHARDS_DIRNAME = "shards"
+THREAD_ENV = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+EMBEDDERS = ("sapbert", "minilm")  # selain ini: "modul:fungsi" yang mengembalikan embedder
+
+_worker_embedder = None
+_stores = {}  # (path, fingerprint) -> (ChunkStore, baris hidup), per proses worker
+
+
+@dataclass
+class ShardStats:
+    shard: int
+    chunks: int = 0
+    seconds: float = 0.0
+    skipped: bool = False
+    worker: str = ""
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        if self.skipped:
+            return f"shard {self.shard:>4}: {self.chunks:>8} chunk, sudah ada (dilewati)"
+        return (f"shard {self.shard:>4}: {self.chunks:>8} chunk, {self.seconds:7.1f} s, "
+                f"{self.chunks_per_second:8,.0f} chunk/s ({self.worker})")
+
+
+def shard_settings() -> dict:
+    cfg = config.get("ingestion", {}) or {}
+    return {
+        "num_shards": int(cfg.get("num_shards") or 0),
+        "device": cfg.get("shard_device", "cpu"),
+        "encode_block": int(cfg.get("shard_encode_block", 4096)),
+    }
+
+
+def shard_bounds(n: int, num_shards: int) -> List[Tuple[int, int]]:
+    """Rentang [lo, hi) chunk hidup per shard, ukuran berbeda paling banyak 1."""
+    return [(k * n // num_shards, (k + 1) * n // num_shards) for k in range(num_shards)]
+
+
+def shard_name(shard: int, num_shards: int) -> str:
+    return f"shard-{shard:05d}-of-{num_shards:05d}"
+
+
+def store_fingerprint(store: ChunkStore, rows: Optional[Sequence[int]] = None) -> str:
+    """Hash urutan chunk ID hidup: shard dari chunk store lain tidak pernah tercampur."""
+    h = hashlib.blake2b(digest_size=16)
+    for row in (store.live_rows() if rows is None else rows):
+        h.update(store.id_at(row).encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+# ---------- plan ----------
+def write_plan(shard_dir: str, store_dir: str, num_shards: int, embedder: str, target: str = "faiss") -> dict:
+    """Plan baru untuk `store_dir`; shard lama di `shard_dir` dihapus."""
+    os.makedirs(shard_dir, exist_ok=True)
+    for fn in os.listdir(shard_dir):
+        if fn.startswith("shard-"):
+            os.remove(os.path.join(shard_dir, fn))
+    store = ChunkStore(store_dir)
+    rows = store.live_rows()
+    plan = {
+        "store": os.path.relpath(os.path.abspath(store_dir), os.path.abspath(shard_dir)),
+        "chunks": len(rows),
+        "num_shards": max(1, min(num_shards, len(rows) or 1)),
+        "fingerprint": store_fingerprint(store, rows),
+        "embedder": embedder,
+        "target": target,
+    }
+    atomic_write_json(os.path.join(shard_dir, PLAN_FILE), plan)
+    print(f"[→] Plan shard: {plan['chunks']} chunk → {plan['num_shards']} shard ({embedder}) di {shard_dir}")
+    return plan
+
+
+def read_plan(shard_dir: str) -> dict:
+    path = os.path.join(shard_dir, PLAN_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} tidak ada; jalankan `shard_embed prepare` dulu")
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def open_store(shard_dir: str, plan: dict) -> Tuple[ChunkStore, List[int]]:
+    """Chunk store milik plan + baris hidupnya; error bila isinya sudah berubah sejak plan dibuat."""
+    path = os.path.normpath(os.path.join(shard_dir, plan["store"]))
+    key = (path, plan["fingerprint"])
+    if key not in _stores:
+        store = ChunkStore(path)
+        rows = store.live_rows()
+        if len(rows) != plan["chunks"] or store_fingerprint(store, rows) != plan["fingerprint"]:
+            raise RuntimeError(f"Chunk store berubah sejak plan di {shard_dir} dibuat; jalankan prepare ulang")
+        _stores.clear()
+        _stores[key] = (store, rows)
+    return _stores[key]
+
+
+# ---------- embedder ----------
+def resolve_embedder(spec: str, device: Optional[str] = None):
+    """
+    "sapbert" (build_faiss.load_embedder), "minilm" (model teks multimodal),
+    atau "modul:fungsi". Worker tidak memakai cache embedding bersama
+    (file cache tidak aman ditulis banyak proses sekaligus).
+    """
+    device = device or shard_settings()["device"]
+    if spec == "sapbert":
+        from src.indexer.build_faiss import load_embedder
+        return load_embedder(device=device, use_cache=False)
+    if spec == "minilm":
+        from sentence_transformers import SentenceTransformer
+        from archive.multimodal_indexer import TXT_MODEL
+        return SentenceTransformer(TXT_MODEL, device=device)
+    module, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"embedder harus salah satu dari {EMBEDDERS} atau 'modul:fungsi', bukan {spec!r}")
+    return getattr(importlib.import_module(module), attr)()
+
+
+def _init_worker(spec: str, threads: int):
+    """Initializer worker: batas thread intra-op lalu muat embedder sekali per proses."""
+    global _worker_embedder
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_embedder = resolve_embedder(spec)
+
+
+# ---------- embed ----------
+def embed_shard(shard_dir: str, shard: int, embedder=None, encode_block: Optional[int] = None) -> ShardStats:
+    """Embed satu shard ke .ids + .npy (atomik). Shard yang sudah selesai dilewati."""
+    plan = read_plan(shard_dir)
+    n_shards = plan["num_shards"]
+    if not 0 <= shard < n_shards:
+        raise ValueError(f"shard {shard} di luar 0..{n_shards - 1}")
+    base = os.path.join(shard_dir, shard_name(shard, n_shards))
+    lo, hi = shard_bounds(plan["chunks"], n_shards)[shard]
+    stats = ShardStats(shard, chunks=hi - lo, worker=f"{socket.gethostname()}:{os.getpid()}")
+    if os.path.exists(base + ".npy"):
+        stats.skipped = True
+        return stats
+
+    store, rows = open_store(shard_dir, plan)
+    rows = rows[lo:hi]
+    embedder = embedder or _worker_embedder or resolve_embedder(plan["embedder"])
+    block = encode_block or shard_settings()["encode_block"]
+    t0 = time.perf_counter()
+    tmp = f"{base}.npy.tmp{os.getpid()}"
+    out = None
+    for s in range(0, len(rows), block):
+        vectors = np.asarray(embedder.encode([store.text_at(r) for r in rows[s:s + block]]), dtype=np.float32)
+        if out is None:
+            # Ditulis langsung ke file (memmap): memori worker tidak tumbuh dengan ukuran shard
+            out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32,
+                                            shape=(len(rows), vectors.shape[1]))
+        out[s:s + len(vectors)] = vectors
+    if out is None:
+        with open(tmp, "wb") as f:
+            np.save(f, np.zeros((0, 0), dtype=np.float32))
+    else:
+        out.flush()
+        del out
+    ids_tmp = f"{base}.ids.tmp{os.getpid()}"
+    with open(ids_tmp, "w", encoding="utf-8") as f:
+        f.write("\n".join(store.id_at(r) for r in rows))
+    os.replace(ids_tmp, base + ".ids")
+    os.replace(tmp, base + ".npy")
+    stats.seconds = time.perf_counter() - t0
+    return stats
+
+
+def parse_shards(text: Optional[str], num_shards: int) -> List[int]:
+    """"0-3,7" -> [0, 1, 2, 3, 7]; None = semua shard."""
+    if not text:
+        return list(range(num_shards))
+    out = []
+    for part in text.split(","):
+        lo, _, hi = part.partition("-")
+        out.extend(range(int(lo), int(hi or lo) + 1))
+    return out
+
+
+def embed_shards(shard_dir: str, shards: Optional[Sequence[int]] = None, workers: int = 1,
+                 threads: Optional[int] = None, embedder=None) -> List[ShardStats]:
+    """
+    Embed `shards` (default semua) dengan `workers` process, masing-masing
+    `threads` thread (default core / workers). workers=1 berjalan di proses
+    ini (memakai `embedder` bila diberikan). Ringkasan scaling dicetak.
+    """
+    plan = read_plan(shard_dir)
+    shards = list(range(plan["num_shards"])) if shards is None else list(shards)
+    workers = max(1, min(workers, len(shards) or 1))
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    print(f"[→] Embed {len(shards)} shard: {workers} worker × {threads} thread")
+    t0 = time.perf_counter()
+    results = []
+    if workers == 1:
+        if embedder is None:
+            _init_worker(plan["embedder"], threads)
+        for k in shards:
+            results.append(embed_shard(shard_dir, k, embedder))
+            print(f"    {results[-1]}")
+    else:
+        # Variabel thread BLAS/OpenMP harus ada sebelum worker mengimpor numpy/torch
+        saved = {k: os.environ.get(k) for k in THREAD_ENV}
+        os.environ.update({k: str(threads) for k in THREAD_ENV})
+        try:
+            # spawn: worker tidak mewarisi state thread pool / model dari proses induk
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                                     initargs=(plan["embedder"], threads)) as pool:
+                futures = [pool.submit(embed_shard, shard_dir, k) for k in shards]
+                for fut in as_completed(futures):
+                    results.append(fut.result())
+                    print(f"    {results[-1]}")
+        finally:
+            for k, v in saved.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+    report(results, time.perf_counter() - t0, workers)
+    return sorted(results, key=lambda r: r.shard)
+
+
+def report(results: List[ShardStats], wall: float, workers: int):
+    done = [r for r in results if not r.skipped]
+    chunks = sum(r.chunks for r in done)
+    busy = sum(r.seconds for r in done)
+    if not done:
+        print("[✓] Semua shard sudah ada, tidak ada yang di-embed")
+        return
+    # Efisiensi: waktu kerja worker / (wall × worker); < 1 = menunggu shard terakhir atau overhead
+    print(f"[✓] {chunks} chunk dalam {wall:.1f} s ({chunks / wall:,.0f} chunk/s); "
+          f"kerja worker {busy:.1f} s, efisiensi {busy / (wall * workers):.0%}")
+
+
+# ---------- merge ----------
+def load_shards(shard_dir: str) -> Tuple[List[str], np.ndarray]:
+    """Semua shard digabung urut shard; error bila ada shard hilang atau tidak cocok dengan plan."""
+    plan = read_plan(shard_dir)
+    n_shards = plan["num_shards"]
+    bounds = shard_bounds(plan["chunks"], n_shards)
+    missing = [k for k in range(n_shards)
+               if not os.path.exists(os.path.join(shard_dir, shard_name(k, n_shards) + ".npy"))]
+    if missing:
+        raise RuntimeError(f"{len(missing)} shard belum di-embed: {missing[:10]}")
+    ids, parts = [], []
+    for k, (lo, hi) in enumerate(bounds):
+        base = os.path.join(shard_dir, shard_name(k, n_shards))
+        vectors = np.load(base + ".npy", mmap_mode="r")
+        with open(base + ".ids", encoding="utf-8") as f:
+            text = f.read()
+        shard_ids = text.split("\n") if text else []
+        if len(shard_ids) != hi - lo or len(vectors) != hi - lo:
+            raise RuntimeError(f"shard {k}: {len(shard_ids)} ID / {len(vectors)} vektor, diharapkan {hi - lo}")
+        ids += shard_ids
+        if len(vectors):
+            parts.append(vectors)
+    dims = {p.shape[1] for p in parts}
+    if len(dims) > 1:
+        raise RuntimeError(f"Dimensi vektor antar shard berbeda: {sorted(dims)}")
+    vectors = np.concatenate(parts) if parts else np.zeros((0, 0), dtype=np.float32)
+    return ids, vectors
+
+
+def check_ids(shard_dir: str, plan: dict, ids: List[str]) -> Tuple[ChunkStore, List[int]]:
+    store, rows = open_store(shard_dir, plan)
+    if any(store.id_at(r) != i for r, i in zip(rows, ids)):
+        raise RuntimeError("Urutan chunk ID shard tidak cocok dengan chunk store")
+    return store, rows
+
+
+def merge_faiss(shard_dir: str, embedder=None):
+    """Index FAISS + posisi + BM25 di INDEX_DIR build_faiss dari shard."""
+    from src.indexer import build_faiss
+    plan = read_plan(shard_dir)
+    ids, vectors = load_shards(shard_dir)
+    store, _ = check_ids(shard_dir, plan, ids)
+    db = build_faiss.index_vectors(embedder, store, ids, vectors)
+    build_faiss.save(db)
+    return db
+
+
+def merge_chroma(shard_dir: str, chroma_path: str, collection_name: str = "rag_medical"):
+    """Collection teks Chroma dibangun ulang dari shard (upsert per batch) + BM25."""
+    import chromadb
+    from chromadb.config import Settings
+    from archive.multimodal_indexer import BM25_DIRNAME, build_bm25_from_store
+    from src.indexer.bulk_writer import bulk_writer
+    from src.indexer.metadata_index import build_metadata_index, scalar_metadata
+    from src.retriever.rerank import normalize_rows
+    plan = read_plan(shard_dir)
+    ids, vectors = load_shards(shard_dir)
+    store, rows = check_ids(shard_dir, plan, ids)
+    client = chromadb.PersistentClient(path=chroma_path, settings=Settings(anonymized_telemetry=False))
+    try:
+        client.delete_collection(collection_name)
+    except Exception:
+        pass  # collection belum ada
+    coll = client.get_or_create_collection(collection_name)
+    # Vektor sudah jadi: "encoder" BulkWriter hanya menumpuk (dan menormalisasi) vektor per batch
+    with bulk_writer(coll, lambda vecs: normalize_rows(np.stack(vecs)), label="MERGE") as writer:
+        for chunk_id, row, vec in zip(ids, rows, vectors):
+            writer.add(chunk_id, store.text_at(row), scalar_metadata(store.metadata_at(row)), item=vec)
+    build_bm25_from_store(store, os.path.join(chroma_path, BM25_DIRNAME))
+    build_metadata_index(store)
+
+
+# ---------- CLI ----------
+def prepare(target: str, num_shards: int, embedder: str, shard_dir: str, chroma_path: str,
+            pdf_folder: str = "data/articles"):
+    """Chunking sekali di satu node: chunk store + manifest + plan shard."""
+    if target == "faiss":
+        from src.indexer import build_faiss
+        manifest = build_faiss.Manifest(build_faiss.MANIFEST_PATH)
+        model = resolve_embedder(embedder)  # tokenizer + jendela untuk Chunker
+        build_faiss.chunk_sources(model, build_faiss.list_sources(), manifest)
+        store_dir = build_faiss.CHUNKS_DIR
+    else:
+        from archive.multimodal_indexer import CHUNKS_DIRNAME, MANIFEST_NAME, chunk_pdf_files
+        from src.indexer.manifest import Manifest
+        store_dir = os.path.join(chroma_path, CHUNKS_DIRNAME)
+        manifest = Manifest(os.path.join(chroma_path, MANIFEST_NAME))
+        manifest.sources = {}
+        chunk_pdf_files(pdf_folder, ChunkStore.create(store_dir),
+                        manifest, resolve_embedder(embedder))
+    manifest.save()
+    return write_plan(shard_dir, store_dir, num_shards or os.cpu_count() or 1, embedder, target)
+
+
+def default_shard_dir(target: str, chroma_path: str) -> str:
+    if target == "faiss":
+        from src.indexer.build_faiss import INDEX_DIR
+        return os.path.join(INDEX_DIR, SHARDS_DIRNAME)
+    return os.path.join(chroma_path, SHARDS_DIRNAME)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("step", choices=["prepare", "embed", "merge"])
+    parser.add_argument("--target", choices=["faiss", "chroma"], default="faiss")
+    parser.add_argument("--shard_dir", default=None, help="default <index>/shards")
+    parser.add_argument("--chroma_path", default="chroma_db")
+    parser.add_argument("--pdf_folder", default="data/articles", help="sumber PDF untuk prepare --target chroma")
+    parser.add_argument("--collection", default="rag_medical")
+    parser.add_argument("--embedder", default=None, help=f"{EMBEDDERS} atau modul:fungsi")
+    parser.add_argument("--num_shards", type=int, default=None, help="default ingestion.num_shards / jumlah CPU")
+    parser.add_argument("--shards", default=None, help="subset shard untuk node ini, mis. 0-7,12")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=None, help="thread per worker, default CPU / workers")
+    args = parser.parse_args()
+
+    shard_dir = args.shard_dir or default_shard_dir(args.target, args.chroma_path)
+    if args.step == "prepare":
+        embedder = args.embedder or ("sapbert" if args.target == "faiss" else "minilm")
+        prepare(args.target, args.num_shards or shard_settings()["num_shards"], embedder,
+                shard_dir, args.chroma_path, args.pdf_folder)
+    elif args.step == "embed":
+        plan = read_plan(shard_dir)
+        embed_shards(shard_dir, parse_shards(args.shards, plan["num_shards"]), args.workers, args.threads)
+    elif read_plan(shard_dir)["target"] == "faiss":
+        merge_faiss(shard_dir)
+    else:
+        merge_chroma(shard_dir, args.chroma_path, args.collection)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,91 @@
 """
-Ekstraksi teks PDF → JSON per file, di-segmentasi berdasarkan heading.
+Ekstraksi teks PDF → file section (.sec, lihat section_file) per PDF,
+di-segmentasi berdasarkan heading.
 """
-import os, re, json
+import os, re
 import pdfplumber
 
+from src.ingestion import section_file
+from src.ingestion.section_file import SECTION_EXT, corpus_index
+
 INPUT_DIR  = "data/pdf_texts"
 OUTPUT_DIR = "data/pdf_texts_json"
 
 # Regex sederhana deteksi heading: baris huruf besar + angka/spasi
 HEADING_RE = re.compile(r'^[A-Z][A-Za-z0-9 \-]{2,100}$')
 
+
+class SectionSplitter:
+    """
+    Versi streaming dari extract_sections_from_text: teks di-feed per halaman,
+    section yang sudah lengkap (heading berikutnya ditemukan) langsung
+    dikembalikan sehingga teks penuh dokumen tidak pernah ditahan di memori.
+
+    first_title=None menandai potongan lanjutan (shard halaman > 0): baris
+    sebelum heading pertama milik section terakhir shard sebelumnya.
+    Tiap feed() = satu halaman, mulai dari `first_page` (1-based); section
+    mencatat halaman awal dan akhirnya.
+    """
+    def __init__(self, first_title="Introduction", first_page=1):
+        self.page = first_page
+        self.current = self._new(first_title)
+
+    def _new(self, title):
+        return {"title": title, "content": [], "page_start": self.page, "page_end": self.page}
+
+    def feed(self, text):
+        """Proses teks satu halaman; return list section yang selesai (content mentah)."""
+        done = []
+        for line in text.split("\n"):
+            if HEADING_RE.match(line.strip()):
+                # jump ke section baru
+                done.append(self._emit())
+                self.current = self._new(line.strip())
+            else:
+                self.current["content"].append(line)
+                self.current["page_end"] = self.page
+        self.page += 1
+        return done
+
+    def close(self):
+        """Section terakhir yang masih terbuka."""
+        return self._emit()
+
+    def _emit(self):
+        return dict(self.current, content="\n".join(self.current["content"]))
+
+
+def finalize_section(sec):
+    # bersihkan: strip content
+    return dict(sec, content=sec["content"].strip())
+
+
 def extract_sections_from_text(text):
     """Pisahkan text ke list (heading, content)."""
-    lines = text.split("\n")
-    sections = []
-    current = {"title": "Introduction", "content": []}
-    for line in lines:
-        if HEADING_RE.match(line.strip()):
-            # jump ke section baru
-            sections.append(current)
-            current = {"title": line.strip(), "content": []}
-        else:
-            current["content"].append(line)
-    sections.append(current)
-    # bersihkan: join content
-    for sec in sections:
-        sec["content"] = "\n".join(sec["content"]).strip()
-    return sections
+    splitter = SectionSplitter()
+    sections = splitter.feed(text) + [splitter.close()]
+    return [finalize_section(sec) for sec in sections]
+
+
+class SectionWriter(section_file.SectionWriter):
+    """section_file.SectionWriter yang membersihkan section sebelum ditulis."""
+    def write(self, sec):
+        super().write(finalize_section(sec))
+
 
 def process_pdf(pdf_path, out_dir):
     filename = os.path.splitext(os.path.basename(pdf_path))[0]
     print(f"[→] Ekstrak: {filename}")
+    out_path = os.path.join(out_dir, filename + SECTION_EXT)
+    splitter = SectionSplitter()
     with pdfplumber.open(pdf_path) as pdf:
-        full_text = "\n".join(page.extract_text() or "" for page in pdf.pages)
-    sections = extract_sections_from_text(full_text)
-    out_path = os.path.join(out_dir, filename + ".json")
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump({
-            "filename": filename,
-            "num_pages": len(pdf.pages),
-            "sections": sections
-        }, f, ensure_ascii=False, indent=2)
+        with SectionWriter(out_path, filename, len(pdf.pages)) as writer:
+            # Halaman di-stream ke splitter satu per satu
+            for page in pdf.pages:
+                for sec in splitter.feed(page.extract_text() or ""):
+                    writer.write(sec)
+                page.flush_cache()
+            writer.write(splitter.close())
     print(f"[✓] Tersimpan → {out_path}")
 
 def main():
@@ -48,6 +93,7 @@ def main():
     for fn in os.listdir(INPUT_DIR):
         if fn.lower().endswith(".pdf"):
             process_pdf(os.path.join(INPUT_DIR, fn), OUTPUT_DIR)
+    corpus_index(OUTPUT_DIR)
 
 if __name__ == "__main__":
     main()
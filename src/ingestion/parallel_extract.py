@@ -0,0 +1,172 @@
+"""
+Runner ekstraksi PDF paralel (process pool).
+
+Shard per dokumen; PDF yang lebih panjang dari `pages_per_shard` dipecah
+lagi per rentang halaman. Halaman di-stream ke SectionSplitter, hasil
+ditulis atomik (file sementara + os.replace), lalu dilaporkan pages/sec
+dan waktu per file.
+
+    python -m src.ingestion.parallel_extract --workers 8 --pages_per_shard 200
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pdfplumber
+
+from src import config
+from src.ingestion.extract_pdf import INPUT_DIR, OUTPUT_DIR, SectionSplitter, SectionWriter
+from src.ingestion.section_file import SECTION_EXT, corpus_index
+
+DEFAULT_PAGES_PER_SHARD = 200
+
+
+def count_pages(pdf_path):
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def _extract_document(pdf_path, out_dir):
+    """Worker: satu dokumen utuh, di-stream langsung ke file output."""
+    t0 = time.perf_counter()
+    filename = os.path.splitext(os.path.basename(pdf_path))[0]
+    splitter = SectionSplitter()
+    with pdfplumber.open(pdf_path) as pdf:
+        n_pages = len(pdf.pages)
+        with SectionWriter(os.path.join(out_dir, filename + SECTION_EXT), filename, n_pages) as writer:
+            for page in pdf.pages:
+                for sec in splitter.feed(page.extract_text() or ""):
+                    writer.write(sec)
+                page.flush_cache()
+            writer.write(splitter.close())
+    return {"pages": n_pages, "seconds": time.perf_counter() - t0}
+
+
+def _extract_range(pdf_path, start, end):
+    """
+    Worker: halaman [start, end) saja. Section pertama shard > 0 berjudul
+    None = lanjutan section terakhir shard sebelumnya.
+    """
+    t0 = time.perf_counter()
+    splitter = SectionSplitter(first_title="Introduction" if start == 0 else None, first_page=start + 1)
+    sections = []
+    with pdfplumber.open(pdf_path, pages=list(range(start + 1, end + 1))) as pdf:
+        for page in pdf.pages:
+            sections.extend(splitter.feed(page.extract_text() or ""))
+            page.flush_cache()
+    sections.append(splitter.close())
+    return {"sections": sections, "pages": end - start, "seconds": time.perf_counter() - t0}
+
+
+class _ShardedDocument:
+    """Gabungkan hasil shard halaman sesuai urutan dan tulis secara streaming."""
+
+    def __init__(self, pdf_path, out_dir, n_pages, n_shards):
+        self.filename = os.path.splitext(os.path.basename(pdf_path))[0]
+        self.out_path = os.path.join(out_dir, self.filename + SECTION_EXT)
+        self.n_pages = n_pages
+        self.n_shards = n_shards
+        self.results = {}
+        self.next_idx = 0
+        self.pending = None
+        self.writer = None
+        self.seconds = 0.0
+
+    def add(self, idx, res):
+        """Return True bila dokumen sudah lengkap tertulis."""
+        self.results[idx] = res
+        self.seconds += res["seconds"]
+        if self.writer is None:
+            self.writer = SectionWriter(self.out_path, self.filename, self.n_pages)
+        # Hanya shard yang berurutan yang bisa ditulis; sisanya menunggu di buffer
+        while self.next_idx in self.results:
+            sections = self.results.pop(self.next_idx)["sections"]
+            if self.pending is not None and sections and sections[0]["title"] is None:
+                self.pending["content"] += "\n" + sections[0]["content"]
+                if sections[0]["content"].strip():
+                    self.pending["page_end"] = sections[0]["page_end"]
+                sections = sections[1:]
+            for sec in sections:
+                if self.pending is not None:
+                    self.writer.write(self.pending)
+                self.pending = sec
+            self.next_idx += 1
+        if self.next_idx == self.n_shards:
+            self.writer.write(self.pending)
+            self.writer.close()
+            return True
+        return False
+
+    def abort(self):
+        if self.writer is not None:
+            self.writer.abort()
+
+
+def run(input_dir=INPUT_DIR, out_dir=OUTPUT_DIR, workers=None, pages_per_shard=DEFAULT_PAGES_PER_SHARD):
+    os.makedirs(out_dir, exist_ok=True)
+    pdfs = sorted(
+        os.path.join(input_dir, fn) for fn in os.listdir(input_dir) if fn.lower().endswith(".pdf")
+    )
+    timings = {}
+    errors = {}
+    t_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        sharded = {}
+        for path in pdfs:
+            n_pages = count_pages(path)
+            if n_pages <= pages_per_shard:
+                futures[pool.submit(_extract_document, path, out_dir)] = (path, None)
+                continue
+            ranges = [(s, min(s + pages_per_shard, n_pages)) for s in range(0, n_pages, pages_per_shard)]
+            sharded[path] = _ShardedDocument(path, out_dir, n_pages, len(ranges))
+            for idx, (s, e) in enumerate(ranges):
+                futures[pool.submit(_extract_range, path, s, e)] = (path, idx)
+
+        for fut in as_completed(futures):
+            path, idx = futures[fut]
+            name = os.path.basename(path)
+            if path in errors:
+                continue
+            try:
+                res = fut.result()
+            except Exception as e:
+                errors[path] = e
+                if path in sharded:
+                    sharded[path].abort()
+                print(f"[✗] Gagal: {name}: {e}")
+                continue
+            if idx is None:
+                timings[name] = (res["pages"], res["seconds"])
+                print(f"[✓] {name}: {res['pages']} hlm, {res['seconds']:.1f} s")
+            elif sharded[path].add(idx, res):
+                doc = sharded[path]
+                timings[name] = (doc.n_pages, doc.seconds)
+                print(f"[✓] {name}: {doc.n_pages} hlm ({doc.n_shards} shard), {doc.seconds:.1f} s CPU")
+
+    wall = time.perf_counter() - t_start
+    corpus_index(out_dir)
+    total_pages = sum(p for p, _ in timings.values())
+    print("\n=== Ringkasan Ekstraksi ===")
+    for name, (pages, secs) in sorted(timings.items(), key=lambda kv: -kv[1][1]):
+        print(f"  {name:50s} {pages:6d} hlm  {secs:8.1f} s  {pages / secs if secs else 0:7.1f} hlm/s")
+    print(f"[→] {len(timings)} file, {total_pages} halaman dalam {wall:.1f} s "
+          f"→ {total_pages / wall if wall else 0:.1f} halaman/detik ({len(errors)} gagal)")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input_dir", default=INPUT_DIR)
+    parser.add_argument("--output_dir", default=OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=config.get("ingestion.workers"),
+                        help="default: ingestion.workers di config, atau jumlah CPU")
+    parser.add_argument("--pages_per_shard", type=int,
+                        default=config.get("ingestion.pages_per_shard", DEFAULT_PAGES_PER_SHARD))
+    args = parser.parse_args()
+    run(args.input_dir, args.output_dir, args.workers, args.pages_per_shard)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+"""
+Pipeline ingestion satu pintu: discover → extract → chunk → embed → index.
+
+Tiap stage berjalan di thread sendiri dan menerima record per dokumen lewat
+queue berukuran terbatas (backpressure: stage cepat menunggu stage lambat,
+memori tidak tumbuh). Hasil tiap stage disimpan sebagai artefak di
+`work_dir` dan dicatat di checkpoint (JSONL append-only); run yang terputus
+dilanjutkan dari item terakhir yang selesai, dokumen yang tidak berubah
+(ukuran + mtime PDF) tidak diproses ulang.
+
+    work_dir/
+        checkpoint.jsonl      {"stage", "doc", "fp"} per item selesai
+        chunks/<doc>.json     teks, metadata, dan ID chunk
+        vectors/<doc>.npy     embedding float32 per chunk
+
+Index FAISS, chunk store, manifest, BM25, dan bitmap metadata sama dengan
+build_faiss, sehingga `build_faiss --mode update` dan retriever tetap kompatibel.
+Index baru disimpan di akhir run; bila terputus sebelumnya, embedding yang
+sudah ter-checkpoint dipakai ulang pada run berikutnya.
+
+    python -m src.ingestion.pipeline
+    python -m src.ingestion.pipeline --rebuild --until embed
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from src import config
+from src.indexer.manifest import atomic_write_json
+from src.ingestion.extract_pdf import INPUT_DIR, OUTPUT_DIR
+from src.ingestion.section_file import SECTION_EXT, corpus_index, doc_name
+
+STAGES = ("discover", "extract", "chunk", "embed", "index")
+DEFAULT_WORK_DIR = "data/pipeline"
+_DONE = object()
+
+
+class Checkpoint:
+    """Item selesai per stage: {stage: {doc: fingerprint}}, di-append per item."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Dict[str, Dict[str, str]] = {s: {} for s in STAGES}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # baris terakhir terpotong saat proses mati
+                    if rec.get("fp") is None:
+                        self.done[rec["stage"]].pop(rec["doc"], None)
+                    else:
+                        self.done[rec["stage"]][rec["doc"]] = rec["fp"]
+        self._f = open(path, "a", encoding="utf-8")
+
+    def is_done(self, stage: str, doc: str, fp: str) -> bool:
+        return self.done[stage].get(doc) == fp
+
+    def mark(self, stage: str, doc: str, fp: Optional[str]):
+        """fp=None menghapus tanda selesai (mis. dokumen dihapus dari index)."""
+        with self._lock:
+            if fp is None:
+                self.done[stage].pop(doc, None)
+            else:
+                self.done[stage][doc] = fp
+            self._f.write(json.dumps({"stage": stage, "doc": doc, "fp": fp}, ensure_ascii=False) + "\n")
+            self._f.flush()
+
+    def reset(self, *stages: str):
+        for stage in stages:
+            for doc in list(self.done[stage]):
+                self.mark(stage, doc, None)
+
+    def close(self):
+        self._f.close()
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    resumed: int = 0       # dilewati karena sudah ter-checkpoint
+    failed: int = 0
+    busy: float = 0.0      # detik kerja (dijumlah lintas worker)
+    depth_sum: int = 0     # panjang queue masuk, disampel tiap ambil item
+    depth_max: int = 0
+    samples: int = 0
+    started: float = 0.0
+    finished: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    def sample(self, depth: int):
+        self.depth_sum += depth
+        self.depth_max = max(self.depth_max, depth)
+        self.samples += 1
+
+    @property
+    def wall(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started if self.started else 0.0
+
+    def row(self) -> str:
+        done = self.items - self.resumed
+        rate = done / self.busy if self.busy else 0.0
+        depth = self.depth_sum / self.samples if self.samples else 0.0
+        return (f"  {self.name:9s} {self.items:6d} {self.resumed:7d} {self.failed:6d} "
+                f"{self.busy:8.1f} {rate:9.2f} {depth:6.1f} {self.depth_max:5d} {self.wall:8.1f}")
+
+
+class Stage:
+    """
+    `fn(record) -> record` dijalankan `workers` thread; None = record
+    berhenti di stage ini. Exception per record dicatat, record lain jalan terus.
+    """
+
+    def __init__(self, name: str, fn: Callable[[dict], Optional[dict]], workers: int = 1):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.stats = StageStats(name)
+        self._alive = self.workers
+        self._lock = threading.Lock()
+
+    def start(self, inq: queue.Queue, outq: Optional[queue.Queue], stop: threading.Event):
+        self.stats.started = time.perf_counter()
+        threads = [threading.Thread(target=self._loop, args=(inq, outq, stop), daemon=True,
+                                    name=f"pipeline-{self.name}-{i}") for i in range(self.workers)]
+        for t in threads:
+            t.start()
+        return threads
+
+    def _loop(self, inq, outq, stop):
+        while True:
+            self.stats.sample(inq.qsize())
+            rec = inq.get()
+            if rec is _DONE:
+                inq.put(_DONE)  # untuk worker lain di stage yang sama
+                break
+            if stop.is_set():
+                continue  # kuras queue agar stage hulu tidak macet di put()
+            t0 = time.perf_counter()
+            try:
+                out = self.fn(rec)
+            except Exception as e:
+                out = None
+                with self._lock:
+                    self.stats.failed += 1
+                    self.stats.errors.append(f"{rec.get('doc')}: {e}")
+                print(f"[✗] {self.name}: {rec.get('doc')}: {e}")
+            with self._lock:
+                self.stats.busy += time.perf_counter() - t0
+                if out is not None:
+                    self.stats.items += 1
+                    self.stats.resumed += bool(out.pop("_resumed", False))
+            if out is not None and outq is not None:
+                outq.put(out)
+        with self._lock:
+            self._alive -= 1
+            last = self._alive == 0
+        if last:
+            self.stats.finished = time.perf_counter()
+            if outq is not None:
+                outq.put(_DONE)
+
+
+def fingerprint(path: str) -> str:
+    """Ukuran + mtime: murah, cukup untuk mendeteksi PDF baru/berubah."""
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+class IngestionPipeline:
+    def __init__(self, input_dir: str = INPUT_DIR, json_dir: str = OUTPUT_DIR,
+                 work_dir: str = DEFAULT_WORK_DIR, index_dir: Optional[str] = None,
+                 workers: Optional[int] = None, queue_size: int = 8, until: str = "index",
+                 embedder=None):
+        from src.indexer import build_faiss
+        self.build_faiss = build_faiss
+        self.input_dir = input_dir
+        self.json_dir = json_dir
+        self.work_dir = work_dir
+        self.index_dir = index_dir or build_faiss.INDEX_DIR
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.until = until
+        self._embedder = embedder
+        self._embedder_lock = threading.Lock()
+        self._chunker = None
+        for sub in ("chunks", "vectors"):
+            os.makedirs(os.path.join(work_dir, sub), exist_ok=True)
+        os.makedirs(json_dir, exist_ok=True)
+        self.checkpoint = Checkpoint(os.path.join(work_dir, "checkpoint.jsonl"))
+        self._indexed: List[dict] = []
+        self._rebuild = False
+
+    # ---------- stage ----------
+    @property
+    def embedder(self):
+        """Model dimuat sekali, hanya bila ada dokumen yang perlu di-chunk/embed."""
+        with self._embedder_lock:
+            if self._embedder is None:
+                self._embedder = self.build_faiss.load_embedder()
+            return self._embedder
+
+    def discover(self, rebuild: bool = False) -> List[dict]:
+        pdfs = sorted(fn for fn in os.listdir(self.input_dir) if fn.lower().endswith(".pdf"))
+        has_index = os.path.exists(os.path.join(self.index_dir, "index.faiss"))
+        if rebuild or not has_index:
+            self.checkpoint.reset("index")
+        records = []
+        for fn in pdfs:
+            path = os.path.join(self.input_dir, fn)
+            doc = os.path.splitext(fn)[0]
+            records.append({"doc": doc, "pdf": path, "fp": fingerprint(path),
+                            "sections": os.path.join(self.json_dir, doc + SECTION_EXT)})
+        return records
+
+    def extract(self, rec: dict) -> dict:
+        if self.checkpoint.is_done("extract", rec["doc"], rec["fp"]) and os.path.exists(rec["sections"]):
+            return dict(rec, _resumed=True)
+        from src.ingestion.parallel_extract import _extract_document
+        self._pool.submit(_extract_document, rec["pdf"], self.json_dir).result()
+        self.checkpoint.mark("extract", rec["doc"], rec["fp"])
+        return rec
+
+    def chunk(self, rec: dict) -> dict:
+        path = os.path.join(self.work_dir, "chunks", rec["doc"] + ".json")
+        rec = dict(rec, chunks=path)
+        if self.checkpoint.is_done("chunk", rec["doc"], rec["fp"]) and os.path.exists(path):
+            return dict(rec, _resumed=True)
+        texts, metas, ids = self.build_faiss.load_chunks(rec["doc"] + SECTION_EXT, rec["sections"], self._get_chunker())
+        atomic_write_json(path, {"texts": texts, "metadatas": metas, "ids": ids})
+        self.checkpoint.mark("chunk", rec["doc"], rec["fp"])
+        return rec
+
+    def embed(self, rec: dict) -> dict:
+        path = os.path.join(self.work_dir, "vectors", rec["doc"] + ".npy")
+        rec = dict(rec, vectors=path)
+        if self.checkpoint.is_done("embed", rec["doc"], rec["fp"]) and os.path.exists(path):
+            return dict(rec, _resumed=True)
+        with open(rec["chunks"], encoding="utf-8") as f:
+            texts = json.load(f)["texts"]
+        vectors = np.asarray(self.embedder.encode(texts), dtype=np.float32) if texts else np.zeros((0, 0), np.float32)
+        tmp = f"{path[:-4]}.tmp{os.getpid()}.npy"
+        np.save(tmp, vectors)
+        os.replace(tmp, path)
+        self.checkpoint.mark("embed", rec["doc"], rec["fp"])
+        return rec
+
+    def collect(self, rec: dict) -> dict:
+        """Stage index (streaming): kumpulkan dokumen; index ditulis sekali di finalize()."""
+        if self.checkpoint.is_done("index", rec["doc"], rec["fp"]):
+            return dict(rec, _resumed=True)
+        self._indexed.append(rec)
+        return rec
+
+    def _get_chunker(self):
+        if self._chunker is None:
+            from src.indexer.chunker import Chunker
+            self._chunker = Chunker.for_model(self.embedder)
+        return self._chunker
+
+    # ---------- index ----------
+    def finalize(self, records: List[dict]):
+        """
+        Tulis index: dokumen baru/berubah ditambahkan, milik dokumen berubah
+        atau hilang dihapus. Tanpa index lama, index dibangun (dan dilatih) dari nol.
+        """
+        from src.indexer.chunk_store import ChunkStore
+        from src.indexer.faiss_index import (build_index, index_settings, load_store, new_store,
+                                             save_store, supports_remove)
+        from src.indexer.manifest import Manifest
+        from src.indexer.metadata_index import build_metadata_index
+        from src.retriever.bm25 import build_bm25
+
+        manifest = Manifest(os.path.join(self.index_dir, "manifest.json"))
+        chunks_dir = os.path.join(self.index_dir, "chunks")
+        current = {r["doc"] + SECTION_EXT for r in records}
+        todo = [r for r in self._indexed if r["doc"] + SECTION_EXT in current]
+        removed = [s for s in manifest.sources if s not in current]
+        if not todo and not removed:
+            return False
+        has_index = not self._rebuild and os.path.exists(os.path.join(self.index_dir, "index.faiss"))
+        stale = manifest.chunk_ids([r["doc"] + SECTION_EXT for r in todo] + removed) if has_index else []
+
+        texts, metas, ids, vectors = [], [], [], []
+        for r in todo:
+            with open(r["chunks"], encoding="utf-8") as f:
+                data = json.load(f)
+            if not data["ids"]:
+                continue
+            texts += data["texts"]; metas += data["metadatas"]; ids += data["ids"]
+            vectors.append(np.load(r["vectors"]))
+        vectors = np.concatenate(vectors) if vectors else np.zeros((0, 0), np.float32)
+
+        if has_index:
+            db = load_store(self.index_dir, self.embedder, mmap=False)
+            if stale and not supports_remove(db.index):
+                raise RuntimeError("index HNSW tidak bisa menghapus vektor; jalankan dengan --rebuild")
+            store = ChunkStore(chunks_dir, writable=True)
+            if stale:
+                db.delete(stale)
+                store.delete(stale)
+        else:
+            manifest.sources.clear()
+            store = ChunkStore.create(chunks_dir)
+            cfg = index_settings()
+            db = new_store(self.embedder, build_index(vectors, cfg))
+            print(f"[→] Index {cfg['index_type']}: {len(ids)} vektor")
+        for s in removed:
+            manifest.forget(s)
+        if ids:
+            db.add_embeddings(list(zip(texts, vectors)), metadatas=metas, ids=ids)
+            store.append_many(zip(ids, texts, metas))
+        for r in todo:
+            with open(r["chunks"], encoding="utf-8") as f:
+                manifest.record(r["doc"] + SECTION_EXT, r["sections"], json.load(f)["ids"])
+        store.flush()
+        if store.deleted_rows > len(store):
+            store.compact()
+
+        save_store(db, self.index_dir)
+        manifest.save()
+        n = build_bm25(((i, t) for i, t, _ in ChunkStore(chunks_dir).items()),
+                       os.path.join(self.index_dir, "bm25"))
+        build_metadata_index(ChunkStore(chunks_dir))
+        # Tandai selesai hanya setelah index benar-benar tersimpan
+        for r in todo:
+            self.checkpoint.mark("index", r["doc"], r["fp"])
+        for s in removed:
+            self.checkpoint.mark("index", doc_name(s), None)
+        print(f"[✓] Index tersimpan di {self.index_dir}: +{len(ids)} / -{len(stale)} chunk, BM25 {n} chunk")
+        return True
+
+    # ---------- run ----------
+    def run(self, rebuild: bool = False) -> Dict[str, StageStats]:
+        t_start = time.perf_counter()
+        self._rebuild = rebuild
+        discover = StageStats("discover", started=t_start)
+        records = self.discover(rebuild)
+        discover.items = len(records)
+        discover.resumed = sum(self.checkpoint.is_done("index", r["doc"], r["fp"]) for r in records)
+        discover.finished = time.perf_counter()
+        discover.busy = discover.finished - t_start
+
+        fns = {"extract": (self.extract, self.workers), "chunk": (self.chunk, 1),
+               "embed": (self.embed, 1), "index": (self.collect, 1)}
+        stages = [Stage(name, *fns[name]) for name in STAGES[1:STAGES.index(self.until) + 1]]
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in stages]
+        stop = threading.Event()
+        threads = []
+        interrupted = False
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            self._pool = pool
+            for i, stage in enumerate(stages):
+                threads += stage.start(queues[i], queues[i + 1] if i + 1 < len(queues) else None, stop)
+            try:
+                for rec in records:
+                    queues[0].put(rec)
+                queues[0].put(_DONE)
+                for t in threads:
+                    while t.is_alive():
+                        t.join(timeout=0.5)
+            except KeyboardInterrupt:
+                interrupted = True
+                stop.set()
+                print("[✗] Dihentikan; item yang selesai sudah ter-checkpoint, jalankan ulang untuk melanjutkan")
+                queues[0].put(_DONE)
+                for t in threads:
+                    t.join()
+        corpus_index(self.json_dir)
+
+        if not interrupted and self.until == "index":
+            t0 = time.perf_counter()
+            try:
+                if not self.finalize(records):
+                    print("[✓] Index sudah mutakhir, tidak ada yang ditulis")
+            except Exception as e:
+                stages[-1].stats.failed += 1
+                print(f"[✗] index: {e}")
+            stages[-1].stats.busy += time.perf_counter() - t0
+            stages[-1].stats.finished = time.perf_counter()
+
+        stats = {"discover": discover, **{s.name: s.stats for s in stages}}
+        report(stats, time.perf_counter() - t_start)
+        self.checkpoint.close()
+        return stats
+
+
+def report(stats: Dict[str, StageStats], wall: float):
+    print("\n=== Ringkasan Pipeline ===")
+    print(f"  {'stage':9s} {'item':>6s} {'resume':>7s} {'gagal':>6s} {'kerja s':>8s} "
+          f"{'item/s':>9s} {'q rata':>6s} {'q max':>5s} {'wall s':>8s}")
+    for s in stats.values():
+        print(s.row())
+    print(f"[→] Total wall-time: {wall:.1f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input_dir", default=INPUT_DIR)
+    parser.add_argument("--json_dir", default=OUTPUT_DIR)
+    parser.add_argument("--work_dir", default=config.get("ingestion.work_dir", DEFAULT_WORK_DIR))
+    parser.add_argument("--workers", type=int, default=config.get("ingestion.workers"),
+                        help="proses ekstraksi paralel; default jumlah CPU")
+    parser.add_argument("--queue_size", type=int, default=config.get("ingestion.queue_size", 8))
+    parser.add_argument("--until", choices=STAGES[1:], default="index", help="berhenti setelah stage ini")
+    parser.add_argument("--rebuild", action="store_true", help="bangun index dari nol (artefak stage lain dipakai ulang)")
+    args = parser.parse_args()
+    IngestionPipeline(args.input_dir, args.json_dir, args.work_dir, workers=args.workers,
+                      queue_size=args.queue_size, until=args.until).run(rebuild=args.rebuild)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Format biner hasil ekstraksi: satu file `.sec` per dokumen, section dibaca
+lazy tanpa mem-parse seluruh dokumen (pengganti JSON indent=2).
+
+    <doc>.sec
+        header    MAGIC (8 byte)
+        body      per section: judul UTF-8 lalu isi UTF-8, berurutan
+        tabel     int64 (n_sections, 5): offset, panjang judul, panjang isi,
+                  halaman awal, halaman akhir (1-based; 0 = tidak diketahui)
+        meta      JSON {"filename", "num_pages", "n_sections"}
+        trailer   offset tabel, offset meta (uint64 LE), MAGIC
+
+    <dir>/corpus_index.json   {nama file: ukuran, mtime, filename, num_pages,
+                               n_sections} untuk semua dokumen
+
+Writer men-stream section ke file sementara lalu os.replace, jadi pembaca
+tidak pernah melihat file setengah jadi. Pembaca memetakan file dengan mmap;
+tabel dan meta ada di ekor file, sehingga judul, rentang halaman, dan jumlah
+section tersedia tanpa menyentuh isi.
+
+    python -m src.ingestion.section_file convert --json_dir data/pdf_texts_json
+    python -m src.ingestion.section_file info --dir data/pdf_texts_json
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+from src.indexer.manifest import atomic_write_json
+
+SECTION_EXT = ".sec"
+CORPUS_INDEX = "corpus_index.json"
+MAGIC = b"MELSEC01"
+TRAILER = struct.Struct("<QQ8s")
+TABLE_COLS = 5
+
+
+class SectionWriter:
+    """
+    Tulis dokumen section demi section ke file sementara, lalu os.replace ke
+    path akhir saat close(). Section: {"title", "content", "page_start", "page_end"}.
+    """
+    def __init__(self, out_path, filename, num_pages):
+        self.out_path = out_path
+        self.tmp_path = f"{out_path}.tmp{os.getpid()}"
+        self.filename = filename
+        self.num_pages = num_pages
+        self.f = open(self.tmp_path, "wb")
+        self.f.write(MAGIC)
+        self.rows = []
+
+    def write(self, sec):
+        title = (sec.get("title") or "").encode("utf-8")
+        content = (sec.get("content") or "").encode("utf-8")
+        self.rows.append((self.f.tell(), len(title), len(content),
+                          sec.get("page_start") or 0, sec.get("page_end") or 0))
+        self.f.write(title)
+        self.f.write(content)
+
+    def close(self):
+        table_off = self.f.tell()
+        self.f.write(np.asarray(self.rows, dtype="<i8").reshape(-1, TABLE_COLS).tobytes())
+        meta_off = self.f.tell()
+        self.f.write(json.dumps({"filename": self.filename, "num_pages": self.num_pages,
+                                 "n_sections": len(self.rows)}, ensure_ascii=False).encode("utf-8"))
+        self.f.write(TRAILER.pack(table_off, meta_off, MAGIC))
+        self.f.close()
+        os.replace(self.tmp_path, self.out_path)
+
+    def abort(self):
+        self.f.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class SectionFile:
+    """Akses lazy ke satu file `.sec`; isi section baru di-decode saat diminta."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mm
+        if len(mm) < len(MAGIC) + TRAILER.size or mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: bukan file section ({SECTION_EXT})")
+        table_off, meta_off, magic = TRAILER.unpack_from(mm, len(mm) - TRAILER.size)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: trailer rusak (file terpotong?)")
+        self.meta = json.loads(mm[meta_off:len(mm) - TRAILER.size].decode("utf-8"))
+        self.table = np.frombuffer(mm[table_off:meta_off], dtype="<i8").reshape(-1, TABLE_COLS)
+        self._rows = self.table.tolist()  # akses per section tanpa overhead indexing numpy
+        self.filename = self.meta["filename"]
+        self.num_pages = self.meta["num_pages"]
+
+    def __len__(self):
+        return len(self._rows)
+
+    def title(self, i: int) -> str:
+        off, t_len = self._rows[i][:2]
+        return self._mm[off:off + t_len].decode("utf-8")
+
+    def content(self, i: int) -> str:
+        off, t_len, c_len = self._rows[i][:3]
+        return self._mm[off + t_len:off + t_len + c_len].decode("utf-8")
+
+    def pages(self, i: int):
+        """(halaman awal, halaman akhir) section ke-i; (0, 0) bila tidak diketahui."""
+        return tuple(self._rows[i][3:5])
+
+    def section(self, i: int) -> dict:
+        start, end = self.pages(i)
+        return {"title": self.title(i), "content": self.content(i), "page_start": start, "page_end": end}
+
+    def titles(self):
+        return [self.title(i) for i in range(len(self))]
+
+    def __iter__(self) -> Iterator[dict]:
+        for i in range(len(self)):
+            yield self.section(i)
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def list_documents(folder: str) -> Dict[str, str]:
+    """{nama file .sec: path} terurut untuk semua hasil ekstraksi di `folder`."""
+    return {fn: os.path.join(folder, fn) for fn in sorted(os.listdir(folder)) if fn.endswith(SECTION_EXT)}
+
+
+def doc_name(fn: str) -> str:
+    return fn[:-len(SECTION_EXT)] if fn.endswith(SECTION_EXT) else os.path.splitext(fn)[0]
+
+
+def corpus_index(folder: str, save: bool = True) -> Dict[str, dict]:
+    """
+    Ringkasan per dokumen dari corpus_index.json. Entri diperbarui hanya untuk
+    file yang ukuran/mtime-nya berubah (cukup baca ekor file); file yang hilang
+    dibuang. Index ditulis ulang (atomik) bila ada perubahan dan `save`.
+    """
+    path = os.path.join(folder, CORPUS_INDEX)
+    old = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            old = json.load(f).get("documents", {})
+    docs = {}
+    for fn, p in list_documents(folder).items():
+        st = os.stat(p)
+        entry = old.get(fn)
+        if entry is None or entry["size"] != st.st_size or entry["mtime_ns"] != st.st_mtime_ns:
+            with SectionFile(p) as sf:
+                entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "filename": sf.filename,
+                         "num_pages": sf.num_pages, "n_sections": len(sf)}
+        docs[fn] = entry
+    if save and docs != old:
+        atomic_write_json(path, {"documents": docs})
+    return docs
+
+
+def convert_json(json_path: str, out_dir: Optional[str] = None) -> str:
+    """Konversi satu hasil ekstraksi JSON lama ke `.sec` (halaman tidak diketahui = 0)."""
+    with open(json_path, encoding="utf-8") as f:
+        data = json.load(f)
+    name = os.path.splitext(os.path.basename(json_path))[0]
+    out_path = os.path.join(out_dir or os.path.dirname(json_path), name + SECTION_EXT)
+    with SectionWriter(out_path, data.get("filename", name), data.get("num_pages", 0)) as writer:
+        for sec in data.get("sections", []):
+            writer.write(sec)
+    return out_path
+
+
+def convert_dir(json_dir: str, out_dir: Optional[str] = None, remove: bool = False) -> int:
+    """Konversi semua *.json di `json_dir` yang belum punya `.sec` yang lebih baru."""
+    out_dir = out_dir or json_dir
+    os.makedirs(out_dir, exist_ok=True)
+    n = 0
+    for fn in sorted(os.listdir(json_dir)):
+        if not fn.endswith(".json") or fn == CORPUS_INDEX:
+            continue
+        src = os.path.join(json_dir, fn)
+        dst = os.path.join(out_dir, fn[:-5] + SECTION_EXT)
+        if not os.path.exists(dst) or os.path.getmtime(dst) < os.path.getmtime(src):
+            convert_json(src, out_dir)
+            n += 1
+        if remove:
+            os.remove(src)
+    corpus_index(out_dir)
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("convert", help="JSON hasil ekstraksi lama → .sec")
+    p.add_argument("--json_dir", default="data/pdf_texts_json")
+    p.add_argument("--out_dir", default=None, help="default: sama dengan --json_dir")
+    p.add_argument("--remove", action="store_true", help="hapus JSON setelah dikonversi")
+    p = sub.add_parser("info", help="ringkasan dari corpus index")
+    p.add_argument("--dir", default="data/pdf_texts_json")
+    args = parser.parse_args()
+
+    if args.cmd == "convert":
+        n = convert_dir(args.json_dir, args.out_dir, args.remove)
+        print(f"[✓] {n} file dikonversi → {args.out_dir or args.json_dir}")
+    else:
+        docs = corpus_index(args.dir)
+        for fn, d in docs.items():
+            print(f"  {fn:50s} {d['num_pages']:6d} hlm {d['n_sections']:6d} section {d['size'] / 1e6:8.2f} MB")
+        print(f"[→] {len(docs)} dokumen, {sum(d['n_sections'] for d in docs.values())} section")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,39 @@
 """
 Validasi otomatis ekstraksi: ringkasan & sampel section.
+Ringkasan dibaca dari corpus index; hanya section sampel yang di-decode.
 """
-import os, json
+import os
 import pandas as pd
 
+from src.ingestion.section_file import SectionFile, corpus_index
+
 JSON_DIR = "data/pdf_texts_json"
 SAMPLE_PER_FILE = 2
 
-def summarize_file(path):
-    with open(path, encoding="utf-8") as f:
-        data = json.load(f)
-    n_sec = len(data["sections"])
-    samples = data["sections"][:SAMPLE_PER_FILE]
+def summarize_file(path, entry):
+    with SectionFile(path) as sf:
+        titles = [sf.title(i) for i in range(min(SAMPLE_PER_FILE, len(sf)))]
     return {
-        "file": data["filename"],
-        "pages": data["num_pages"],
-        "n_sections": n_sec,
-        "sample_titles": [sec["title"] for sec in samples]
+        "file": entry["filename"],
+        "pages": entry["num_pages"],
+        "n_sections": entry["n_sections"],
+        "sample_titles": titles
     }
 
 def main():
-    summaries = []
-    for fn in os.listdir(JSON_DIR):
-        if fn.endswith(".json"):
-            summaries.append(summarize_file(os.path.join(JSON_DIR, fn)))
+    docs = corpus_index(JSON_DIR)
+    summaries = [summarize_file(os.path.join(JSON_DIR, fn), entry) for fn, entry in docs.items()]
     df = pd.DataFrame(summaries)
     print("\n=== Ekstraksi Summary ===")
     print(df.to_markdown(index=False))
     # Tampilkan contoh section
     print("\n=== Contoh Konten (1st file) ===")
-    first = summaries[0]["file"]
-    data = json.load(open(os.path.join(JSON_DIR, first + ".json"), encoding="utf-8"))
-    for sec in data["sections"][:SAMPLE_PER_FILE]:
-        print(f"\n-- {sec['title']} --\n{sec['content'][:200]}...\n")
+    first = next(iter(docs), None)
+    if first is None:
+        return
+    with SectionFile(os.path.join(JSON_DIR, first)) as sf:
+        for i in range(min(SAMPLE_PER_FILE, len(sf))):
+            print(f"\n-- {sf.title(i)} --\n{sf.content(i)[:200]}...\n")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,199 @@
+"""
+Klien HTTP Ollama dengan koneksi keep-alive dan streaming token.
+
+Menggantikan `subprocess.run(["ollama", "run", ...])` per pertanyaan:
+satu `requests.Session` (connection pool) dipakai ulang untuk semua
+request, dan token dialirkan ke pemanggil segera setelah tiba.
+"""
+import json
+import os
+import threading
+from typing import AsyncIterator, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src import config
+
+DEFAULT_URL = "http://localhost:11434"
+DEFAULT_MODEL = "registry.ollama.ai/library/deepseek-r1:7b"
+
+
+class OllamaError(RuntimeError):
+    """Error yang dilaporkan server Ollama (HTTP error atau field `error`)."""
+
+
+class OllamaClient:
+    """Klien `/api/generate` Ollama di atas satu connection pool keep-alive."""
+
+    def __init__(
+        self,
+        url: str = DEFAULT_URL,
+        model: str = DEFAULT_MODEL,
+        keep_alive: str = "30m",
+        connect_timeout: float = 5.0,
+        read_timeout: float = 300.0,
+        pool_size: int = 8,
+        options: Optional[dict] = None,
+    ):
+        self.url = url.rstrip("/")
+        self.model = model
+        self.keep_alive = keep_alive
+        self.timeout = (connect_timeout, read_timeout)
+        self.options = options or {}
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.last_stats: dict = {}
+
+    def _payload(self, prompt: str, options: dict, context: Optional[list] = None) -> dict:
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": self.keep_alive,
+            "options": {**self.options, **options},
+        }
+        if context:
+            # Lanjutan percakapan: token giliran sebelumnya (KV cache di server dipakai ulang)
+            payload["context"] = context
+        return payload
+
+    def stream(self, prompt: str, context: Optional[list] = None, stats: Optional[dict] = None,
+               **options) -> Iterator[str]:
+        """
+        Yield potongan teks jawaban satu per satu saat diterima dari server.
+        `stats` (opsional) diisi baris akhir server (prompt_eval_count,
+        context, ...) khusus untuk request ini.
+        """
+        payload = self._payload(prompt, options, context)
+        try:
+            resp = self.session.post(
+                f"{self.url}/api/generate",
+                json=payload,
+                stream=True,
+                timeout=self.timeout,
+            )
+        except requests.RequestException as e:
+            raise OllamaError(f"Tidak dapat menghubungi Ollama di {self.url}: {e}") from e
+        with resp:
+            if resp.status_code != 200:
+                raise OllamaError(f"HTTP {resp.status_code}: {resp.text.strip()}")
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise OllamaError(data["error"])
+                token = data.get("response")
+                if token:
+                    yield token
+                if data.get("done"):
+                    # Jangan break: sisa stream harus habis dibaca agar
+                    # koneksi kembali ke pool dan bisa dipakai ulang.
+                    self.last_stats = data
+                    if stats is not None:
+                        stats.update(data)
+
+    def preload(self):
+        """Muat model ke memori server (prompt kosong) agar request pertama tidak menunggu load."""
+        resp = self.session.post(
+            f"{self.url}/api/generate",
+            json={"model": self.model, "keep_alive": self.keep_alive},
+            timeout=self.timeout,
+        )
+        if resp.status_code != 200:
+            raise OllamaError(f"HTTP {resp.status_code}: {resp.text.strip()}")
+
+    def generate(self, prompt: str, **options) -> str:
+        """Jawaban lengkap (non-streaming) lewat jalur yang sama."""
+        return "".join(self.stream(prompt, **options))
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncOllamaClient(OllamaClient):
+    """
+    Varian asyncio: `astream()` memakai httpx.AsyncClient (pool keep-alive
+    sendiri) sehingga banyak sesi chat bisa streaming bersamaan di satu
+    event loop tanpa memblokir thread.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._aclient = None
+        self._pool_size = kwargs.get("pool_size", 8)
+
+    def _async_client(self):
+        import httpx
+        if self._aclient is None:
+            connect, read = self.timeout
+            self._aclient = httpx.AsyncClient(
+                base_url=self.url,
+                timeout=httpx.Timeout(read, connect=connect),
+                limits=httpx.Limits(max_connections=None, max_keepalive_connections=self._pool_size),
+            )
+        return self._aclient
+
+    async def astream(self, prompt: str, context: Optional[list] = None, stats: Optional[dict] = None,
+                      **options) -> AsyncIterator[str]:
+        import httpx
+        client = self._async_client()
+        try:
+            async with client.stream("POST", "/api/generate",
+                                     json=self._payload(prompt, options, context)) as resp:
+                if resp.status_code != 200:
+                    body = (await resp.aread()).decode("utf-8", "replace")
+                    raise OllamaError(f"HTTP {resp.status_code}: {body.strip()}")
+                async for line in resp.aiter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise OllamaError(data["error"])
+                    token = data.get("response")
+                    if token:
+                        yield token
+                    if data.get("done"):
+                        self.last_stats = data
+                        if stats is not None:
+                            stats.update(data)
+        except httpx.TransportError as e:
+            raise OllamaError(f"Tidak dapat menghubungi Ollama di {self.url}: {e}") from e
+
+    async def aclose(self):
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
+
+
+_client: Optional[OllamaClient] = None
+_client_lock = threading.Lock()
+
+
+def _client_kwargs() -> dict:
+    cfg = config.get("llm", {}) or {}
+    return dict(
+        url=os.getenv("OLLAMA_URL") or cfg.get("url", DEFAULT_URL),
+        model=os.getenv("OLLAMA_MODEL") or cfg.get("model", DEFAULT_MODEL),
+        keep_alive=cfg.get("keep_alive", "30m"),
+        read_timeout=float(cfg.get("timeout", 300)),
+        pool_size=int(cfg.get("pool_size", 8)),
+    )
+
+
+def get_client() -> OllamaClient:
+    """Singleton per proses, dikonfigurasi dari `llm.*` di config.yml (.env menimpa)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OllamaClient(**_client_kwargs())
+    return _client
+
+
+def make_async_client() -> AsyncOllamaClient:
+    """Klien async dengan konfigurasi yang sama; satu per event loop."""
+    return AsyncOllamaClient(**_client_kwargs())
@@ -0,0 +1,209 @@
+"""
+Indeks sparse BM25 dengan postings berbasis array (numpy), di-memory-map dari disk.
+
+Layout direktori:
+    vocab.json        term -> term_id
+    offsets.npy       int64 (n_terms + 1): rentang postings per term
+    post_docs.npy     int32: doc index per posting (urut per term)
+    post_impact.npy   float16: tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl)),
+                      dihitung saat build sehingga skor query = idf * impact
+    ids.txt           chunk ID per doc index (satu per baris)
+    meta.json         k1, b, n_docs, avgdl
+"""
+import json
+import math
+import os
+import re
+import shutil
+from array import array
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Token majemuk (kode ICD "I21.4", dosis "5mg/kg", "0.9%") dipertahankan utuh,
+# lalu dipecah juga ke bagian alfanumeriknya agar "5mg" tetap cocok.
+_TOKEN_RE = re.compile(r"\w+(?:[./,\-]\w+)*%?", re.UNICODE)
+_PART_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for m in _TOKEN_RE.finditer(text.lower()):
+        tok = m.group(0)
+        tokens.append(tok)
+        if not tok.isalnum():
+            parts = _PART_RE.findall(tok)
+            if len(parts) > 1 or (parts and parts[0] != tok):
+                tokens.extend(parts)
+    return tokens
+
+
+class BM25Builder:
+    """Kumpulkan dokumen lalu tulis indeks kompak ke `out_dir`."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.vocab = {}
+        self.ids: List[str] = []
+        self.doc_len = array("I")
+        self.p_term = array("I")
+        self.p_doc = array("I")
+        self.p_tf = array("H")
+
+    def add(self, doc_id: str, text: str):
+        d = len(self.ids)
+        self.ids.append(doc_id)
+        counts = Counter(tokenize(text))
+        self.doc_len.append(sum(counts.values()))
+        for term, tf in counts.items():
+            tid = self.vocab.setdefault(term, len(self.vocab))
+            self.p_term.append(tid)
+            self.p_doc.append(d)
+            self.p_tf.append(min(tf, 65535))
+
+    def add_many(self, pairs: Iterable[Tuple[str, str]]):
+        for doc_id, text in pairs:
+            self.add(doc_id, text)
+
+    def save(self, out_dir: str):
+        """Tulis ke direktori sementara lalu tukar, agar pembaca tidak melihat indeks setengah jadi."""
+        final_dir = out_dir.rstrip("/\\")
+        out_dir = f"{final_dir}.tmp{os.getpid()}"
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.makedirs(out_dir)
+        terms = np.frombuffer(self.p_term, dtype=np.uint32)
+        order = np.argsort(terms, kind="stable")  # stabil: doc tetap urut naik per term
+        counts = np.bincount(terms, minlength=len(self.vocab))
+        offsets = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        doc_len = np.frombuffer(self.doc_len, dtype=np.uint32).astype(np.float32)
+        avgdl = float(doc_len.mean()) if len(doc_len) else 0.0
+        norm = self.k1 * (1 - self.b + self.b * doc_len / (avgdl or 1.0))
+        docs = np.frombuffer(self.p_doc, dtype=np.uint32)[order].astype(np.int32)
+        tf = np.frombuffer(self.p_tf, dtype=np.uint16)[order].astype(np.float32)
+        impact = tf * (self.k1 + 1) / (tf + norm[docs])
+
+        np.save(os.path.join(out_dir, "offsets.npy"), offsets)
+        np.save(os.path.join(out_dir, "post_docs.npy"), docs)
+        np.save(os.path.join(out_dir, "post_impact.npy"), impact.astype(np.float16))
+        with open(os.path.join(out_dir, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(self.vocab, f, ensure_ascii=False)
+        with open(os.path.join(out_dir, "ids.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(self.ids))
+        with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "n_docs": len(self.ids), "avgdl": avgdl}, f)
+        old_dir = f"{final_dir}.old{os.getpid()}"
+        if os.path.exists(final_dir):
+            os.replace(final_dir, old_dir)
+        os.replace(out_dir, final_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+class BM25Index:
+    """Indeks BM25 read-only; array postings di-memory-map (mmap_mode='r')."""
+
+    def __init__(self, index_dir: str):
+        def load(name):
+            return np.load(os.path.join(index_dir, name), mmap_mode="r")
+
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(os.path.join(index_dir, "vocab.json"), encoding="utf-8") as f:
+            self.vocab = json.load(f)
+        with open(os.path.join(index_dir, "ids.txt"), encoding="utf-8") as f:
+            self.ids = f.read().split("\n") if meta["n_docs"] else []
+        self.k1 = meta["k1"]
+        self.n_docs = meta["n_docs"]
+        self.offsets = load("offsets.npy")
+        self.post_docs = load("post_docs.npy")
+        self.post_impact = load("post_impact.npy")
+
+    def __len__(self):
+        return self.n_docs
+
+    def idf(self, df: int) -> float:
+        return math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+    def search_indices(self, query: str, k: int = 10, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (doc_idx, skor) top-k; `mask` boolean (n_docs,) membatasi dokumen yang boleh.
+
+        Term diproses dari df terkecil. Selama postings yang tersentuh sedikit,
+        skor diakumulasi hanya untuk kandidat (np.unique); begitu ada term umum,
+        pindah ke akumulator padat (np.add.at). Pruning ala MaxScore: bila batas
+        atas skor term sisa < skor ke-k kandidat, term sisa hanya dicari untuk
+        kandidat yang ada lewat searchsorted. Hasil tetap eksak.
+        """
+        terms = []
+        for term in set(tokenize(query)):
+            tid = self.vocab.get(term)
+            if tid is not None:
+                lo, hi = int(self.offsets[tid]), int(self.offsets[tid + 1])
+                terms.append((hi - lo, lo, hi))
+        if not terms or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        terms.sort()
+        idfs = [self.idf(df) for df, _, _ in terms]
+        # ub[i] = skor maksimum yang masih bisa disumbang term i.. akhir (impact < k1 + 1)
+        ub = np.cumsum([idf * (self.k1 + 1) for idf in idfs][::-1])[::-1].tolist() + [0.0]
+
+        cand = np.zeros(0, dtype=np.int64)
+        cand_scores = np.zeros(0, dtype=np.float32)
+        dense = None
+        for i, ((df, lo, hi), idf) in enumerate(zip(terms, idfs)):
+            docs = self.post_docs[lo:hi]
+            if dense is not None:
+                np.add.at(dense, docs, idf * self.post_impact[lo:hi].astype(np.float32))
+                continue
+            if len(cand) and i and ub[i] < self._kth(cand, cand_scores, k, mask):
+                # Pruned: dokumen di luar kandidat tidak mungkin masuk top-k
+                pos = np.searchsorted(docs, cand)
+                np.minimum(pos, len(docs) - 1, out=pos)
+                match = docs[pos] == cand
+                cand_scores[match] += idf * self.post_impact[lo:hi][pos[match]].astype(np.float32)
+                continue
+            contrib = idf * self.post_impact[lo:hi].astype(np.float32)
+            if (len(cand) + df) * 8 > self.n_docs:
+                dense = np.zeros(self.n_docs, dtype=np.float32)
+                dense[cand] = cand_scores
+                np.add.at(dense, docs, contrib)
+                continue
+            cand, inverse = np.unique(np.concatenate([cand, docs]), return_inverse=True)
+            cand_scores = np.bincount(inverse, weights=np.concatenate([cand_scores, contrib])).astype(np.float32)
+
+        if dense is not None:
+            if mask is not None:
+                dense[~mask] = 0.0
+            top = np.argpartition(-dense, min(k, self.n_docs) - 1)[:k]
+            cand = top[dense[top] > 0]
+            cand_scores = dense[cand]
+        elif mask is not None:
+            keep = mask[cand]
+            cand, cand_scores = cand[keep], cand_scores[keep]
+        if len(cand) > k:
+            top = np.argpartition(-cand_scores, k - 1)[:k]
+            cand, cand_scores = cand[top], cand_scores[top]
+        order = np.argsort(-cand_scores, kind="stable")
+        return cand[order].astype(np.int64), cand_scores[order].astype(np.float32)
+
+    @staticmethod
+    def _kth(cand, cand_scores, k, mask):
+        """Skor ke-k di antara kandidat yang lolos mask (0 bila < k kandidat)."""
+        eligible = cand_scores if mask is None else cand_scores[mask[cand]]
+        if len(eligible) < k:
+            return 0.0
+        return float(np.partition(eligible, len(eligible) - k)[len(eligible) - k])
+
+    def search(self, query: str, k: int = 10, mask: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        """[(chunk_id, skor), ...] top-k."""
+        idx, scores = self.search_indices(query, k, mask)
+        return [(self.ids[i], float(s)) for i, s in zip(idx, scores)]
+
+
+def build_bm25(pairs: Iterable[Tuple[str, str]], out_dir: str, k1: float = 1.2, b: float = 0.75) -> int:
+    """Bangun dan simpan indeks dari iterable (chunk_id, teks); return jumlah dokumen."""
+    builder = BM25Builder(k1, b)
+    builder.add_many(pairs)
+    builder.save(out_dir)
+    return len(builder.ids)
@@ -0,0 +1,44 @@
+"""
+Fusi hasil dense + sparse (BM25) dengan reciprocal rank fusion (RRF).
+"""
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+Ranked = List[Tuple[str, float]]
+
+MODES = ("dense", "sparse", "hybrid")
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Ranked], k: int = RRF_K,
+                           weights: Optional[Sequence[float]] = None) -> Ranked:
+    """
+    Gabungkan beberapa daftar peringkat: skor(id) = Σ w / (k + rank).
+    Hanya peringkat yang dipakai, sehingga skala skor cosine vs BM25 tidak perlu dikalibrasi.
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[str, float] = {}
+    for ranking, w in zip(rankings, weights):
+        for rank, (doc_id, _) in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + w / (k + rank)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
+
+
+def fuse(query: str, k: int, mode: str,
+         dense_fn: Callable[[str, int], Ranked],
+         sparse_fn: Optional[Callable[[str, int], Ranked]],
+         candidates: Optional[int] = None) -> Ranked:
+    """
+    Top-k (id, skor) menurut `mode`. Pada mode hybrid tiap retriever diminta
+    `candidates` hasil (default 4k) sebelum difusikan.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode harus salah satu dari {MODES}, bukan {mode!r}")
+    if sparse_fn is None and mode != "dense":
+        # Indeks BM25 belum dibangun: turun ke dense saja
+        mode = "dense"
+    if mode == "dense":
+        return dense_fn(query, k)[:k]
+    if mode == "sparse":
+        return sparse_fn(query, k)[:k]
+    n = max(k, candidates or 4 * k)
+    return reciprocal_rank_fusion([dense_fn(query, n), sparse_fn(query, n)])[:k]
@@ -0,0 +1,125 @@
+"""
+Tahap re-ranking kandidat hasil retrieval.
+
+- DenseReranker: matriks kandidat float32 yang sudah dinormalisasi saat
+  indexing, satu matmul terhadap query ter-normalisasi (bukan loop cosine
+  per hit).
+- CrossEncoderReranker: skor pasangan (query, chunk) dengan cross-encoder
+  di CPU, diproses per batch.
+- NoopReranker: percaya urutan retriever, hanya potong ke final_k.
+
+Semua reranker menerima/mengembalikan list hit (dict dari make_hit).
+`needs_embeddings` / `needs_text` menandai apa yang harus diambil retriever
+untuk kandidat; teks chunk lain cukup dibaca untuk hit final saja.
+"""
+from typing import List, Optional
+
+import numpy as np
+
+from src import config
+
+DEFAULT_CROSS_ENCODER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+def normalize_rows(m) -> np.ndarray:
+    """Matriks float32 kontigu dengan tiap baris ber-norma 1."""
+    m = np.ascontiguousarray(m, dtype=np.float32)
+    if m.ndim == 1:
+        m = m[None, :]
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    np.maximum(norms, 1e-8, out=norms)
+    return m / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indeks k skor tertinggi, terurut menurun (argpartition + sort kecil)."""
+    if k < len(scores):
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(len(scores))
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def _reorder(hits: List[dict], idx: np.ndarray, scores: np.ndarray) -> List[dict]:
+    out = []
+    for rank_idx, i in enumerate(idx, start=1):
+        hit = dict(hits[i])
+        hit['score'] = float(scores[i])
+        hit['rank'] = rank_idx
+        out.append(hit)
+    return out
+
+
+class NoopReranker:
+    needs_embeddings = False
+    needs_text = False
+
+    def rerank(self, query: str, hits: List[dict], k: int, q_emb=None) -> List[dict]:
+        return [dict(h, rank=r) for r, h in enumerate(hits[:k], start=1)]
+
+
+class DenseReranker:
+    """
+    Cosine query-kandidat lewat satu matmul; butuh hit['embedding'].
+    `prenormalized`: vektor index sudah ber-norma 1 (ditulis indexer), jadi
+    hanya query yang dinormalisasi per request.
+    """
+    needs_embeddings = True
+    needs_text = False
+
+    def __init__(self, prenormalized: bool = True):
+        self.prenormalized = prenormalized
+
+    def scores(self, q_emb, cand_embs) -> np.ndarray:
+        cand = np.asarray(cand_embs, dtype=np.float32)
+        if not self.prenormalized:
+            cand = normalize_rows(cand)
+        return cand @ normalize_rows(q_emb)[0]
+
+    def rerank(self, query: str, hits: List[dict], k: int, q_emb=None) -> List[dict]:
+        if not hits:
+            return []
+        if q_emb is None:
+            raise ValueError("DenseReranker membutuhkan q_emb")
+        scores = self.scores(q_emb, np.asarray([h['embedding'] for h in hits], dtype=np.float32))
+        return _reorder(hits, top_k(scores, k), scores)
+
+
+class CrossEncoderReranker:
+    """Cross-encoder (sentence-transformers) di CPU, skor dihitung per batch."""
+    needs_embeddings = False
+    needs_text = True
+
+    def __init__(self, model_name: str = DEFAULT_CROSS_ENCODER, batch_size: int = 32,
+                 device: str = "cpu", max_length: int = 512):
+        from sentence_transformers import CrossEncoder
+        self.model = CrossEncoder(model_name, device=device, max_length=max_length)
+        self.batch_size = batch_size
+
+    def scores(self, query: str, texts: List[str]) -> np.ndarray:
+        pairs = [(query, t) for t in texts]
+        return np.asarray(self.model.predict(pairs, batch_size=self.batch_size,
+                                             show_progress_bar=False), dtype=np.float32)
+
+    def rerank(self, query: str, hits: List[dict], k: int, q_emb=None) -> List[dict]:
+        if not hits:
+            return []
+        scores = self.scores(query, [h['chunk'] for h in hits])
+        return _reorder(hits, top_k(scores, k), scores)
+
+
+def make_reranker(method: Optional[str] = None):
+    """Reranker sesuai `rerank.*` di config.yml (method: dense | cross_encoder | none)."""
+    cfg = config.get("rerank", {}) or {}
+    method = method or cfg.get("method", "none")
+    if method == "dense":
+        return DenseReranker(prenormalized=bool(cfg.get("prenormalized", True)))
+    if method == "cross_encoder":
+        return CrossEncoderReranker(
+            model_name=cfg.get("model", DEFAULT_CROSS_ENCODER),
+            batch_size=int(cfg.get("batch_size", 32)),
+            device=cfg.get("device", "cpu"),
+        )
+    if method == "none":
+        return NoopReranker()
+    raise ValueError(f"rerank.method tidak dikenal: {method!r}")
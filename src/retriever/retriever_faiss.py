@@ -1,49 +1,172 @@
 """
-Retriever for FAISS GPU index using LangChain and SapBERT embeddings.
+Retriever for the CPU FAISS index (see src/indexer/faiss_index.py) using LangChain and SapBERT embeddings.
 """
 import os
-import yaml
-from dotenv import load_dotenv
+import numpy as np
 
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain.vectorstores import FAISS
-from langchain.schema import Document
+from src import config, services
+from src.indexer.chunk_store import ChunkStore
+from src.indexer.faiss_index import (INDEX_FILE, POSITIONS_FILE, apply_search_params, filtered_search,
+                                     load_positions, load_store, read_index)
+from src.indexer.metadata_index import MetadataIndex, positions_mask, store_rows
+from src.retriever.bm25 import BM25Index
+from src.retriever.hybrid import fuse
+from src.serving.micro_batch import micro_batched
 
-# 1. Load environment variables
-load_dotenv(dotenv_path=os.path.join("config", ".env"))
+# 1. Load configuration (+ .env)
+cfg = config.load_config()
 
-# 2. Load configuration
-config_path = os.path.join("config", "config.yaml")
-with open(config_path, "r", encoding="utf-8") as cfg_file:
-    cfg = yaml.safe_load(cfg_file)
-
-# 3. Retrieve vectorstore path
+# 2. Retrieve vectorstore path
 INDEX_PATH = cfg["vectorstore"]["path"]  # e.g., data/faiss_index
+BM25_DIR = os.path.join(INDEX_PATH, "bm25")
+CHUNKS_DIR = os.path.join(INDEX_PATH, "chunks")
+MMAP = cfg["vectorstore"].get("mmap", True)
+RETRIEVAL_MODE = cfg.get("retrieval", {}).get("mode", "hybrid")
+
+
+# 3. Embeddings dan index dimuat lazy lewat registry, bukan saat import
+def query_device() -> str:
+    # retrieval.device dari config; default cuda hanya bila GPU memang ada
+    device = config.get("retrieval.device")
+    if device:
+        return device
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def init_embeddings():
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(
+        model_name=os.getenv("EMBEDDING_MODEL"),
+        model_kwargs={"device": query_device(), "trust_remote_code": True}
+    )
+
+
+def init_faiss_index():
+    # Index di-memory-map dari disk; nprobe / efSearch dari vectorstore.* di config
+    index = read_index(os.path.join(INDEX_PATH, INDEX_FILE), mmap=MMAP)
+    apply_search_params(index)
+    return index
+
+
+def init_faiss_positions():
+    # index_ids.txt harus sepasang dengan index.faiss; retriever yang mulai di tengah
+    # save_store bisa melihat file campuran → pakai docstore index.pkl (dicek load_store)
+    positions = load_positions(INDEX_PATH)
+    if positions is None:
+        return None
+    ntotal = services.get("faiss_index").ntotal
+    if len(positions) != ntotal:
+        print(f"[✗] {POSITIONS_FILE}: {len(positions)} ID untuk {ntotal} vektor; memakai docstore index.pkl")
+        return None
+    return positions
+
+
+def init_faiss_chunks():
+    # Teks + metadata chunk dari chunk store (mmap), bukan docstore pickle in-RAM
+    return ChunkStore(CHUNKS_DIR) if ChunkStore.exists(CHUNKS_DIR) else None
+
+
+def init_faiss_db():
+    # Fallback untuk index lama tanpa index_ids.txt / chunk store: docstore LangChain penuh
+    return load_store(INDEX_PATH, services.get("faiss_embeddings"), mmap=MMAP)
 
-# 4. Initialize embeddings
-model_name = os.getenv("EMBEDDING_MODEL")
-embeddings = HuggingFaceEmbeddings(
-    model_name=model_name,
-    model_kwargs={"device": "cuda", "trust_remote_code": True}
-)
 
-# 5. Load FAISS index from disk
-db = FAISS.load_local(INDEX_PATH, embeddings)
+def init_faiss_bm25():
+    return BM25Index(BM25_DIR) if os.path.exists(os.path.join(BM25_DIR, "meta.json")) else None
+
+
+def init_faiss_metadata():
+    # Bitmap per buku/subbab/tipe (dibangun build_faiss; dibangun di memori bila belum ada)
+    store = services.get("faiss_chunks")
+    return MetadataIndex.load_for(store) if store is not None else None
+
+
+def vector_ids() -> list:
+    """Chunk ID per posisi vektor FAISS."""
+    positions = services.get("faiss_positions")
+    if positions is None:
+        mapping = services.get("faiss_db").index_to_docstore_id
+        positions = [mapping[i] for i in range(len(mapping))]
+    return positions
+
+
+def init_query_encoder():
+    emb = services.get("faiss_embeddings")
+    # Query dari sesi bersamaan digabung menjadi satu forward pass
+    return micro_batched(emb) if config.get("query_batching.enabled", True) else emb
+
+
+services.register("faiss_embeddings", init_embeddings, warmup=lambda e: e.embed_query("warmup"))
+services.register("faiss_query_encoder", init_query_encoder)
+services.register("faiss_index", init_faiss_index)
+services.register("faiss_positions", init_faiss_positions)
+services.register("faiss_chunks", init_faiss_chunks)
+services.register("faiss_db", init_faiss_db)
+services.register("faiss_bm25", init_faiss_bm25)
+services.register("faiss_metadata", init_faiss_metadata)
+# Baris chunk store per posisi vektor / dokumen BM25: mask filter dipetakan sekali per proses
+services.register("faiss_vector_rows", lambda: store_rows(services.get("faiss_chunks"), vector_ids()))
+services.register("faiss_bm25_rows", lambda: store_rows(services.get("faiss_chunks"), services.get("faiss_bm25").ids))
+
+
+def dense_search(query: str, n: int, mask: np.ndarray = None) -> list:
+    """
+    [(docstore_id, skor)] dari FAISS; jarak L2 kecil = lebih relevan.
+    `mask` (per baris chunk store, lihat metadata_index) membatasi vektor di dalam search.
+    """
+    positions = services.get("faiss_positions")
+    if positions is None:
+        db = services.get("faiss_db")
+        index, positions = db.index, db.index_to_docstore_id
+    else:
+        index = services.get("faiss_index")
+    vec = np.asarray([services.get("faiss_query_encoder").embed_query(query)], dtype=np.float32)
+    if mask is None:
+        dists, idxs = index.search(vec, n)
+    else:
+        dists, idxs = filtered_search(index, vec, n, positions_mask(mask, services.get("faiss_vector_rows")))
+    return [(positions[i], -float(d)) for d, i in zip(dists[0], idxs[0]) if i != -1]
 
 
-def retrieve(query: str, k: int = 5) -> list[Document]:
+def retrieve(query: str, k: int = 5, mode: str = RETRIEVAL_MODE, filters: dict = None) -> list:
     """
-    Perform semantic search and return top-k LangChain Document objects.
+    Perform dense, sparse (BM25) or hybrid (reciprocal rank fusion) search
+    and return top-k LangChain Document objects.
 
     Args:
         query (str): Input query string.
         k (int): Number of top documents to return.
+        mode (str): "dense", "sparse" or "hybrid".
+        filters (dict): Optional {"book" | "chapter" | "section" | "type": value or [values]},
+            applied inside the FAISS / BM25 search.
 
     Returns:
         List of Document(page_content, metadata).
     """
-    docs = db.similarity_search(query, k=k)
-    return docs
+    bm25 = services.get("faiss_bm25")
+    dense_fn, sparse_fn = dense_search, bm25.search if bm25 else None
+    if filters:
+        meta = services.get("faiss_metadata")
+        if meta is None:
+            raise RuntimeError("Filter metadata membutuhkan chunk store; jalankan build_faiss ulang")
+        mask = meta.mask(filters)
+        if mask is not None:
+            if not mask.any():
+                return []
+            dense_fn = lambda q, n: dense_search(q, n, mask)
+            if bm25:
+                bm25_mask = positions_mask(mask, services.get("faiss_bm25_rows"))
+                sparse_fn = lambda q, n: bm25.search(q, n, mask=bm25_mask)
+    ranked = fuse(query, k, mode, dense_fn, sparse_fn)
+    store = services.get("faiss_chunks")
+    if store is None:
+        db = services.get("faiss_db")
+        return [db.docstore.search(doc_id) for doc_id, _ in ranked]
+    from langchain.schema import Document
+    # Hanya teks top-k final yang dibaca dari blob
+    return [Document(page_content=text, metadata=meta)
+            for text, meta in filter(None, store.get([doc_id for doc_id, _ in ranked]))]
 
 
 # Smoke test when run as script
@@ -56,4 +179,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
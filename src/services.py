@@ -0,0 +1,92 @@
+"""
+Registry service yang diinisialisasi secara lazy (embedder, vector store, klien LLM).
+
+Modul hanya mendaftarkan factory saat di-import; model/index baru dimuat
+pada `get()` pertama, atau lebih awal lewat `warmup()` di thread latar
+setelah UI sudah melayani.
+"""
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+_MISSING = object()
+
+
+class ServiceRegistry:
+    def __init__(self):
+        self._factories: Dict[str, Callable] = {}
+        self._warmups: Dict[str, Callable] = {}
+        self._instances: Dict[str, object] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.init_seconds: Dict[str, float] = {}
+
+    def register(self, name: str, factory: Callable, warmup: Optional[Callable] = None):
+        """Daftarkan factory (tanpa argumen); `warmup(instance)` opsional dijalankan oleh warmup()."""
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+            if warmup is not None:
+                self._warmups[name] = warmup
+
+    def get(self, name: str):
+        # Sentinel, bukan `is not None`: factory boleh mengembalikan None
+        # (fitur dimatikan di config) dan hasil itu juga di-cache
+        inst = self._instances.get(name, _MISSING)
+        if inst is not _MISSING:
+            return inst
+        if name not in self._factories:
+            raise KeyError(f"Service belum terdaftar: {name}")
+        # Lock per service: pemanggil lain menunggu, factory hanya jalan sekali
+        with self._locks[name]:
+            if name not in self._instances:
+                t0 = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                self.init_seconds[name] = time.perf_counter() - t0
+            return self._instances[name]
+
+    def is_ready(self, name: str) -> bool:
+        return name in self._instances
+
+    def reset(self, name: str):
+        """Buang instance (mis. setelah index di-rebuild); get() berikutnya memuat ulang."""
+        with self._locks.get(name, self._lock):
+            self._instances.pop(name, None)
+
+    def warmup(self, names: Optional[Iterable[str]] = None, background: bool = True,
+               before: Optional[Callable] = None):
+        """
+        Inisialisasi service `names` (default: semua) lalu jalankan hook warm-up
+        masing-masing. `before` (mis. ensure_index) dijalankan lebih dulu.
+        Dengan background=True kembali segera dan mengembalikan Thread-nya.
+        """
+        names = list(names) if names is not None else list(self._factories)
+
+        def run():
+            if before is not None:
+                # Gagal di sini tidak boleh mematikan thread: service tetap di-warm-up
+                try:
+                    before()
+                except Exception as e:
+                    print(f"[WARMUP] {getattr(before, '__name__', 'before')} gagal: {e}")
+            for name in names:
+                try:
+                    inst = self.get(name)
+                    if name in self._warmups:
+                        self._warmups[name](inst)
+                    print(f"[WARMUP] {name} siap ({self.init_seconds.get(name, 0.0):.1f} s)")
+                except Exception as e:
+                    print(f"[WARMUP] {name} gagal: {e}")
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name="service-warmup", daemon=True)
+        thread.start()
+        return thread
+
+
+registry = ServiceRegistry()
+register = registry.register
+get = registry.get
+warmup = registry.warmup
@@ -0,0 +1,193 @@
+"""
+Cache jawaban di depan generate_answer untuk pertanyaan berulang.
+
+Dua tingkat:
+- exact: kunci (query ternormalisasi, top_k, versi index);
+- semantik: embedding query baru dibandingkan (cosine, satu matmul) dengan
+  query ter-cache bertop_k sama; jawaban dipakai ulang bila skor >=
+  `semantic_threshold`.
+
+Entri kedaluwarsa lewat TTL dan LRU (`max_items`), dan seluruh cache
+dikosongkan otomatis bila versi manifest index berubah.
+"""
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+
+from src import config
+
+_SPACE_RE = re.compile(r"\s+")
+_EDGE_PUNCT = " \t\n.,;:!?¿¡\"'()[]"
+
+
+def normalize_query(query: str) -> str:
+    """NFKC, huruf kecil, spasi dirapatkan, tanda baca di ujung dibuang."""
+    q = unicodedata.normalize("NFKC", query).lower()
+    return _SPACE_RE.sub(" ", q).strip(_EDGE_PUNCT)
+
+
+@dataclass
+class _Entry:
+    answer: str
+    created: float
+    cost: float  # detik yang dibutuhkan untuk menghasilkan jawaban aslinya
+    slot: int
+
+
+class AnswerCache:
+    """
+    get(query, top_k) -> jawaban atau None; put(query, top_k, answer, cost).
+
+    `version_fn()` mengembalikan versi index saat ini (mis. Manifest.version);
+    `embed_fn(query)` -> vektor query, atau None untuk menonaktifkan tingkat
+    semantik.
+    """
+
+    def __init__(self, version_fn: Callable[[], str], embed_fn: Optional[Callable] = None,
+                 semantic_threshold: Optional[float] = 0.95, ttl: float = 86400.0,
+                 max_items: int = 2000):
+        self.version_fn = version_fn
+        self.embed_fn = embed_fn if semantic_threshold else None
+        self.threshold = semantic_threshold
+        self.ttl = ttl
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._version = None
+        # Matriks embedding ter-normalisasi per slot; slot kosong bertop_k -1
+        self._embs: Optional[np.ndarray] = None
+        self._slot_topk = np.full(max_items, -1, dtype=np.int64)
+        self._slot_key = [None] * max_items
+        self._free = list(range(max_items - 1, -1, -1))
+        self.lookups = self.exact_hits = self.semantic_hits = 0
+        self.expired = self.invalidations = 0
+        self.saved_seconds = 0.0
+
+    # ---------- API ----------
+    def get(self, query: str, top_k: int) -> Optional[str]:
+        norm = normalize_query(query)
+        version = self._check_version()
+        now = time.time()
+        with self._lock:
+            self.lookups += 1
+            entry = self._live((norm, top_k, version), now)
+            if entry is not None:
+                self.exact_hits += 1
+                self.saved_seconds += entry.cost
+                return entry.answer
+        if self.embed_fn is None or not self._entries:
+            return None
+        # Embedding dihitung di luar lock (bisa lewat micro-batcher)
+        q = self._normalize(self.embed_fn(query))
+        with self._lock:
+            if self._embs is None or version != self._version:
+                return None
+            scores = self._embs @ q
+            scores[self._slot_topk != top_k] = -np.inf
+            slot = int(np.argmax(scores))
+            if scores[slot] < self.threshold:
+                return None
+            entry = self._live(self._slot_key[slot], now)
+            if entry is None:
+                return None
+            self.semantic_hits += 1
+            self.saved_seconds += entry.cost
+            return entry.answer
+
+    def put(self, query: str, top_k: int, answer: str, cost: float = 0.0):
+        version = self._check_version()
+        key = (normalize_query(query), top_k, version)
+        emb = self._normalize(self.embed_fn(query)) if self.embed_fn is not None else None
+        with self._lock:
+            if version != self._version:
+                return
+            if key in self._entries:
+                self._remove(key)
+            while len(self._entries) >= self.max_items:
+                self._remove(next(iter(self._entries)))
+            slot = self._free.pop()
+            if emb is not None:
+                if self._embs is None:
+                    self._embs = np.zeros((self.max_items, len(emb)), dtype=np.float32)
+                self._embs[slot] = emb
+                self._slot_topk[slot] = top_k
+            self._slot_key[slot] = key
+            self._entries[key] = _Entry(answer, time.time(), cost, slot)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.semantic_hits
+        return {
+            "entries": len(self._entries),
+            "lookups": self.lookups,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.lookups - hits,
+            "hit_rate": hits / self.lookups if self.lookups else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "expired": self.expired,
+            "invalidations": self.invalidations,
+        }
+
+    # ---------- internal ----------
+    @staticmethod
+    def _normalize(v) -> np.ndarray:
+        v = np.asarray(v, dtype=np.float32).ravel()
+        n = float(np.linalg.norm(v))
+        return v / n if n else v
+
+    def _check_version(self) -> str:
+        """Versi index saat ini; cache dikosongkan bila berbeda dari sebelumnya."""
+        version = self.version_fn()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    if self._version is not None:
+                        self.invalidations += 1
+                    for key in list(self._entries):
+                        self._remove(key)
+                    self._version = version
+        return version
+
+    def _live(self, key, now) -> Optional[_Entry]:
+        """Entri untuk `key` bila belum kedaluwarsa (dipindah ke ujung LRU)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry.created > self.ttl:
+            self.expired += 1
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._slot_topk[entry.slot] = -1
+        self._slot_key[entry.slot] = None
+        self._free.append(entry.slot)
+
+
+def make_answer_cache(version_fn: Callable[[], str], embed_fn: Optional[Callable] = None) -> Optional[AnswerCache]:
+    """AnswerCache dari `answer_cache.*` di config.yml; None bila dinonaktifkan."""
+    cfg = config.get("answer_cache", {}) or {}
+    if not cfg.get("enabled", True):
+        return None
+    threshold = cfg.get("semantic_threshold", 0.95)
+    return AnswerCache(
+        version_fn,
+        embed_fn,
+        semantic_threshold=float(threshold) if threshold else None,
+        ttl=float(cfg.get("ttl_seconds", 86400)),
+        max_items=int(cfg.get("max_items", 2000)),
+    )
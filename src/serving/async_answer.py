@@ -0,0 +1,226 @@
+"""
+Jalur request asyncio untuk chat: retrieval di thread pool terbatas,
+generasi LLM lewat streaming async, dengan batas antrean (backpressure)
+dan timeout per request.
+"""
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Optional
+
+from src import config
+from src.serving.tracing import bind, mark, span
+
+
+class Overloaded(RuntimeError):
+    """Antrean penuh: request ditolak segera alih-alih menunggu tanpa batas."""
+
+
+class AsyncAnswerService:
+    """
+    stream_answer() yield jawaban parsial seperti stream_answer versi sync.
+
+    - `max_concurrency` request aktif (retrieval + generasi) sekaligus;
+    - hingga `max_queue` request menunggu, sisanya ditolak dengan Overloaded;
+    - retrieval (embedding, Chroma, BM25) jalan di ThreadPoolExecutor
+      `retrieval_workers` thread agar event loop tidak terblokir;
+    - `timeout` detik total per request (asyncio.TimeoutError);
+    - `cache` (AnswerCache, opsional) dicek sebelum antre; jawaban final
+      yang berhasil disimpan ke cache;
+    - `tracer` (Tracer, opsional) mencatat span per request: cache_lookup,
+      queue_wait, retrieval (rincian dari thread pool), build_prompt,
+      llm_ttft, llm_total, post_process;
+    - `conversation` (Conversation, opsional): request dengan `session_id`
+      melanjutkan sesi (context Ollama, chunk giliran sebelumnya) alih-alih
+      membangun prompt dari nol; giliran lanjutan tidak memakai cache;
+    - `filters` (opsional, per request) diteruskan ke `retrieve_fn` sebagai
+      keyword; request terfilter tidak memakai cache, dan chunk sesi hanya
+      dipakai ulang bila filternya sama dengan giliran sebelumnya;
+    - `stream_formatter(hits)` (opsional, mis. CitationStream) memformat
+      token saat tiba (`feed`/`text`/`finish`); tanpa itu jawaban parsial
+      adalah teks mentah dan jawaban final dari `post_process_fn`;
+    - `dump_prompt_fn(query, prompt, extra)` (opsional) menerima prompt sesi
+      (`build_prompt_fn` tidak dipanggil untuk request dengan sesi).
+    """
+
+    def __init__(self, retrieve_fn: Callable, build_prompt_fn: Callable, post_process_fn: Callable,
+                 llm, max_concurrency: int = 8, max_queue: int = 32,
+                 retrieval_workers: int = 4, timeout: float = 180.0, cache=None, tracer=None,
+                 conversation=None, stream_formatter: Optional[Callable] = None,
+                 dump_prompt_fn: Optional[Callable] = None):
+        self.retrieve_fn = retrieve_fn
+        self.build_prompt_fn = build_prompt_fn
+        self.post_process_fn = post_process_fn
+        self.llm = llm
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.cache = cache
+        self.tracer = tracer
+        self.conversation = conversation
+        self.stream_formatter = stream_formatter
+        self.dump_prompt_fn = dump_prompt_fn
+        self.executor = ThreadPoolExecutor(max_workers=retrieval_workers, thread_name_prefix="retrieval")
+        self._sem: Optional[asyncio.Semaphore] = None
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def stats(self) -> dict:
+        return {"active": self.active, "waiting": self.waiting,
+                "rejected": self.rejected, "timeouts": self.timeouts}
+
+    async def stream_answer(self, query: str, top_k: int = 5, session_id: Optional[str] = None,
+                            filters: Optional[dict] = None) -> AsyncIterator[str]:
+        tr = self.tracer.start("chat_async", top_k=top_k) if self.tracer else None
+        if tr is not None and filters:
+            tr.attrs["filters"] = filters
+        try:
+            async for partial in self._stream_answer(query, top_k, tr, session_id, filters):
+                yield partial
+        except BaseException as e:
+            if tr is not None:
+                tr.attrs.setdefault("status", type(e).__name__)
+            raise
+        finally:
+            if tr is not None:
+                tr.attrs.setdefault("status", "ok")
+                self.tracer.finish(tr)
+
+    async def _stream_answer(self, query: str, top_k: int, tr, session_id=None,
+                             filters: Optional[dict] = None) -> AsyncIterator[str]:
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        conv = self.conversation if session_id is not None else None
+        session = conv.session(session_id) if conv is not None else None
+        follow_up = session is not None and bool(session.turns)
+        if tr is not None and session is not None:
+            tr.attrs["turn"] = len(session.turns) + 1
+        use_cache = self.cache is not None and not follow_up and not filters
+        if use_cache:
+            # Cache hit tidak memakai slot generasi maupun antrean
+            with span("cache_lookup", tr):
+                cached = await loop.run_in_executor(self.executor, self.cache.get, query, top_k)
+            if cached is not None:
+                if tr is not None:
+                    tr.attrs["status"] = "cache_hit"
+                if session is not None:
+                    conv.record(session, query, cached, {})
+                yield cached
+                return
+
+        if self._sem.locked():
+            # Semua slot terpakai: ikut antre bila masih ada tempat
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded(f"Antrean penuh ({self.waiting} menunggu)")
+            self.waiting += 1
+            try:
+                with span("queue_wait", tr):
+                    await asyncio.wait_for(self._sem.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+            finally:
+                self.waiting -= 1
+        else:
+            await self._sem.acquire()
+        self.active += 1
+        t_start = loop.time()
+        try:
+            if session is not None and session.filters == filters and conv.reusable(session, query):
+                # Pertanyaan lanjutan yang masih tercakup chunk sesi: tanpa retrieval
+                hits = []
+                if tr is not None:
+                    tr.attrs["reused_hits"] = True
+            else:
+                r_query = conv.retrieval_query(session, query) if session is not None else query
+                retrieve = bind(self.retrieve_fn, tr)
+                if filters:
+                    retrieve = functools.partial(retrieve, filters=filters)
+                with span("retrieval", tr):
+                    # Span embedding / search / rerank dicatat dari thread retrieval
+                    hits = await asyncio.wait_for(
+                        loop.run_in_executor(self.executor, retrieve, r_query, top_k),
+                        max(deadline - loop.time(), 0),
+                    )
+                if session is not None:
+                    session.filters = filters
+            context = None
+            if session is not None:
+                new_hits = conv.add_hits(session, hits)
+                hits = session.hits
+            if not hits:
+                yield "Tidak ditemukan konteks."
+                return
+            with span("build_prompt", tr):
+                if session is not None:
+                    prompt, context = conv.prompt(session, query, new_hits)
+                    if self.dump_prompt_fn is not None:
+                        bind(self.dump_prompt_fn, tr)(query, prompt, {
+                            "turn": len(session.turns) + 1, "continued": context is not None})
+                else:
+                    prompt = bind(self.build_prompt_fn, tr)(query, hits)
+            if tr is not None:
+                tr.attrs["prompt_chars"] = len(prompt)
+                tr.attrs["continued"] = context is not None
+            raw = ""
+            fmt = self.stream_formatter(hits) if self.stream_formatter is not None else None
+            llm_stats: dict = {}
+            t_llm = time.perf_counter()
+            tokens = self.llm.astream(prompt, context=context, stats=llm_stats).__aiter__()
+            try:
+                while True:
+                    try:
+                        token = await asyncio.wait_for(tokens.__anext__(), max(deadline - loop.time(), 0))
+                    except StopAsyncIteration:
+                        break
+                    if not raw:
+                        mark("llm_ttft", t_llm, tr)
+                        mark("first_token", None, tr)  # dari awal request, seperti dirasakan pengguna
+                    raw += token
+                    if fmt is None:
+                        yield raw
+                    elif fmt.feed(token):
+                        yield fmt.text
+            finally:
+                await tokens.aclose()
+            mark("llm_total", t_llm, tr)
+            if tr is not None and "prompt_eval_count" in llm_stats:
+                tr.attrs["prefill_tokens"] = llm_stats["prompt_eval_count"]
+            if session is not None:
+                conv.record(session, query, raw, llm_stats)
+            with span("post_process", tr):
+                answer = fmt.finish() if fmt is not None else self.post_process_fn(raw, hits)
+            if use_cache:
+                await loop.run_in_executor(self.executor, self.cache.put, query, top_k,
+                                           answer, loop.time() - t_start)
+            yield answer
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.active -= 1
+            self._sem.release()
+
+
+def make_service(retrieve_fn, build_prompt_fn, post_process_fn, llm, cache=None, tracer=None,
+                 conversation=None, stream_formatter=None, dump_prompt_fn=None) -> AsyncAnswerService:
+    """AsyncAnswerService dengan batas dari `serving.*` di config.yml."""
+    cfg = config.get("serving", {}) or {}
+    return AsyncAnswerService(
+        retrieve_fn, build_prompt_fn, post_process_fn, llm,
+        max_concurrency=int(cfg.get("max_concurrency", 8)),
+        max_queue=int(cfg.get("max_queue", 32)),
+        retrieval_workers=int(cfg.get("retrieval_workers", 4)),
+        timeout=float(cfg.get("timeout", 180)),
+        cache=cache,
+        tracer=tracer,
+        conversation=conversation,
+        stream_formatter=stream_formatter,
+        dump_prompt_fn=dump_prompt_fn,
+    )
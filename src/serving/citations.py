@@ -0,0 +1,209 @@
+"""
+Mesin sitasi inkremental untuk jawaban yang di-stream.
+
+CitationStream menerima token LLM satu per satu dan menghasilkan teks yang
+aman ditampilkan saat itu juga:
+  - penanda `[n]` / `[n, m]` langsung ditulis ulang ke nomor referensi
+    terdeduplikasi (sumber dengan buku/bab/subbab/halaman sama = satu
+    referensi) lewat tabel sumber → referensi, O(1) per penanda;
+    nomor sumber yang tidak ada di prompt dibuang;
+  - blok `<think>…</think>` deepseek-r1 dibuang saat lewat, tidak pernah
+    ditampung maupun ditampilkan;
+  - hanya potongan yang mungkin penanda/tag yang belum lengkap (beberapa
+    karakter) yang ditahan sampai token berikutnya.
+
+finish() menutup stream: bila model tidak menyisipkan sitasi sama sekali,
+kalimat awal diberi sitasi seperti post_process lama, lalu daftar
+referensi ditambahkan di akhir.
+"""
+import re
+from typing import Dict, List, Tuple
+
+_TAG_RE = re.compile(r"</?think>")
+_CITE_RE = re.compile(r"\[(\d+(?:\s*,\s*\d+)*)\]")
+_DROP = "\x00"  # pengganti sementara penanda tanpa sumber valid
+_DROP_RE = re.compile(r"[ \t]*\x00")
+_CITE_PREFIX_RE = re.compile(r"\[\d*(?:\s*,\s*\d*)*")
+_SENT_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+_NUM_RE = re.compile(r"\d+")
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+MAX_PENDING = 32  # penanda sitasi lebih panjang dari ini diperlakukan sebagai teks biasa
+
+
+def reference_key(hit: dict) -> Tuple:
+    return (hit['book'], hit['chapters'], hit['sections'], hit['pages'])
+
+
+def format_reference(idx: int, key: Tuple) -> str:
+    book, chap, sec, page = key
+    parts = [book]
+    if chap != '–': parts.append(f"Bab: {chap}")
+    if sec != '–': parts.append(f"Subbab: {sec}")
+    parts.append(f"Halaman {page}")
+    return f"{idx}. {', '.join(parts)}"
+
+
+def _partial_suffix(text: str, tag: str) -> str:
+    """Ujung `text` yang merupakan awalan `tag` (tag mungkin terpotong antar token)."""
+    for n in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:n]):
+            return text[-n:]
+    return ""
+
+
+def rewrite_citations(text: str, ref_of: List[int], memo: Dict[str, str]) -> Tuple[str, int]:
+    """
+    Satu pass re.sub: isi penanda → pengganti lewat dict `memo` (diisi saat
+    penanda pertama kali muncul). Penanda tanpa sumber valid dibuang beserta
+    spasi sebelumnya. Return (teks, jumlah penanda yang menjadi sitasi).
+    """
+    def repl(m):
+        body = m.group(1)
+        out = memo.get(body)
+        if out is None:
+            refs = []
+            for n in map(int, _NUM_RE.findall(body)):
+                if 1 <= n <= len(ref_of) and ref_of[n - 1] not in refs:
+                    refs.append(ref_of[n - 1])
+            out = memo[body] = "[" + ", ".join(map(str, refs)) + "]" if refs else _DROP
+        return out
+
+    text, n = _CITE_RE.subn(repl, text)
+    dropped = text.count(_DROP) if n else 0
+    if dropped:
+        text = _DROP_RE.sub("", text)
+    return text, n - dropped
+
+
+class CitationStream:
+    """
+    feed(token) -> bool (teks tampilan berubah); `text` = teks tampilan
+    sejauh ini (digabung hanya saat dibaca); finish() -> jawaban final.
+    """
+
+    def __init__(self, hits: List[dict]):
+        self.keys: List[Tuple] = []
+        index: Dict[Tuple, int] = {}
+        self.ref_of: List[int] = []  # sumber ke-i (0-based) -> nomor referensi (1-based)
+        for hit in hits:
+            key = reference_key(hit)
+            if key not in index:
+                index[key] = len(self.keys) + 1
+                self.keys.append(key)
+            self.ref_of.append(index[key])
+        self._parts: List[str] = []
+        self.delta = ""  # potongan teks terakhir yang ditambahkan feed()
+        self.cited = 0
+        self._memo: Dict[str, str] = {}
+        self._pending = ""
+        self._in_think = False
+        self._lstrip = True  # spasi di awal jawaban (atau setelah </think>) tidak ditampilkan
+
+    @property
+    def text(self) -> str:
+        if len(self._parts) > 1:
+            self._parts[:] = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def _hold(self, seg: str) -> str:
+        """Ujung `seg` yang mungkin awal penanda sitasi atau tag think yang belum lengkap."""
+        k = max(seg.rfind("["), seg.rfind("<"))
+        if k < 0:
+            return ""
+        tail = seg[k:]
+        if tail[0] == "<":
+            return tail if THINK_OPEN.startswith(tail) or THINK_CLOSE.startswith(tail) else ""
+        return tail if len(tail) <= MAX_PENDING and _CITE_PREFIX_RE.fullmatch(tail) else ""
+
+    def feed(self, token: str) -> bool:
+        buf = self._pending + token
+        self._pending = ""
+        out = []
+        reset = False
+        i, n = 0, len(buf)
+        while i < n:
+            if self._in_think:
+                j = buf.find(THINK_CLOSE, i)
+                if j < 0:
+                    # Isi think dibuang; hanya calon </think> terpotong yang ditahan
+                    self._pending = _partial_suffix(buf[i:], THINK_CLOSE)
+                    break
+                i = j + len(THINK_CLOSE)
+                self._in_think = False
+                self._lstrip = True
+                continue
+            m = _TAG_RE.search(buf, i)
+            seg = buf[i:m.start() if m else n]
+            if m is None:
+                self._pending = self._hold(seg)
+                seg = seg[:len(seg) - len(self._pending)]
+            out.append(self._rewrite(seg))
+            if m is None:
+                break
+            if m.group() == THINK_OPEN:
+                self._in_think = True
+            else:
+                # Template yang membuka <think> di prompt: semua sebelum </think> adalah pemikiran
+                self._parts, out, reset = [], [], True
+                self._lstrip = True
+            i = m.end()
+        return self._emit("".join(out)) or reset
+
+    def _rewrite(self, seg: str) -> str:
+        seg, cited = rewrite_citations(seg, self.ref_of, self._memo)
+        self.cited += cited
+        return seg
+
+    def _emit(self, chunk: str) -> bool:
+        if self._lstrip:
+            chunk = chunk.lstrip()
+            if not chunk:
+                return False
+            self._lstrip = False
+        if not chunk:
+            return False
+        self.delta = chunk
+        self._parts.append(chunk)
+        return True
+
+    def references(self) -> str:
+        return "Referensi:\n" + "\n".join(format_reference(i, k) for i, k in enumerate(self.keys, start=1))
+
+    def finish(self) -> str:
+        if self._pending and not self._in_think:
+            self._emit(self._pending)  # penanda tak lengkap di akhir jawaban: tampilkan apa adanya
+        self._pending = ""
+        text = self.text.strip()
+        if not self.cited and text:
+            # Model tidak menyisipkan sitasi: beri sitasi pada kalimat awal, satu per referensi
+            sentences = _SENT_SPLIT_RE.split(text)
+            n_refs = len(self.keys)
+            text = " ".join(f"{s.strip()} [{i}]" if i <= n_refs else s.strip()
+                            for i, s in enumerate(sentences, start=1))
+        return f"{text}\n\n{self.references()}"
+
+
+def format_answer(raw: str, hits: List[dict]) -> str:
+    """
+    Jawaban lengkap (non-streaming), hasil sama dengan CitationStream: tag
+    think dipotong langsung dari teks utuh (tanpa mesin token), lalu sitasi
+    tiap potongan yang tampil ditulis ulang dalam satu pass re.sub.
+    """
+    cs = CitationStream(hits)
+    i, in_think = 0, False
+    for m in _TAG_RE.finditer(raw):
+        if in_think:
+            if m.group() == THINK_CLOSE:
+                in_think, cs._lstrip, i = False, True, m.end()
+            continue
+        cs._emit(cs._rewrite(raw[i:m.start()]))
+        if m.group() == THINK_OPEN:
+            in_think = True
+        else:
+            # </think> tanpa pembuka: semua sebelumnya adalah pemikiran
+            cs._parts, cs._lstrip = [], True
+        i = m.end()
+    if not in_think:
+        cs._emit(cs._rewrite(raw[i:]))
+    return cs.finish()
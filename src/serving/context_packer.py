@@ -0,0 +1,229 @@
+"""
+Pengemasan konteks prompt dengan anggaran token.
+
+build_prompt dulu menempelkan teks penuh semua top-k chunk; di CPU waktu
+prefill LLM sebanding dengan panjang prompt dan mendominasi waktu ke token
+pertama. ContextPacker memangkas konteks sebelum prompt dibangun:
+
+  1. Hit berdekatan dari buku yang sama (halaman sama/bersebelahan)
+     digabung menjadi satu blok dengan gabungan halaman untuk sitasi.
+  2. Kalimat yang sudah muncul di blok sebelumnya (tumpang tindih
+     OVERLAP_TOKENS antar chunk) dibuang.
+  3. Kalimat diberi skor kecocokan dengan query (istilah query berbobot
+     IDF atas kalimat kandidat); kalimat terbaik tiap blok diambil lebih
+     dulu, lalu sisanya menurut skor sampai anggaran `max_tokens` habis.
+
+Hasilnya tetap berupa daftar hit (book/chapters/sections/pages/metadata
+utuh) sehingga build_prompt dan post_process tidak berubah.
+"""
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src import config
+
+_SENT_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+GAP = " … "
+
+
+@dataclass
+class PackStats:
+    hits_in: int = 0
+    blocks_out: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    duplicate_sentences: int = 0
+    dropped_sentences: int = 0
+
+    def as_attrs(self) -> dict:
+        return {"context_tokens_in": self.tokens_in, "context_tokens": self.tokens_out,
+                "context_blocks": self.blocks_out}
+
+
+def _page_numbers(pages) -> set:
+    return {p.strip() for p in str(pages).split(",") if p.strip() and p.strip() != "–"}
+
+
+def _adjacent(a: set, b: set) -> bool:
+    """Halaman sama, atau label numerik yang selisihnya satu."""
+    if a & b:
+        return True
+    na = {int(p) for p in a if p.isdigit()}
+    nb = {int(p) for p in b if p.isdigit()}
+    return any(abs(x - y) <= 1 for x in na for y in nb)
+
+
+def _page_key(pages: set):
+    nums = [int(p) for p in pages if p.isdigit()]
+    return min(nums) if nums else float("inf")
+
+
+def _normalize(sentence: str) -> str:
+    return " ".join(_WORD_RE.findall(sentence.lower()))
+
+
+class ContextPacker:
+    """
+    Pangkas hit menjadi konteks dalam `max_tokens` token.
+
+    Tanpa `tokenizer` jumlah token ditaksir dari jumlah kata
+    (`tokens_per_word`); dengan tokenizer HF (mis. tokenizer model Ollama)
+    dihitung persis. Kalimat lebih panjang dari `max_sentence_words`
+    dipecah agar teks PDF tanpa tanda baca tetap bisa dipilih sebagian.
+    """
+
+    def __init__(self, max_tokens: int = 1200, tokenizer=None, tokens_per_word: float = 1.4,
+                 merge_adjacent: bool = True, max_sentence_words: int = 60):
+        self.max_tokens = max_tokens
+        self.tokenizer = tokenizer
+        self.tokens_per_word = tokens_per_word
+        self.merge_adjacent = merge_adjacent
+        self.max_sentence_words = max_sentence_words
+
+    def count_tokens(self, texts: Sequence[str]) -> List[int]:
+        if not texts:
+            return []
+        if self.tokenizer is not None:
+            enc = self.tokenizer(list(texts), add_special_tokens=False)
+            return [len(ids) for ids in enc["input_ids"]]
+        return [math.ceil(len(t.split()) * self.tokens_per_word) for t in texts]
+
+    def split_sentences(self, text: str) -> List[str]:
+        out = []
+        for s in _SENT_RE.split(text or ""):
+            words = s.split()
+            for i in range(0, len(words), self.max_sentence_words):
+                out.append(" ".join(words[i:i + self.max_sentence_words]))
+        return [s for s in out if s]
+
+    def merge(self, hits: List[dict]) -> List[List[dict]]:
+        """Kelompokkan hit dari buku yang sama dengan halaman sama/bersebelahan; urutan blok = hit terbaiknya."""
+        groups: List[List[dict]] = []
+        pages: List[set] = []
+        for hit in hits:
+            hp = _page_numbers(hit.get("pages"))
+            for group, gp in zip(groups, pages):
+                if self.merge_adjacent and group[0].get("book") == hit.get("book") and hp and _adjacent(gp, hp):
+                    group.append(hit)
+                    gp |= hp
+                    break
+            else:
+                groups.append([hit])
+                pages.append(set(hp))
+        # Di dalam blok, teks dibaca sesuai urutan halaman (chunk lanjutan setelah pendahulunya)
+        return [sorted(g, key=lambda h: _page_key(_page_numbers(h.get("pages")))) for g in groups]
+
+    def pack(self, query: str, hits: List[dict]) -> Tuple[List[dict], PackStats]:
+        stats = PackStats(hits_in=len(hits))
+        if not hits:
+            return [], stats
+        blocks = self.merge(hits)
+
+        # Kalimat per blok tanpa duplikat lintas blok/chunk
+        seen = set()
+        sentences: List[List[str]] = []
+        for group in blocks:
+            block = []
+            for hit in group:
+                for s in self.split_sentences(hit.get("chunk")):
+                    key = _normalize(s)
+                    if not key:
+                        continue
+                    if key in seen:
+                        stats.duplicate_sentences += 1
+                        continue
+                    seen.add(key)
+                    block.append(s)
+            sentences.append(block)
+
+        flat = [s for block in sentences for s in block]
+        lengths = iter(self.count_tokens(flat))
+        tokens = [[next(lengths) for _ in block] for block in sentences]
+        stats.tokens_in = sum(map(sum, tokens))
+        scores = self._score(query, sentences)
+
+        # Kalimat terbaik tiap blok dulu (sitasi tetap terwakili), lalu sisanya menurut skor
+        order = []
+        for b, block in enumerate(scores):
+            if block:
+                best = max(range(len(block)), key=lambda i: (block[i], -i))
+                order.append((b, best))
+        rest = [(b, i) for b, block in enumerate(scores) for i in range(len(block))]
+        rest.sort(key=lambda bi: (-scores[bi[0]][bi[1]], bi[0], bi[1]))
+        order += rest
+
+        chosen = [set() for _ in blocks]
+        used = 0
+        for b, i in order:
+            if i in chosen[b]:
+                continue
+            n = tokens[b][i]
+            if used + n > self.max_tokens:
+                continue
+            chosen[b].add(i)
+            used += n
+
+        packed = []
+        for b, group in enumerate(blocks):
+            if not chosen[b]:
+                continue
+            parts, prev = [], None
+            for i in sorted(chosen[b]):
+                if prev is not None and i != prev + 1:
+                    parts.append(GAP)
+                elif prev is not None:
+                    parts.append(" ")
+                parts.append(sentences[b][i])
+                prev = i
+            packed.append(self._merged_hit(group, "".join(parts)))
+        stats.blocks_out = len(packed)
+        stats.tokens_out = used
+        stats.dropped_sentences = sum(map(len, sentences)) - sum(map(len, chosen))
+        return packed, stats
+
+    def _score(self, query: str, sentences: List[List[str]]) -> List[List[float]]:
+        terms = set(_WORD_RE.findall(query.lower()))
+        words = [[set(_WORD_RE.findall(s.lower())) & terms for s in block] for block in sentences]
+        n = sum(map(len, words)) or 1
+        df: Dict[str, int] = {}
+        for block in words:
+            for ws in block:
+                for w in ws:
+                    df[w] = df.get(w, 0) + 1
+        idf = {w: math.log(1 + n / c) for w, c in df.items()}
+        return [[sum(idf[w] for w in ws) for ws in block] for block in words]
+
+    @staticmethod
+    def _merged_hit(group: List[dict], text: str) -> dict:
+        first = min(group, key=lambda h: h.get("rank", 0))
+        hit = dict(first, chunk=text)
+        if len(group) > 1:
+            pages = set()
+            for h in group:
+                pages |= _page_numbers(h.get("pages"))
+            hit["pages"] = ", ".join(sorted(pages, key=lambda p: (_page_key({p}), p))) or "–"
+            hit["merged_ids"] = [h.get("id") for h in group]
+        return hit
+
+
+def load_tokenizer(name: Optional[str]):
+    if not name:
+        return None
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(name)
+
+
+def make_context_packer() -> Optional[ContextPacker]:
+    """Packer dari `context.*` di config; None bila dimatikan (konteks penuh seperti dulu)."""
+    cfg = config.get("context", {}) or {}
+    if not cfg.get("enabled", True):
+        return None
+    return ContextPacker(
+        max_tokens=int(cfg.get("max_tokens", 1200)),
+        tokenizer=load_tokenizer(cfg.get("tokenizer")),
+        tokens_per_word=float(cfg.get("tokens_per_word", 1.4)),
+        merge_adjacent=bool(cfg.get("merge_adjacent", True)),
+        max_sentence_words=int(cfg.get("max_sentence_words", 60)),
+    )
@@ -0,0 +1,198 @@
+"""
+Generasi sadar-percakapan: prompt per sesi yang hanya bertambah di ujung.
+
+Giliran pertama sebuah sesi mengirim prompt lengkap dengan prefix tetap:
+instruksi sistem, lalu konteks bernomor, lalu pertanyaan. Ollama
+mengembalikan `context` (token prompt + jawaban); giliran berikutnya
+mengirim `context` itu bersama potongan baru saja (konteks tambahan dan
+pertanyaan), sehingga KV cache model yang masih dimuat (keep_alive)
+dipakai ulang dan prefill hanya untuk token baru.
+
+Pertanyaan lanjutan ("bagaimana dengan dosisnya?") memakai ulang chunk
+giliran sebelumnya bila istilahnya masih tercakup; bila tidak, retrieval
+dijalankan dengan pertanyaan sebelumnya sebagai konteks query dan chunk
+baru ditambahkan dengan nomor sitasi lanjutan.
+
+Memori sesi dibatasi: jumlah sesi (LRU), TTL idle, jumlah giliran, jumlah
+chunk, dan panjang `context`. Bila batas chunk/context terlampaui sesi
+dipadatkan dan giliran berikutnya kembali mengirim prompt lengkap.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from src import config
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_THINK_RE = re.compile(r"<think>.*?</think>", re.DOTALL)
+# Kata fungsi yang tidak dihitung saat menilai apakah chunk lama masih mencakup pertanyaan
+STOPWORDS = frozenset(
+    "apa apakah bagaimana dengan yang dan atau untuk pada dari dalam itu ini tersebut nya "
+    "saja juga bisa ada adalah seperti kalau jika berapa kapan mengapa kenapa tentang "
+    "what about how the and for with that this which when why does can is are of".split()
+)
+
+
+def content_terms(text: str) -> set:
+    return {w for w in _WORD_RE.findall(text.lower()) if len(w) > 2 and w not in STOPWORDS}
+
+
+@dataclass
+class Turn:
+    query: str
+    answer: str
+    hits: int  # jumlah sumber yang terlihat model saat giliran ini
+
+
+@dataclass
+class Session:
+    id: str
+    turns: deque
+    hits: List[dict] = field(default_factory=list)   # sumber bernomor 1..n, hanya bertambah
+    context: Optional[list] = None                    # token `context` Ollama dari giliran terakhir
+    last_used: float = field(default_factory=time.time)
+    prefill_tokens: int = 0                           # total prompt_eval_count semua giliran
+    resets: int = 0
+    filters: Optional[dict] = None                    # filter sumber retrieval terakhir (chunk hanya dipakai ulang bila sama)
+
+    def reset_context(self):
+        self.context = None
+        self.resets += 1
+
+
+class SessionStore:
+    """Sesi per `session_id` dengan batas LRU `max_sessions` dan TTL idle."""
+
+    def __init__(self, max_sessions: int = 1000, ttl: float = 3600.0, max_turns: int = 8):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.evicted = 0
+
+    def get(self, session_id: str) -> Session:
+        now = time.time()
+        with self._lock:
+            s = self._sessions.pop(session_id, None)
+            if s is not None and now - s.last_used > self.ttl:
+                s = None
+                self.evicted += 1
+            if s is None:
+                s = Session(session_id, deque(maxlen=self.max_turns))
+            s.last_used = now
+            self._sessions[session_id] = s
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+            return s
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class Conversation:
+    """
+    Membangun prompt per giliran untuk satu Session.
+
+    `system` adalah instruksi tetap di awal prompt; `format_context(hits,
+    start)` merender sumber bernomor mulai dari `start` (sama dengan yang
+    dipakai build_prompt agar format sitasi identik).
+    """
+
+    def __init__(self, store: SessionStore, system: str, format_context: Callable[[list, int], str],
+                 max_hits: int = 15, max_context_tokens: int = 6000, reuse_min_overlap: float = 0.6,
+                 follow_up_max_terms: int = 2):
+        self.store = store
+        self.system = system
+        self.format_context = format_context
+        self.max_hits = max_hits
+        self.max_context_tokens = max_context_tokens
+        self.reuse_min_overlap = reuse_min_overlap
+        self.follow_up_max_terms = follow_up_max_terms
+
+    def session(self, session_id: str) -> Session:
+        return self.store.get(session_id)
+
+    def reusable(self, session: Session, query: str) -> bool:
+        """Chunk sesi masih mencakup istilah pertanyaan (≥ reuse_min_overlap)."""
+        if not session.hits:
+            return False
+        terms = content_terms(query)
+        if not terms:
+            return True  # mis. "jelaskan lagi" tanpa istilah baru
+        covered = set()
+        for h in session.hits:
+            covered |= terms & content_terms(h.get("chunk") or "")
+        return len(covered) / len(terms) >= self.reuse_min_overlap
+
+    def retrieval_query(self, session: Session, query: str) -> str:
+        """Pertanyaan lanjutan dengan sedikit istilah dilengkapi pertanyaan sebelumnya sebelum retrieval."""
+        if session.turns and len(content_terms(query)) <= self.follow_up_max_terms:
+            return f"{session.turns[-1].query} {query}"
+        return query
+
+    def add_hits(self, session: Session, hits: list) -> list:
+        """Tambahkan hit yang belum ada (per id) dengan nomor lanjutan; return hit baru."""
+        known = {h.get("id") for h in session.hits}
+        new = [h for h in hits if h.get("id") is None or h.get("id") not in known]
+        if len(session.hits) + len(new) > self.max_hits:
+            # Nomor sitasi lama bergeser: padatkan ke chunk terbaru, prompt lengkap lagi
+            session.hits = (session.hits + new)[-self.max_hits:]
+            session.reset_context()
+            return new
+        session.hits.extend(new)
+        return new
+
+    def prompt(self, session: Session, query: str, new_hits: list) -> Tuple[str, Optional[list]]:
+        """(prompt, context Ollama) untuk giliran ini."""
+        question = f"Pertanyaan: {query}\nJawaban akhir:"
+        if session.context is not None:
+            parts = []
+            if new_hits:
+                start = len(session.hits) - len(new_hits) + 1
+                parts.append(f"Konteks tambahan:\n{self.format_context(new_hits, start)}\n")
+            return "\n" + "".join(parts) + question, session.context
+        # Prompt lengkap: prefix tetap + semua sumber sesi + riwayat singkat
+        history = "".join(f"Pertanyaan: {t.query}\nJawaban: {t.answer}\n" for t in session.turns)
+        context = self.format_context(session.hits, 1)
+        return f"{self.system}Konteks:\n{context}\n{history}{question}", None
+
+    def record(self, session: Session, query: str, raw: str, stats: dict):
+        """Simpan giliran + `context` baru dari statistik akhir Ollama."""
+        answer = _THINK_RE.sub("", raw).strip()
+        session.turns.append(Turn(query, answer, len(session.hits)))
+        session.prefill_tokens += int(stats.get("prompt_eval_count", 0))
+        context = stats.get("context")
+        if context is None or len(context) > self.max_context_tokens:
+            # Server tanpa `context` atau jendela hampir penuh: giliran berikut prompt lengkap
+            if session.context is not None:
+                session.reset_context()
+            return
+        session.context = context
+
+
+def make_conversation(system: str, format_context: Callable[[list, int], str]) -> Optional[Conversation]:
+    """Conversation dari `conversation.*` di config; None bila dimatikan (setiap giliran berdiri sendiri)."""
+    cfg = config.get("conversation", {}) or {}
+    if not cfg.get("enabled", True):
+        return None
+    store = SessionStore(
+        max_sessions=int(cfg.get("max_sessions", 1000)),
+        ttl=float(cfg.get("ttl_seconds", 3600)),
+        max_turns=int(cfg.get("max_turns", 8)),
+    )
+    return Conversation(
+        store, system, format_context,
+        max_hits=int(cfg.get("max_hits", 15)),
+        max_context_tokens=int(cfg.get("max_context_tokens", 6000)),
+        reuse_min_overlap=float(cfg.get("reuse_min_overlap", 0.6)),
+        follow_up_max_terms=int(cfg.get("follow_up_max_terms", 2)),
+    )
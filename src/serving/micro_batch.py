@@ -0,0 +1,132 @@
+"""
+Micro-batching untuk embedding query di bawah trafik bersamaan.
+
+Setiap pemanggil `encode(query)` menaruh teksnya di antrean dan menunggu
+Future; satu thread worker mengumpulkan query hingga `max_batch` item atau
+`max_wait_ms` milidetik sejak item pertama, lalu meng-encode semuanya dalam
+satu forward pass. Jendela tunggu hanya dipakai saat batch sebelumnya
+berisi lebih dari satu query, sehingga trafik tunggal tidak tertunda.
+
+Berlaku untuk model apa pun yang punya encode(list) -> array (n, dim):
+CachedSentenceTransformer (MiniLM) maupun SapBERTUMLSEmbeddings.encode.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from src import config
+
+
+class MicroBatchEncoder:
+    """
+    encode(str) -> vektor (dim,) lewat batch bersama; encode(list) langsung
+    diteruskan ke `encode_fn` (sudah berupa batch).
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray], max_batch: int = 32,
+                 max_wait_ms: float = 5.0, model=None):
+        self.encode_fn = encode_fn
+        self.model = model
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self.batches = 0
+        self.items = 0
+        self._last_size = 0
+        self._thread = threading.Thread(target=self._run, name="micro-batch", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        if self._closed:
+            raise RuntimeError("MicroBatchEncoder sudah ditutup")
+        fut: Future = Future()
+        self._queue.put((text, fut))
+        return fut
+
+    def encode(self, texts, **_):
+        if isinstance(texts, str):
+            return self.submit(texts).result()
+        return np.asarray(self.encode_fn(list(texts)), dtype=np.float32)
+
+    # Antarmuka LangChain Embeddings
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode(text).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def stats(self) -> dict:
+        return {"batches": self.batches, "items": self.items,
+                "mean_batch": self.items / self.batches if self.batches else 0.0}
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self) -> Optional[list]:
+        """Blok sampai ada item, lalu kumpulkan sisanya hingga max_batch / max_wait."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        # Tunggu hanya bila batch sebelumnya berisi >1 query (ada trafik bersamaan);
+        # satu pengguna tunggal tidak membayar max_wait. Item yang sudah antre tetap diambil.
+        wait = self.max_wait if self._last_size > 1 else 0.0
+        deadline = time.perf_counter() + wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # proses batch ini dulu, berhenti di putaran berikutnya
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            batch = [(t, f) for t, f in batch if f.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            # Query identik dalam satu batch cukup di-encode sekali
+            unique = list(dict.fromkeys(t for t, _ in batch))
+            try:
+                vecs = np.asarray(self.encode_fn(unique), dtype=np.float32)
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            row = {t: i for i, t in enumerate(unique)}
+            for text, fut in batch:
+                fut.set_result(vecs[row[text]])
+            self.batches += 1
+            self.items += len(batch)
+            self._last_size = len(batch)
+
+
+def micro_batched(model, encode_fn: Optional[Callable] = None) -> MicroBatchEncoder:
+    """
+    Bungkus `model` dengan parameter `query_batching.*` dari config.yml.
+    Default memakai model.encode(list) (MiniLM, SapBERT), atau
+    embed_documents untuk Embeddings LangChain lain.
+    """
+    if encode_fn is None:
+        encode_fn = getattr(model, "encode", None) or model.embed_documents
+    cfg = config.get("query_batching", {}) or {}
+    return MicroBatchEncoder(
+        encode_fn,
+        max_batch=int(cfg.get("max_batch", 32)),
+        max_wait_ms=float(cfg.get("max_wait_ms", 5.0)),
+        model=model,
+    )
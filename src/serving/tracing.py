@@ -0,0 +1,250 @@
+"""
+Tracing ringan per request chat: span (embedding query, vector search,
+BM25, rerank, baca teks chunk, build prompt, TTFT dan total LLM,
+post-process) dicatat ke trace milik request yang sedang berjalan.
+
+Trace aktif disimpan di contextvar; `bind(fn, trace)` menjalankan fungsi
+(mis. retrieval di thread pool) dengan trace itu sebagai trace aktif. Span
+di luar request tidak mencatat apa pun.
+Trace selesai masuk ring buffer in-process dan bisa diekspor sebagai JSON
+lines (`to_jsonl`) atau teks Prometheus (`prometheus_text`).
+
+Dump prompt (pengganti last_prompt.txt) adalah sink async yang opt-in dan
+di-sampling: ditulis thread latar, tidak pernah memblokir request.
+"""
+import contextvars
+import itertools
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from src import config
+
+# Batas bucket histogram Prometheus (detik)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current: contextvars.ContextVar = contextvars.ContextVar("trace", default=None)
+_ids = itertools.count(1)
+
+
+class Trace:
+    """Satu request: span (nama, mulai relatif, durasi) dan atribut bebas."""
+
+    __slots__ = ("id", "name", "started", "wall_start", "spans", "attrs", "duration")
+
+    def __init__(self, name: str, **attrs):
+        self.id = f"{os.getpid():x}-{next(_ids):x}"
+        self.name = name
+        self.started = time.perf_counter()
+        self.wall_start = time.time()
+        self.spans: List[tuple] = []
+        self.attrs = attrs
+        self.duration: Optional[float] = None
+
+    def add(self, name: str, start: float, duration: float):
+        # list.append atomik di CPython: aman dari thread retrieval
+        self.spans.append((name, start - self.started, duration))
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.id,
+            "name": self.name,
+            "ts": self.wall_start,
+            "duration": self.duration,
+            "attrs": self.attrs,
+            "spans": [{"name": n, "start": round(s, 6), "duration": round(d, 6)} for n, s, d in self.spans],
+        }
+
+
+class Tracer:
+    """Ring buffer trace selesai + histogram kumulatif per span untuk Prometheus."""
+
+    def __init__(self, buffer_size: int = 1000, sink: Optional["JsonlSink"] = None):
+        self.traces: deque = deque(maxlen=buffer_size)
+        self.sink = sink
+        self._lock = threading.Lock()
+        self._hist: Dict[str, list] = {}   # span -> [count bucket..., +Inf, sum]
+
+    def start(self, name: str, **attrs) -> Trace:
+        return Trace(name, **attrs)
+
+    def finish(self, tr: Trace):
+        tr.duration = time.perf_counter() - tr.started
+        tr.add("total", tr.started, tr.duration)
+        with self._lock:
+            self.traces.append(tr)
+            for name, _, d in tr.spans:
+                h = self._hist.get(name)
+                if h is None:
+                    h = self._hist[name] = [0] * (len(BUCKETS) + 1) + [0.0]
+                for i, bound in enumerate(BUCKETS):
+                    if d <= bound:
+                        h[i] += 1
+                h[len(BUCKETS)] += 1
+                h[-1] += d
+        if self.sink is not None:
+            self.sink.submit(tr.to_dict())
+
+    def recent(self, n: Optional[int] = None) -> List[Trace]:
+        with self._lock:
+            items = list(self.traces)
+        return items[-n:] if n else items
+
+    def to_jsonl(self, fp=None, n: Optional[int] = None) -> str:
+        """Trace di buffer sebagai JSON lines; ditulis ke `fp` bila diberikan."""
+        text = "".join(json.dumps(t.to_dict(), ensure_ascii=False) + "\n" for t in self.recent(n))
+        if fp is not None:
+            fp.write(text)
+        return text
+
+    def prometheus_text(self, prefix: str = "rag_request") -> str:
+        """Histogram durasi per span dalam format eksposisi teks Prometheus."""
+        metric = f"{prefix}_span_seconds"
+        lines = [f"# HELP {metric} Durasi span per request chat.", f"# TYPE {metric} histogram"]
+        with self._lock:
+            hist = {k: list(v) for k, v in self._hist.items()}
+        for name in sorted(hist):
+            h = hist[name]
+            for bound, count in zip(BUCKETS, h):
+                lines.append(f'{metric}_bucket{{span="{name}",le="{bound}"}} {count}')
+            lines.append(f'{metric}_bucket{{span="{name}",le="+Inf"}} {h[len(BUCKETS)]}')
+            lines.append(f'{metric}_sum{{span="{name}"}} {h[-1]:.6f}')
+            lines.append(f'{metric}_count{{span="{name}"}} {h[len(BUCKETS)]}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self, n: Optional[int] = None) -> Dict[str, dict]:
+        """p50/p95/rata-rata per span dari trace di buffer."""
+        per: Dict[str, List[float]] = {}
+        for tr in self.recent(n):
+            for name, _, d in tr.spans:
+                per.setdefault(name, []).append(d)
+        out = {}
+        for name, ds in per.items():
+            ds.sort()
+            out[name] = {"count": len(ds), "mean": sum(ds) / len(ds),
+                         "p50": ds[len(ds) // 2], "p95": ds[min(len(ds) - 1, int(0.95 * len(ds)))]}
+        return out
+
+
+@contextmanager
+def span(name: str, tr: Optional[Trace] = None):
+    """Catat durasi blok ke `tr` atau trace aktif; tanpa trace tidak mencatat apa pun."""
+    tr = tr or _current.get()
+    if tr is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        tr.add(name, t0, time.perf_counter() - t0)
+
+
+def mark(name: str, since: Optional[float] = None, tr: Optional[Trace] = None):
+    """Span dari `since` (default awal trace) sampai sekarang, mis. TTFT."""
+    tr = tr or _current.get()
+    if tr is not None:
+        start = tr.started if since is None else since
+        tr.add(name, start, time.perf_counter() - start)
+
+
+def current() -> Optional[Trace]:
+    return _current.get()
+
+
+def bind(fn, tr: Optional[Trace]):
+    """`fn` yang dijalankan dengan `tr` sebagai trace aktif (juga di thread lain)."""
+    ctx = contextvars.copy_context()
+    ctx.run(_current.set, tr)
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+
+class JsonlSink:
+    """
+    Penulis JSON lines di thread latar. submit() tidak pernah menunggu:
+    bila antrean penuh record dibuang (dihitung di `dropped`).
+    `sample_rate` < 1 hanya meneruskan sebagian record.
+    """
+
+    def __init__(self, path: str, sample_rate: float = 1.0, max_queue: int = 1000):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.dropped = 0
+        self.written = 0
+        self._q: queue.Queue = queue.Queue(maxsize=max_queue)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="jsonl-sink")
+        self._thread.start()
+
+    def submit(self, record: dict) -> bool:
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        try:
+            self._q.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                rec = self._q.get()
+                if rec is None:
+                    break
+                batch = [rec]
+                # Ambil sekaligus yang sudah antre: satu write + flush per batch
+                while len(batch) < 256:
+                    try:
+                        rec = self._q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if rec is None:
+                        self._q.put(None)
+                        break
+                    batch.append(rec)
+                f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in batch))
+                f.flush()
+                self.written += len(batch)
+
+    def close(self, timeout: float = 5.0):
+        self._q.put(None)
+        self._thread.join(timeout)
+
+
+def _resolve(path: str) -> str:
+    return path if os.path.isabs(path) else str(config.ROOT_DIR / path)
+
+
+def make_tracer() -> Optional[Tracer]:
+    """Tracer dari `tracing.*` di config; None bila dimatikan."""
+    cfg = config.get("tracing", {}) or {}
+    if not cfg.get("enabled", True):
+        return None
+    export = cfg.get("export_path")
+    sink = JsonlSink(_resolve(export), float(cfg.get("export_sample_rate", 1.0))) if export else None
+    return Tracer(int(cfg.get("buffer_size", 1000)), sink=sink)
+
+
+def make_prompt_sink() -> Optional[JsonlSink]:
+    """Sink dump prompt (opt-in, `tracing.prompt_dump.*`); None bila tidak aktif."""
+    cfg = config.get("tracing.prompt_dump", {}) or {}
+    if not cfg.get("enabled", False):
+        return None
+    return JsonlSink(_resolve(cfg.get("path", "logs/prompts.jsonl")), float(cfg.get("sample_rate", 0.05)))
+
+
+def dump_prompt(sink: Optional[JsonlSink], query: str, prompt: str, extra: Optional[dict] = None):
+    """Kirim prompt ke sink (bila aktif) dengan trace_id request yang sedang berjalan."""
+    if sink is None:
+        return
+    tr = _current.get()
+    sink.submit({"ts": time.time(), "trace_id": tr.id if tr else None,
+                 "query": query, "prompt": prompt, **(extra or {})})
+